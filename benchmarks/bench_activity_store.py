@@ -0,0 +1,114 @@
+"""
+Benchmark activity status recording in the local database.
+
+Replays the lifecycle the executor records for ``--activities`` activities
+(QUEUED, RUNNING, then SUCCEEDED) from ``--threads`` worker threads, into a
+fresh SQLite database in a temporary directory:
+
+* ``write-behind``: through ``ActivityStore.record``, which queues the event
+  and returns; the store thread writes batches in single transactions.
+* ``per-event``: one transaction per event on a pooled engine, as the
+  executor would do by calling a DAO inline.
+
+For each mode the time the worker threads spent recording (what an activity
+pays) and the time until everything was on disk are reported.
+
+Run from the repository root::
+
+    python benchmarks/bench_activity_store.py --activities 20000 --threads 8
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from zambeze.orchestration.db.activity_store import ActivityStore, now_ms
+from zambeze.orchestration.db.dao.dao_utils import create_local_db, get_db_engine
+
+_UPDATE_STMT = text(
+    "UPDATE activity SET status = :status, ended_at = :ended_at "
+    "WHERE activity_uuid = :activity_uuid"
+)
+
+
+def lifecycle(record, activity_id: str) -> float:
+    start = time.perf_counter()
+    record(activity_id, "bench", "QUEUED", queued_at=now_ms())
+    record(activity_id, "bench", "RUNNING", started_at=now_ms())
+    record(activity_id, "bench", "SUCCEEDED", ended_at=now_ms())
+    return time.perf_counter() - start
+
+
+def per_event_recorder(db_file: str):
+    engine = get_db_engine(db_file)
+    create_local_db(db_file)
+
+    def record(activity_id, campaign_id, status, **timestamps):
+        values = {
+            "activity_uuid": activity_id,
+            "campaign_id": campaign_id,
+            "status": status,
+            "created_at": now_ms(),
+            "queued_at": None,
+            "started_at": None,
+            "ended_at": None,
+            **timestamps,
+        }
+        with engine.begin() as conn:
+            if status == "QUEUED":
+                conn.execute(
+                    text(
+                        "INSERT INTO activity (activity_uuid, campaign_id, status, "
+                        "created_at, queued_at) VALUES (:activity_uuid, "
+                        ":campaign_id, :status, :created_at, :queued_at)"
+                    ),
+                    values,
+                )
+            else:
+                conn.execute(_UPDATE_STMT, values)
+
+    return record
+
+
+def run(mode: str, directory: str, activities: int, threads: int) -> tuple:
+    db_file = os.path.join(directory, f"{mode}.db")
+    store = None
+    if mode == "write-behind":
+        store = ActivityStore(db_file=db_file)
+        store.start()
+        record = store.record
+    else:
+        record = per_event_recorder(db_file)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        spent = sum(
+            pool.map(lambda i: lifecycle(record, f"activity-{i}"), range(activities))
+        )
+    if store is not None:
+        store.flush()
+        store.stop()
+    return spent, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--activities", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    events = args.activities * 3
+    print(f"{'mode':>12} {'us/event in worker':>19} {'events/s on disk':>17}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("write-behind", "per-event"):
+            spent, elapsed = run(mode, tmp, args.activities, args.threads)
+            print(f"{mode:>12} {spent / events * 1e6:>19.1f} {events / elapsed:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark per-message handoff latency of the threaded and asyncio agent cores.
+
+Replays the path a message takes inside an agent, from the moment the queue
+client delivers an activity to the moment its status is handed back to the
+queue client, with a no-op activity and no broker:
+
+* ``threaded``: the ``Agent``/``MessageHandler``/``Executor`` layout, where
+  the consumer thread, the activity sorter thread, the executor thread, the
+  worker pool and the control sender thread hand messages over through
+  ``queue.Queue`` objects.
+* ``async``: the ``AsyncAgent`` layout, where the consumer coroutine feeds
+  the dependency tracker directly, the activity runs as a task on the same
+  loop and its status is published by awaiting.
+
+Both use the real ``DependencyTracker``. Messages are injected one at a time
+(``--mode latency``) or all at once (``--mode burst``).
+
+Run from the repository root::
+
+    python benchmarks/bench_agent_latency.py --count 5000
+"""
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+
+from zambeze.orchestration.dependency_tracker import DependencyTracker
+
+
+def nodes(count: int):
+    return [
+        (f"activity-{i}", {"campaign_id": "bench", "predecessors": []})
+        for i in range(count)
+    ]
+
+
+def threaded_pipeline(count: int, burst: bool, workers: int) -> list:
+    check_activity_q = Queue()  # MessageHandler -> Agent sorter
+    to_process_q = Queue()  # Agent sorter -> Executor
+    to_status_q = Queue()  # Executor workers -> Agent sender
+    send_control_q = Queue()  # Agent sender -> MessageHandler sender
+    sent_at = {}
+    latencies = []
+    done = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    def run_activity(dag_msg):
+        to_status_q.put({"activity_id": dag_msg[0], "status": "SUCCEEDED"})
+
+    tracker = DependencyTracker(
+        on_ready=lambda node: pool.submit(run_activity, node),
+        on_failed=lambda node, pred: None,
+    )
+
+    def forward(src, dst):
+        while True:
+            dst.put(src.get())
+
+    def executor():
+        while True:
+            tracker.add(to_process_q.get())
+
+    def publisher():
+        for _ in range(count):
+            msg = send_control_q.get()
+            latencies.append(time.perf_counter() - sent_at[msg["activity_id"]])
+            if not burst:
+                done.set()
+
+    threads = [
+        threading.Thread(target=forward, args=(check_activity_q, to_process_q)),
+        threading.Thread(target=executor),
+        threading.Thread(target=forward, args=(to_status_q, send_control_q)),
+    ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    sink = threading.Thread(target=publisher)
+    sink.start()
+
+    for node in nodes(count):
+        sent_at[node[0]] = time.perf_counter()
+        check_activity_q.put(node)
+        if not burst:
+            done.wait()
+            done.clear()
+    sink.join()
+    pool.shutdown()
+    return latencies
+
+
+def async_pipeline(count: int, burst: bool) -> list:
+    async def scenario():
+        sent_at = {}
+        latencies = []
+        tasks = set()
+        delivered = asyncio.Queue()  # stands in for the NATS subscription
+        finished = asyncio.Event()
+
+        async def publish(status):
+            latencies.append(time.perf_counter() - sent_at[status["activity_id"]])
+            finished.set()
+
+        async def run_activity(dag_msg):
+            await publish({"activity_id": dag_msg[0], "status": "SUCCEEDED"})
+
+        def spawn(node):
+            task = asyncio.get_running_loop().create_task(run_activity(node))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        tracker = DependencyTracker(on_ready=spawn, on_failed=lambda node, pred: None)
+
+        async def consume():
+            for _ in range(count):
+                tracker.add(await delivered.get())
+
+        consumer = asyncio.get_running_loop().create_task(consume())
+        for node in nodes(count):
+            sent_at[node[0]] = time.perf_counter()
+            delivered.put_nowait(node)
+            if not burst:
+                await finished.wait()
+                finished.clear()
+        await consumer
+        while tasks:
+            await asyncio.gather(*list(tasks))
+        return latencies
+
+    return asyncio.run(scenario())
+
+
+def summary(latencies: list) -> str:
+    us = sorted(x * 1e6 for x in latencies)
+    p99 = us[min(len(us) - 1, int(len(us) * 0.99))]
+    return f"{statistics.median(us):>10.1f} {p99:>10.1f} {statistics.mean(us):>10.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--mode", choices=["latency", "burst"], default="latency")
+    args = parser.parse_args()
+    burst = args.mode == "burst"
+
+    print(f"{'core':>9} {'p50 (us)':>10} {'p99 (us)':>10} {'mean (us)':>10}")
+    threaded = threaded_pipeline(args.count, burst, args.workers)
+    print(f"{'threaded':>9} {summary(threaded)}")
+    print(f"{'async':>9} {summary(async_pipeline(args.count, burst))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark client-side campaign submission latency.
+
+Starts a ZMQ REP socket on this machine that acknowledges every request, as
+the agent does, and writes its port to a temporary ``agent.yaml``. Each
+round then times ``Campaign.dispatch`` of a campaign with ``--activities``
+shell activities, which reads the agent address from the settings, packs
+and serializes the DAG and waits for the acknowledgement.
+
+The time taken to build a full ``ZambezeSettings`` from the same file, which
+is what dispatch used to do, is reported next to it for comparison.
+
+Run from the repository root::
+
+    python benchmarks/bench_campaign_dispatch.py --rounds 50
+"""
+
+import argparse
+import logging
+import statistics
+import tempfile
+import threading
+import time
+
+import yaml
+import zmq
+
+from zambeze.campaign.activities.shell import ShellActivity
+from zambeze.campaign.campaign import Campaign
+from zambeze.settings import ZambezeSettings
+
+
+def responder(context: zmq.Context, port: int, rounds: int) -> None:
+    socket = context.socket(zmq.REP)
+    socket.bind(f"tcp://127.0.0.1:{port}")
+    for _ in range(rounds):
+        socket.recv()
+        socket.send(b"ok")
+    socket.close()
+
+
+def campaign(activities: int) -> Campaign:
+    return Campaign(
+        "bench",
+        activities=[
+            ShellActivity(name=f"echo-{i}", files=[], command="echo", arguments=str(i))
+            for i in range(activities)
+        ],
+    )
+
+
+def report(name: str, samples: list) -> None:
+    samples = sorted(samples)
+    print(
+        f"{name:>18} median {statistics.median(samples) * 1000:8.2f} ms"
+        f"  p95 {samples[int(len(samples) * 0.95)] * 1000:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--activities", type=int, default=10)
+    parser.add_argument("--port", type=int, default=5599)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conf_file = f"{tmp}/agent.yaml"
+        with open(conf_file, "w") as f:
+            yaml.dump({"zmq": {"host": "127.0.0.1", "port": args.port}}, f)
+        ZambezeSettings._conf_file = conf_file
+
+        context = zmq.Context()
+        thread = threading.Thread(
+            target=responder, args=(context, args.port, args.rounds), daemon=True
+        )
+        thread.start()
+
+        dispatch = []
+        for _ in range(args.rounds):
+            c = campaign(args.activities)
+            start = time.perf_counter()
+            c.dispatch()
+            dispatch.append(time.perf_counter() - start)
+        thread.join()
+        context.term()
+
+        settings = []
+        for _ in range(min(args.rounds, 10)):
+            start = time.perf_counter()
+            ZambezeSettings(conf_file=conf_file)
+            settings.append(time.perf_counter() - start)
+
+    report("dispatch", dispatch)
+    report("ZambezeSettings()", settings)
+
+
+if __name__ == "__main__":
+    main()
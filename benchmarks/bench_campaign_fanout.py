@@ -0,0 +1,105 @@
+"""
+Benchmark campaign wall-clock time for fan-out versus chained DAGs.
+
+Builds a wide campaign of independent activities with
+``Campaign._pack_dag_for_dispatch`` and replays it on a number of simulated
+agents. Each simulated agent runs one activity at a time (the activity just
+sleeps) and releases dependents through the executor's
+``DependencyTracker``, the same way control messages do on real agents.
+
+The same activities chained one after another (which is what every campaign
+used to become) are replayed for comparison: the chain does not speed up as
+agents are added while the fan-out campaign does.
+
+Run from the repository root::
+
+    python benchmarks/bench_campaign_fanout.py --width 16 --agents 1 2 4 8
+"""
+
+import argparse
+import logging
+import queue
+import threading
+import time
+
+from zambeze.campaign.activities.shell import ShellActivity
+from zambeze.campaign.campaign import Campaign
+from zambeze.orchestration.dependency_tracker import DependencyTracker
+
+
+def build_campaign(width: int, chained: bool) -> Campaign:
+    """Create ``width`` independent activities, optionally chained in order."""
+    logger = logging.getLogger("bench")
+    logger.setLevel(logging.ERROR)
+    activities = []
+    for i in range(width):
+        activity = ShellActivity(
+            name=f"step-{i}", files=[], command="sleep", arguments="1", logger=logger
+        )
+        if chained and activities:
+            activity.add_dependency(activities[-1])
+        activities.append(activity)
+    return Campaign("bench", activities=activities, logger=logger)
+
+
+def replay(campaign: Campaign, n_agents: int, duration: float) -> float:
+    """Replay the campaign DAG on ``n_agents`` simulated agents."""
+    dag = campaign._pack_dag_for_dispatch()
+    ready = queue.Queue()
+    tracker = DependencyTracker(
+        on_ready=ready.put, on_failed=lambda node, _pred: ready.put(node)
+    )
+    for node in dag.nodes(data=True):
+        if node[0] != "MONITOR":
+            tracker.add(node)
+
+    def agent():
+        while True:
+            node = ready.get()
+            if node is None:
+                return
+            if node[0] == "TERMINATOR":
+                for _ in range(n_agents):
+                    ready.put(None)
+                return
+            time.sleep(duration)
+            tracker.update(
+                {
+                    "campaign_id": campaign.campaign_id,
+                    "activity_id": node[0],
+                    "status": "SUCCEEDED",
+                }
+            )
+
+    threads = [threading.Thread(target=agent) for _ in range(n_agents)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    tracker.update(
+        {
+            "campaign_id": campaign.campaign_id,
+            "activity_id": "MONITOR",
+            "status": "MONITORING",
+        }
+    )
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--width", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=0.1)
+    parser.add_argument("--agents", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f"{'agents':>7} {'chain (s)':>10} {'fan-out (s)':>12}")
+    for n_agents in args.agents:
+        chain = replay(build_campaign(args.width, True), n_agents, args.duration)
+        fanout = replay(build_campaign(args.width, False), n_agents, args.duration)
+        print(f"{n_agents:>7} {chain:>10.3f} {fanout:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark the executor worker pool.
+
+Feeds a batch of independent shell activities (each one sleeps for a short
+time) into an ``Executor`` and measures how long it takes until every
+activity has reported its status. Throughput should rise with the size of
+the worker pool set by ``executor.max_workers`` in the agent settings.
+
+Run from the repository root::
+
+    python benchmarks/bench_executor_pool.py --activities 32 --workers 1 2 4 8
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import yaml
+
+from zambeze.campaign.activities.shell import ShellActivity
+from zambeze.orchestration.executor import Executor
+from zambeze.settings import ZambezeSettings
+
+
+def make_settings(work_dir: Path, max_workers: int) -> ZambezeSettings:
+    """Write a throwaway agent configuration and load it."""
+    conf_file = work_dir / f"agent-{max_workers}.yaml"
+    conf = {
+        "plugins": {
+            "shell": {"config": {}},
+            "All": {"default_working_directory": str(work_dir)},
+        },
+        "zmq": {"host": "127.0.0.1"},
+        "executor": {"max_workers": max_workers},
+    }
+    with open(conf_file, "w") as f:
+        yaml.dump(conf, f)
+    return ZambezeSettings(conf_file=conf_file)
+
+
+def run_once(work_dir: Path, max_workers: int, n_activities: int, sleep_s: float):
+    """Run ``n_activities`` sleeping activities and return the elapsed seconds."""
+    logger = logging.getLogger("bench")
+    logger.setLevel(logging.ERROR)
+    executor = Executor(settings=make_settings(work_dir, max_workers), logger=logger)
+    executor.daemon = True
+    executor.start()
+
+    campaign_id = str(uuid.uuid4())
+    start = time.perf_counter()
+    for _ in range(n_activities):
+        activity = ShellActivity(
+            name="sleep", files=[], command="sleep", arguments=str(sleep_s)
+        )
+        activity.campaign_id = campaign_id
+        node = {
+            "activity": activity,
+            "campaign_id": campaign_id,
+            "predecessors": [],
+            "transfer_tokens": {},
+        }
+        executor.to_process_q.put((activity.activity_id, node))
+
+    for _ in range(n_activities):
+        executor.to_status_q.get()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--activities", type=int, default=32)
+    parser.add_argument("--sleep", type=float, default=0.25)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'seconds':>10} {'activities/s':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            elapsed = run_once(Path(tmp), workers, args.activities, args.sleep)
+            rate = args.activities / elapsed
+            print(f"{workers:>8} {elapsed:>10.3f} {rate:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
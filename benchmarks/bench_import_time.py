@@ -0,0 +1,75 @@
+"""
+Benchmark cold-start import cost of the zambeze CLI and public API.
+
+Each scenario runs ``--repeat`` times in a fresh ``python -X importtime``
+interpreter. The import times it prints to stderr are summed per run, and
+the median total is reported with the slowest top-level packages of the
+last run. Scenarios cover ``import zambeze``, the public API used by
+campaign scripts and the ``zambeze`` commands that never talk to an agent.
+
+Run from the repository root::
+
+    python benchmarks/bench_import_time.py --repeat 5
+"""
+
+import argparse
+import collections
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    "import zambeze": "import zambeze",
+    "public api": "from zambeze import Campaign, ShellActivity",
+    "zambeze status": (
+        "import sys; sys.argv = ['zambeze', 'status'];"
+        " from zambeze.cli import main; main()"
+    ),
+    "zambeze logs": (
+        "import sys; sys.argv = ['zambeze', 'logs', '--numlines', '1'];"
+        " from zambeze.cli import main; main()"
+    ),
+    "zambeze-agent --help": (
+        "import sys; sys.argv = ['zambeze-agent', '--help'];"
+        " from zambeze.cli_agent import main; main()"
+    ),
+}
+
+
+def import_times(code: str) -> dict:
+    """Self time in microseconds of each top-level package imported."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    packages = collections.Counter()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us)
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, code in SCENARIOS.items():
+        totals = []
+        for _ in range(args.repeat):
+            packages = import_times(code)
+            totals.append(sum(packages.values()))
+        heaviest = ", ".join(
+            f"{package} {us / 1000:.1f}"
+            for package, us in packages.most_common(args.top)
+        )
+        print(f"{name:>22} {statistics.median(totals) / 1000:8.1f} ms  ({heaviest})")
+
+
+if __name__ == "__main__":
+    main()
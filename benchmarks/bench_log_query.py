@@ -0,0 +1,100 @@
+"""
+Benchmark reading the agent log with ``zambeze logs``.
+
+Writes a synthetic agent log of ``--records`` records from ``--campaigns``
+campaigns run one after the other into a temporary directory, then times:
+
+* ``byte-wise tail``: the last ``--numlines`` lines found by seeking back
+  one byte at a time, as ``zambeze logs`` used to.
+* ``block tail``: the same lines from ``log_query.query``.
+* ``campaign scan``: the last ``--numlines`` records of one campaign found
+  by scanning the whole log backwards.
+* ``campaign index``: the same records looked up in the sidecar index,
+  once while building it and once with the index in place.
+
+Run from the repository root::
+
+    python benchmarks/bench_log_query.py --records 1000000 --numlines 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import uuid
+
+from zambeze.utils.log_query import LogFilter, query
+
+
+def write_log(path: str, records: int, campaigns: list) -> None:
+    with open(path, "w") as f:
+        for i in range(records):
+            campaign = campaigns[i * len(campaigns) // records]
+            f.write(
+                f"2024-01-01 00:00:00,000 - zambeze.orchestration.executor - INFO - "
+                f"[exec] Activity {uuid.uuid4()} of campaign {campaign} step {i}\n"
+            )
+
+
+def bytewise_tail(path: str, num_lines: int) -> int:
+    with open(path, "rb") as lf:
+        lf.seek(0, os.SEEK_END)
+        end = curr = lf.tell()
+        seen_lines = 0
+        while curr >= 0 and seen_lines < num_lines:
+            lf.seek(curr, os.SEEK_SET)
+            if lf.read(1) == b"\n" and curr != end - 1:
+                seen_lines += 1
+            curr -= 1
+        if curr < 0:
+            lf.seek(0, os.SEEK_SET)
+        return sum(1 for _ in lf)
+
+
+def timed(func, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--campaigns", type=int, default=1000)
+    parser.add_argument("--numlines", type=int, default=100000)
+    args = parser.parse_args()
+
+    campaigns = [str(uuid.uuid4()) for _ in range(args.campaigns)]
+    wanted = LogFilter(campaign_id=campaigns[len(campaigns) // 2])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "zambeze.log")
+        write_log(path, args.records, campaigns)
+        size = os.path.getsize(path) / 1024**2
+        print(f"log: {args.records} records, {size:.0f} MiB")
+
+        runs = [
+            ("byte-wise tail", bytewise_tail, (path, args.numlines), {}),
+            ("block tail", query, (path, args.numlines), {}),
+            ("campaign scan", query, (path, args.numlines, "tail", wanted), {}),
+            (
+                "campaign index (build)",
+                query,
+                (path, args.numlines, "tail", wanted),
+                {"use_index": True},
+            ),
+            (
+                "campaign index",
+                query,
+                (path, args.numlines, "tail", wanted),
+                {"use_index": True},
+            ),
+        ]
+        print(f"{'query':>24} {'seconds':>9} {'lines':>8}")
+        for name, func, func_args, kwargs in runs:
+            elapsed, result = timed(func, *func_args, **kwargs)
+            lines = result if isinstance(result, int) else len(result)
+            print(f"{name:>24} {elapsed:>9.3f} {lines:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark the cost of agent logging on the executor's message loop.
+
+Feeds ``--messages`` DAG nodes into an ``Executor`` and measures how many
+it takes in per second, with the agent logger:
+
+* ``off``: disabled.
+* ``info``: at INFO through ``start_logging``, which writes JSON records
+  from a background thread.
+* ``info-sync``: at INFO through a synchronous ``FileHandler`` writing text
+  lines, as the agent used to.
+* ``debug``: at DEBUG through ``start_logging``.
+
+Every node waits on a predecessor that never finishes, so no command runs
+and only the message loop is measured; activity records are discarded
+instead of being written to the local database.
+
+Run from the repository root::
+
+    python benchmarks/bench_logging.py --messages 20000
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import yaml
+
+from zambeze.campaign.activities.shell import ShellActivity
+from zambeze.orchestration.executor import Executor
+from zambeze.settings import ZambezeSettings
+from zambeze.utils.structured_log import TEXT_FORMAT, start_logging
+
+
+class NullStore:
+    def record(self, *args, **kwargs):
+        pass
+
+    def forget(self, campaign_id, node_id):
+        pass
+
+
+def make_settings(work_dir: Path) -> ZambezeSettings:
+    """Write a throwaway agent configuration and load it."""
+    conf_file = work_dir / "agent.yaml"
+    conf = {
+        "plugins": {
+            "shell": {"config": {}},
+            "All": {"default_working_directory": str(work_dir)},
+        },
+        "zmq": {"host": "127.0.0.1"},
+    }
+    with open(conf_file, "w") as f:
+        yaml.dump(conf, f)
+    return ZambezeSettings(conf_file=conf_file)
+
+
+def make_logger(mode: str, log_path: Path):
+    logger = logging.getLogger(f"bench.{mode}")
+    logger.propagate = False
+    listener = None
+    if mode == "off":
+        logger.disabled = True
+    elif mode == "info-sync":
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    else:
+        level = logging.DEBUG if mode == "debug" else logging.INFO
+        listener = start_logging(logger, log_path, level=level)
+    return logger, listener
+
+
+def run(mode: str, work_dir: Path, messages: int) -> float:
+    """Return the messages per second taken in by the executor."""
+    logger, listener = make_logger(mode, work_dir / f"{mode}.log")
+    executor = Executor(settings=make_settings(work_dir), logger=logger)
+    executor._store = NullStore()
+    executor.daemon = True
+
+    campaign_id = str(uuid.uuid4())
+    activity = ShellActivity(name="true", files=[], command="true", arguments="")
+    activity.campaign_id = campaign_id
+    for i in range(messages):
+        node = {
+            "activity": activity,
+            "campaign_id": campaign_id,
+            "predecessors": ["never"],
+            "transfer_tokens": {},
+        }
+        executor.to_process_q.put((f"activity-{i}", node))
+    executor.to_process_q.put(("TERMINATOR", {"campaign_id": campaign_id}))
+
+    start = time.perf_counter()
+    executor.start()
+    executor.to_status_q.get()
+    elapsed = time.perf_counter() - start
+    if listener is not None:
+        listener.stop()
+    return messages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'logging':>10} {'messages/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("off", "info", "info-sync", "debug"):
+            rate = run(mode, Path(tmp), args.messages)
+            print(f"{mode:>10} {rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark RabbitMQ publishing throughput for single and batched sends.
+
+Publishes ``--count`` control messages to a throwaway queue three ways and
+reports messages per second:
+
+* ``single``: one ``basic_publish`` per message on a blocking connection,
+  which is what ``QueueRMQ.send`` does (no delivery guarantee).
+* ``single+confirm``: the same with publisher confirms enabled, so every
+  message waits for a broker round trip.
+* ``batched``: ``RMQPublisher``, which batches messages and handles confirms
+  asynchronously.
+
+It needs a local broker; the RabbitMQ service from the deployment compose
+file is enough::
+
+    docker compose --file deployment/compose-rabbit.yml up -d rabbitmq
+    python benchmarks/bench_rmq_publisher.py --count 20000
+"""
+
+import argparse
+import logging
+import time
+
+import pika
+
+from zambeze.orchestration.message import wire_format
+from zambeze.orchestration.queue.queue_publisher import RMQPublisher
+
+BENCH_QUEUE = "ZAMBEZE_BENCH"
+
+
+def control_messages(count: int):
+    return [
+        {
+            "status": "RUNNING",
+            "activity_id": f"activity-{i}",
+            "campaign_id": "bench",
+            "agent_id": "bench-agent",
+        }
+        for i in range(count)
+    ]
+
+
+def bench_single(host: str, port: int, messages: list, confirm: bool) -> float:
+    connection = pika.BlockingConnection(
+        pika.ConnectionParameters(host=host, port=port)
+    )
+    channel = connection.channel()
+    channel.queue_declare(queue=BENCH_QUEUE)
+    channel.queue_purge(queue=BENCH_QUEUE)
+    if confirm:
+        channel.confirm_delivery()
+
+    start = time.perf_counter()
+    for msg in messages:
+        channel.basic_publish(
+            exchange="", routing_key=BENCH_QUEUE, body=wire_format.dumps(msg)
+        )
+    elapsed = time.perf_counter() - start
+    connection.close()
+    return len(messages) / elapsed
+
+
+def bench_batched(
+    host: str, port: int, messages: list, batch_size: int, linger: float
+) -> float:
+    publisher = RMQPublisher(
+        {"ip": host, "port": port},
+        logger=logging.getLogger("bench"),
+        batch_size=batch_size,
+        linger=linger,
+    )
+    # BENCH_QUEUE was declared by bench_single.
+    publisher.start()
+    while not publisher.ready:
+        time.sleep(0.01)
+
+    start = time.perf_counter()
+    for msg in messages:
+        publisher.publish(channel=BENCH_QUEUE, body=msg)
+    publisher.flush()
+    elapsed = time.perf_counter() - start
+    publisher.stop(timeout=5)
+    return len(messages) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5672)
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--linger-ms", type=float, default=5)
+    args = parser.parse_args()
+    logging.getLogger("bench").setLevel(logging.ERROR)
+
+    messages = control_messages(args.count)
+    results = {
+        "single": bench_single(args.host, args.port, messages, confirm=False),
+        "single+confirm": bench_single(args.host, args.port, messages, confirm=True),
+        "batched": bench_batched(
+            args.host, args.port, messages, args.batch_size, args.linger_ms / 1000
+        ),
+    }
+
+    print(f"{'mode':>15} {'msg/s':>12}")
+    for mode, rate in results.items():
+        print(f"{mode:>15} {rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
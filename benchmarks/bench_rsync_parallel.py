@@ -0,0 +1,90 @@
+"""
+Benchmark throughput of the rsync plugin transferring many items.
+
+Creates ``--files`` files of ``--size-mb`` MiB in a temporary directory and
+copies each of them, as one item of a single ``transfer`` action, to another
+temporary directory on this machine. Source and destination both use the
+agent's own address, so rsync copies locally without ssh. The action is run
+once per ``--parallel`` value, each time into a fresh destination, and the
+wall time and aggregate throughput are reported.
+
+Requires the ``rsync`` binary. Run from the repository root::
+
+    python benchmarks/bench_rsync_parallel.py --files 32 --size-mb 64
+"""
+
+import argparse
+import getpass
+import os
+import tempfile
+import time
+
+from zambeze.orchestration.plugin_modules.rsync.rsync import Rsync
+
+
+def make_sources(directory: str, count: int, size: int) -> list:
+    paths = []
+    block = os.urandom(1024 * 1024)
+    for i in range(count):
+        path = os.path.join(directory, f"file-{i}.dat")
+        with open(path, "wb") as f:
+            for _ in range(size // len(block)):
+                f.write(block)
+        paths.append(path)
+    return paths
+
+
+def transfer_action(plugin: Rsync, sources: list, dest_dir: str) -> dict:
+    ip = plugin.info["local_ip"]
+    user = getpass.getuser()
+    return {
+        "transfer": {
+            "items": [
+                {
+                    "source": {"ip": ip, "user": user, "path": path},
+                    "destination": {
+                        "ip": ip,
+                        "user": user,
+                        "path": os.path.join(dest_dir, os.path.basename(path)),
+                    },
+                }
+                for path in sources
+            ],
+            "arguments": ["-a", "--whole-file"],
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--files", type=int, default=32)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--parallel", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = os.path.join(tmp, "src")
+        os.mkdir(source_dir)
+        sources = make_sources(source_dir, args.files, args.size_mb * 1024 * 1024)
+        total_mb = args.files * args.size_mb
+
+        print(f"{'parallel':>8} {'seconds':>9} {'MiB/s':>9} {'bytes reported':>15}")
+        for parallel in args.parallel:
+            plugin = Rsync()
+            plugin.configure({"max_parallel_transfers": parallel})
+            dest_dir = tempfile.mkdtemp(dir=tmp)
+            action = transfer_action(plugin, sources, dest_dir)
+
+            start = time.perf_counter()
+            results = plugin.process([action])["transfer"]
+            elapsed = time.perf_counter() - start
+
+            reported = sum(result["bytes_transferred"] for result in results)
+            print(
+                f"{parallel:>8} {elapsed:>9.2f} {total_mb / elapsed:>9.1f} "
+                f"{reported:>15}"
+            )
+
+
+if __name__ == "__main__":
+    main()
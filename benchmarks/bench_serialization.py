@@ -0,0 +1,105 @@
+"""
+Benchmark DAG serialization with dill against the msgpack wire format.
+
+Builds campaigns of increasing size and measures the encode time, decode time
+and payload size of the whole campaign DAG as well as of every individual
+node, which is what the message handler ships to the ACTIVITIES queue. The
+dill side needs ``dill`` installed (``pip install dill``); it is no longer a
+runtime dependency of zambeze.
+
+Run from the repository root::
+
+    python benchmarks/bench_serialization.py --sizes 10 100 1000 10000 100000
+"""
+
+import argparse
+import logging
+import time
+
+import dill
+
+from zambeze.campaign.activities.shell import ShellActivity
+from zambeze.campaign.campaign import Campaign
+from zambeze.orchestration.message import wire_format
+
+
+def build_dag(size: int):
+    logger = logging.getLogger("bench")
+    logger.setLevel(logging.ERROR)
+    activities = [
+        ShellActivity(
+            name=f"step-{i}",
+            files=[f"file:///tmp/input-{i}.txt"],
+            command="echo",
+            arguments=f"activity {i}",
+            env_vars={"STEP": str(i)},
+            logger=logger,
+        )
+        for i in range(size)
+    ]
+    return Campaign(
+        "bench", activities=activities, logger=logger
+    )._pack_dag_for_dispatch()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def measure(dag, encode, decode, encode_node, decode_node):
+    """Return (encode s, decode s, bytes) for the DAG and for all its nodes."""
+    frame, dag_enc = timed(encode, dag)
+    _, dag_dec = timed(decode, frame)
+
+    nodes = list(dag.nodes(data=True))
+    start = time.perf_counter()
+    node_frames = [encode_node(node) for node in nodes]
+    nodes_enc = time.perf_counter() - start
+    start = time.perf_counter()
+    for node_frame in node_frames:
+        decode_node(node_frame)
+    nodes_dec = time.perf_counter() - start
+
+    return (
+        (dag_enc, dag_dec, len(frame)),
+        (nodes_enc, nodes_dec, sum(len(f) for f in node_frames)),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000]
+    )
+    args = parser.parse_args()
+
+    formats = {
+        "dill": (dill.dumps, dill.loads, dill.dumps, dill.loads),
+        "wire": (
+            wire_format.encode_dag,
+            wire_format.decode_dag,
+            wire_format.encode_node,
+            wire_format.decode_node,
+        ),
+    }
+
+    header = (
+        f"{'size':>7} {'format':>6} {'dag enc (s)':>12} {'dag dec (s)':>12} "
+        f"{'dag bytes':>11} {'node enc (s)':>13} {'node dec (s)':>13} "
+        f"{'node bytes':>11}"
+    )
+    print(header)
+    for size in args.sizes:
+        dag = build_dag(size)
+        for name, funcs in formats.items():
+            (d_enc, d_dec, d_len), (n_enc, n_dec, n_len) = measure(dag, *funcs)
+            print(
+                f"{size:>7} {name:>6} {d_enc:>12.4f} {d_dec:>12.4f} {d_len:>11} "
+                f"{n_enc:>13.4f} {n_dec:>13.4f} {n_len:>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -38,6 +38,7 @@ def main():
             "--name",
             "oz",
         ],
+        outputs=[f"{curr_dir}/oz.json"],
         logger=logger,
         # Uncomment if running on M1 Mac.
         env_vars={"PATH": "${PATH}:/opt/homebrew/bin"},
@@ -54,11 +55,14 @@ def main():
             "--name",
             "gatsby",
         ],
+        outputs=[f"{curr_dir}/gatsby.json"],
         logger=logger,
         # Uncomment if running on M1 Mac.
         env_vars={"PATH": "${PATH}:/opt/homebrew/bin"},
     )
 
+    # The merge reads both count files, so it depends on the two wordcount
+    # activities, which are free to run at the same time.
     activity_3 = ShellActivity(
         name="Merge wordcounts",
         files=[f"{curr_dir}/oz.json", f"{curr_dir}/gatsby.json"],
@@ -3,13 +3,44 @@
 # This program is free software: you can redistribute it and/or modify
 # it under the terms of the MIT License.
 
-import importlib.metadata
+import importlib
 
-from .campaign import Activity, Campaign
-from .campaign.activities import ShellActivity, TransferActivity
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .campaign import Activity, Campaign
+    from .campaign.activities import ShellActivity, TransferActivity
 
 __author__ = "https://zambeze.org"
 __credits__ = "Oak Ridge National Laboratory"
-__version__ = importlib.metadata.version("zambeze")
 
 __all__ = ["Activity", "Campaign", "ShellActivity", "TransferActivity"]
+
+# The public API is imported on first access (PEP 562), so that importing
+# zambeze, e.g. for the command line interface, does not load networkx,
+# zmq, globus_sdk or sqlalchemy. __version__ is looked up on first access
+# too, since reading the package metadata is not free either.
+_LAZY_ATTRIBUTES = {
+    "Activity": ".campaign",
+    "Campaign": ".campaign",
+    "ShellActivity": ".campaign.activities",
+    "TransferActivity": ".campaign.activities",
+}
+
+
+def __getattr__(name: str):
+    if name == "__version__":
+        from importlib.metadata import version
+
+        value = version("zambeze")
+        globals()[name] = value
+        return value
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -6,6 +6,27 @@
 # This program is free software: you can redistribute it and/or modify
 # it under the terms of the MIT License.
 
-from .abstract_activity import Activity  # noqa: F401
-from .shell import ShellActivity  # noqa: F401
-from .transfer import TransferActivity  # noqa: F401
+import importlib
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .abstract_activity import Activity  # noqa: F401
+    from .shell import ShellActivity  # noqa: F401
+    from .transfer import TransferActivity  # noqa: F401
+
+_LAZY_ATTRIBUTES = {
+    "Activity": ".abstract_activity",
+    "ShellActivity": ".shell",
+    "TransferActivity": ".transfer",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -10,7 +10,7 @@ import logging
 
 from abc import ABC, abstractmethod
 from enum import Enum, auto
-from typing import Optional
+from typing import Optional, Union
 from datetime import datetime
 
 from zambeze.orchestration.message.abstract_message import AbstractMessage
@@ -37,6 +37,12 @@ class Activity(ABC):
     :type arguments: Optional[list[str]]
     :param logger: The logger where to log information/warning or errors.
     :type logger: Optional[logging.Logger]
+    :param depends_on: Activities (or their IDs) that must succeed before this
+        activity can run.
+    :type depends_on: Optional[list[Union[Activity, str]]]
+    :param outputs: Files written by this activity. Any activity in the same
+        campaign that lists one of them in ``files`` will depend on it.
+    :type outputs: Optional[list[str]]
     """
 
     files: list[str]
@@ -51,6 +57,27 @@ class Activity(ABC):
     source_file: Optional[str]
     dest_directory: Optional[str]
     override_existing: Optional[bool]
+    depends_on: list[str]
+    outputs: list[str]
+
+    # Attributes carried by the wire format (see to_dict and from_dict).
+    _WIRE_FIELDS = (
+        "name",
+        "files",
+        "command",
+        "arguments",
+        "campaign_id",
+        "origin_agent_id",
+        "running_agent_ids",
+        "message_id",
+        "activity_id",
+        "source_file",
+        "dest_directory",
+        "override_existing",
+        "submission_time",
+        "depends_on",
+        "outputs",
+    )
 
     def __init__(
         self,
@@ -68,6 +95,8 @@ class Activity(ABC):
         dest_directory: Optional[str] = None,
         override_existing: Optional[bool] = False,
         submission_time: Optional[str] = None,
+        depends_on: Optional[list[Union["Activity", str]]] = None,
+        outputs: Optional[list[str]] = None,
         **kwargs,
     ) -> None:
         self.running_agent_ids = (
@@ -89,6 +118,10 @@ class Activity(ABC):
         self.dest_directory = dest_directory
         self.override_existing = override_existing
         self.status: ActivityStatus = ActivityStatus.CREATED
+        self.depends_on = []
+        for activity in depends_on or []:
+            self.add_dependency(activity)
+        self.outputs = list(outputs) if outputs else []
         self.__dict__.update(kwargs)
 
         self.submission_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
@@ -125,6 +158,18 @@ class Activity(ABC):
         """
         self.arguments.append(arg)
 
+    def add_dependency(self, activity: Union["Activity", str]) -> None:
+        """Declare that this activity must wait for another one to succeed.
+
+        :param activity: The activity, or its activity ID, to depend on.
+        :type activity: Union[Activity, str]
+        """
+        activity_id = (
+            activity.activity_id if isinstance(activity, Activity) else activity
+        )
+        if activity_id not in self.depends_on:
+            self.depends_on.append(activity_id)
+
     def set_command(self, command: str) -> None:
         """Set the action's command.
 
@@ -141,6 +186,38 @@ class Activity(ABC):
         """
         return self.status
 
+    def to_dict(self) -> dict:
+        """Plain-data description of the activity, used by the wire format.
+
+        :return: The activity fields listed in ``_WIRE_FIELDS`` and its status.
+        :rtype: dict
+        """
+        data = {field: getattr(self, field, None) for field in self._WIRE_FIELDS}
+        data["status"] = self.status.name
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Activity":
+        """Rebuild an activity from the output of :meth:`to_dict`.
+
+        The constructor is bypassed so the activity keeps its original IDs and
+        submission time.
+
+        :param data: Activity fields.
+        :type data: dict
+        :return: The rebuilt activity.
+        :rtype: Activity
+        """
+        activity = cls.__new__(cls)
+        activity.logger = logging.getLogger(cls.__module__)
+        for field in cls._WIRE_FIELDS:
+            setattr(activity, field, data.get(field))
+        activity.running_agent_ids = activity.running_agent_ids or []
+        activity.depends_on = activity.depends_on or []
+        activity.outputs = activity.outputs or []
+        activity.status = ActivityStatus[data.get("status", "CREATED")]
+        return activity
+
     @abstractmethod
     def generate_message(self) -> AbstractMessage:
         raise NotImplementedError(
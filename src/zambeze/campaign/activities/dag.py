@@ -1,6 +1,7 @@
-import dill
 import networkx as nx
 
+from zambeze.orchestration.message import wire_format
+
 
 class DAG(nx.DiGraph):
     def __init__(self, **attr):
@@ -10,26 +11,26 @@ class DAG(nx.DiGraph):
         return nx.is_directed_acyclic_graph(self)
 
     def serialize_dag(self):
-        # Serialize the DAG to a file using dill
-        return dill.dumps(self)
+        # Serialize the DAG, its node data and edges to a wire format frame
+        return wire_format.encode_dag(self)
 
     @staticmethod
     def deserialize_dag(byte_data):
-        # Deserialize a DAG object from a file using dill
-        return dill.loads(byte_data)
+        # Deserialize a DAG object from a wire format frame
+        return wire_format.decode_dag(byte_data)
 
     def serialize_node(self, node):
-        # Serialize an individual node to a dill byte string
+        # Serialize an individual node to a wire format frame
         if node in self:
             node_data = self.nodes[node]
-            return dill.dumps((node, node_data))
+            return wire_format.encode_node((node, node_data))
         else:
             raise ValueError("Node does not exist in the DAG.")
 
     @staticmethod
     def deserialize_node(byte_data):
-        # Deserialize a node from a dill byte string and add it to the DAG
-        node = dill.loads(byte_data)
+        # Deserialize a (node_id, node_data) tuple from a wire format frame
+        node = wire_format.decode_node(byte_data)
         return node
 
     def update_node_relationships(self):
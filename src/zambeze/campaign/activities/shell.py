@@ -9,7 +9,7 @@ import logging
 import time
 import uuid
 
-from typing import Optional
+from typing import Optional, Union
 from .abstract_activity import Activity
 
 from zambeze.orchestration.message.abstract_message import AbstractMessage
@@ -33,6 +33,14 @@ class ShellActivity(Activity):
         string must be separated by a space.
     logger : Logger
         The logger where to log information/warning or errors.
+    depends_on : list, optional
+        Activities, or activity IDs, that must succeed before this one runs.
+    outputs : list, optional
+        Files written by this activity; activities reading them depend on it.
+    memoize : bool, optional
+        Reuse the recorded outputs of an earlier successful run of the same
+        command, arguments and environment on identical input files instead
+        of running it again. The outputs must all be listed in ``outputs``.
     """
 
     def __init__(
@@ -45,6 +53,9 @@ class ShellActivity(Activity):
         campaign_id: Optional[str] = None,
         origin_agent_id: Optional[str] = None,
         message_id: Optional[str] = None,
+        depends_on: Optional[list[Union[Activity, str]]] = None,
+        outputs: Optional[list[str]] = None,
+        memoize: bool = False,
         **kwargs,
     ) -> None:
         """Create an object of a unix shell activity."""
@@ -58,6 +69,8 @@ class ShellActivity(Activity):
             origin_agent_id,
             message_id,
             activity_id=str(uuid.uuid4()),
+            depends_on=depends_on,
+            outputs=outputs,
         )
         self.logger: logging.Logger = logger if logger else logging.getLogger(__name__)
         # Pull out environment variables, IF users submitted them.
@@ -71,8 +84,14 @@ class ShellActivity(Activity):
         self.logger.info("[activities/shell.py] Printing files after init in SHELL")
         self.logger.info(self.files)
         self.working_dir = ""
+        self.memoize = memoize
         self.type = "SHELL"
-        self.plugin_args = {
+        self.plugin_args = self._build_plugin_args()
+
+    _WIRE_FIELDS = Activity._WIRE_FIELDS + ("env_vars", "working_dir", "memoize")
+
+    def _build_plugin_args(self) -> dict:
+        return {
             "shell": "bash",
             "parameters": {
                 "command": self.command,
@@ -81,6 +100,16 @@ class ShellActivity(Activity):
             },
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "ShellActivity":
+        activity = super().from_dict(data)
+        activity.env_vars = activity.env_vars or {}
+        activity.working_dir = activity.working_dir or ""
+        activity.memoize = bool(activity.memoize)
+        activity.type = "SHELL"
+        activity.plugin_args = activity._build_plugin_args()
+        return activity
+
     def generate_message(self) -> AbstractMessage:
         factory = MessageFactory(logger=self.logger)
         template = factory.create_template(
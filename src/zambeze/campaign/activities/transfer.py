@@ -8,7 +8,14 @@ from zambeze.orchestration.zambeze_types import MessageType, ActivityType
 
 
 class TransferActivity(Activity):
-    def __init__(self, name, source_file, dest_directory, override_existing=False):
+    def __init__(
+        self,
+        name,
+        source_file,
+        dest_directory,
+        override_existing=False,
+        depends_on=None,
+    ):
         self.name = name
         self.source_file = source_file
         self.dest_directory = dest_directory
@@ -20,6 +27,7 @@ class TransferActivity(Activity):
             source_file=self.source_file,
             dest_directory=self.dest_directory,
             override_existing=self.override_existing,
+            depends_on=depends_on,
         )
 
     def generate_message(self) -> AbstractMessage:
@@ -4,14 +4,16 @@
 # it under the terms of the MIT License.
 
 import logging
-import zmq
+import os
 import uuid
 
 from typing import Optional
+from urllib.parse import urlparse
 from .activities.abstract_activity import Activity
-from .activities.dag import DAG
-from zambeze.settings import ZambezeSettings
-from zambeze.auth.globus_auth import GlobusAuthenticator
+from zambeze.settings import get_client_settings
+
+# networkx, zmq and globus_sdk are imported where they are used, since
+# building a campaign does not need them until it is dispatched.
 
 
 class Campaign:
@@ -69,28 +71,70 @@ class Campaign:
 
         self.activities.append(activity)
 
+    @staticmethod
+    def _file_key(file_uri: str) -> str:
+        """Normalize a file URI so activity outputs can be matched to inputs."""
+        parsed = urlparse(file_uri)
+        if parsed.scheme in ("", "file", "local"):
+            return os.path.normpath(parsed.path)
+        return file_uri
+
+    def _activity_predecessors(self, activity: Activity, producers: dict) -> list:
+        """Collect the IDs of the activities that must succeed before ``activity``.
+
+        Parameters
+        ----------
+        activity : Activity
+            The activity whose predecessors are collected.
+        producers : dict
+            Normalized output file -> ID of the activity that writes it.
+
+        Returns
+        -------
+        list
+            Explicit dependencies followed by the producers of input files.
+        """
+        predecessors = list(activity.depends_on)
+        for file_uri in activity.files or []:
+            producer_id = producers.get(self._file_key(file_uri))
+            if (
+                producer_id is not None
+                and producer_id != activity.activity_id
+                and producer_id not in predecessors
+            ):
+                predecessors.append(producer_id)
+        return predecessors
+
     def _pack_dag_for_dispatch(self):
         """Package the graph in a way that is amenable to send to the
         Zambeze activity queues.
+
+        Edges only come from real dependencies: the ``depends_on`` list of each
+        activity and matches between an activity's ``outputs`` and another
+        activity's input ``files``. Activities without predecessors hang off
+        the MONITOR node and activities without successors feed the
+        TERMINATOR node, so independent branches can run at the same time.
         """
-        # Create a DAG to organize activities
-        last_activity = None
+        from .activities.dag import DAG
+
         token_obj = {}
 
         dag = DAG()
         if self.needs_globus_login or self.force_login:
+            from zambeze.auth.globus_auth import GlobusAuthenticator
+
             authenticator = GlobusAuthenticator()
             access_token = authenticator.check_tokens_and_authenticate(
                 force_login=self.force_login
             )
             token_obj["globus"] = {"access_token": access_token}
 
+        dag.add_node("MONITOR", activity="MONITOR", campaign_id=self.campaign_id)
+
+        producers = {}
         for activity in self.activities:
-            if last_activity is None:
-                last_activity = "MONITOR"
-                dag.add_node(
-                    "MONITOR", activity="MONITOR", campaign_id=self.campaign_id
-                )
+            for output in activity.outputs:
+                producers[self._file_key(output)] = activity.activity_id
 
             transfer_params = {}
 
@@ -109,12 +153,31 @@ class Campaign:
                 transfer_params=transfer_params,
             )
 
-            dag.add_edge(last_activity, activity.activity_id)
-            last_activity = activity.activity_id
+        for activity in self.activities:
+            predecessors = self._activity_predecessors(activity, producers)
+            for pred_id in predecessors:
+                if pred_id not in dag or pred_id in ("MONITOR", "TERMINATOR"):
+                    raise ValueError(
+                        f"Activity {activity.activity_id} depends on {pred_id}, "
+                        "which is not an activity of this campaign."
+                    )
+                dag.add_edge(pred_id, activity.activity_id)
+
+            if not predecessors:
+                dag.add_edge("MONITOR", activity.activity_id)
 
-        # Add the terminator node
+        # Add the terminator node after every activity that nothing depends on.
         dag.add_node("TERMINATOR", activity="TERMINATOR", campaign_id=self.campaign_id)
-        dag.add_edge(last_activity, "TERMINATOR")
+        sinks = [
+            activity.activity_id
+            for activity in self.activities
+            if dag.out_degree(activity.activity_id) == 0
+        ]
+        for activity_id in sinks or ["MONITOR"]:
+            dag.add_edge(activity_id, "TERMINATOR")
+
+        if not dag.validate_dag():
+            raise ValueError(f"Campaign {self.name} has a dependency cycle.")
 
         # Adds predecessors and successors to nodes.
         dag.update_node_relationships()
@@ -138,15 +201,23 @@ class Campaign:
               the expected time frame. It suggests possible actions to resolve such issues.
         """
         self._logger.info(f"Number of activities to dispatch: {len(self.activities)}")
+        settings = get_client_settings()
+        if "port" not in settings["zmq"]:
+            self._logger.error(
+                "No Zambeze agent port found in the settings. After installing"
+                ' Zambeze, you may start your agent with "zambeze agent start"'
+                " and dispatch again."
+            )
+            return
+
+        import zmq
+
         zmq_context = zmq.Context()
         zmq_socket = zmq_context.socket(zmq.REQ)
         zmq_socket.setsockopt(zmq.SNDTIMEO, 5000)
         zmq_socket.setsockopt(zmq.RCVTIMEO, 5000)
         zmq_socket.setsockopt(zmq.LINGER, 0)  # Do not linger on close
-        settings = ZambezeSettings()
-        zmq_socket.connect(
-            f"tcp://{settings.settings['zmq']['host']}:{settings.settings['zmq']['port']}"
-        )
+        zmq_socket.connect(f"tcp://{settings['zmq']['host']}:{settings['zmq']['port']}")
 
         dag = self._pack_dag_for_dispatch()
         serial_dag = dag.serialize_dag()
@@ -9,10 +9,8 @@ import logging
 import os
 import pathlib
 import subprocess
-import time
 
 from datetime import datetime
-from importlib.metadata import version
 from signal import SIGKILL
 
 
@@ -74,7 +72,20 @@ def _valid_follow(state, new_state):
     return False, None
 
 
-def start():
+class _VersionAction(argparse.Action):
+    """Print the installed zambeze version, reading the package metadata
+    only when asked for it."""
+
+    def __init__(self, option_strings, dest, **kwargs):
+        super().__init__(option_strings, dest, nargs=0, **kwargs)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from importlib.metadata import version
+
+        parser.exit(message=f"{version('zambeze')}\n")
+
+
+def start(agent_mode="threaded"):
     """
     Start Zambeze agent as its own daemonized subprocess. This will write logs
     to a user's ~/.zambeze directory and automatically select ports for both
@@ -117,7 +128,14 @@ def start():
     devnull = open(os.devnull, "wb")
 
     # Open the subprocess and save the process state to file (for future access).
-    arg_list = ["zambeze-agent", "--log-path", str(log_path), "--debug"]
+    arg_list = [
+        "zambeze-agent",
+        "--log-path",
+        str(log_path),
+        "--debug",
+        "--mode",
+        agent_mode,
+    ]
     proc = subprocess.Popen(arg_list, stdout=devnull, stderr=devnull)
     logger.info(f"Started agent with PID: {proc.pid}")
 
@@ -193,7 +211,7 @@ def status():
     logger.info(f"Agent status is {old_state['status']}")
 
 
-def logs(mode, num_lines, follow=False):
+def logs(mode, num_lines, follow=False, log_filter=None, use_index=False):
     """Provide logging information of the agent.
 
     Parameters
@@ -204,7 +222,13 @@ def logs(mode, num_lines, follow=False):
         Number of lines to display.
     follow : bool
         Boolean whether to follow the log file. Available only in the 'tail' mode.
+    log_filter : LogFilter, optional
+        Campaign ID, activity ID and/or lowest level of the records to display.
+    use_index : bool
+        Boolean whether to build and use the sidecar offset index of the log
+        file to look up campaign and activity IDs.
     """
+    from zambeze.utils.log_query import LogFilter, query
 
     # Head mode does not support following logs
     if mode == "head" and follow:
@@ -218,68 +242,79 @@ def logs(mode, num_lines, follow=False):
 
     with state_path.open("r") as sf:
         state = json.load(sf)
-        state["mtime"] = state_path.stat().st_mtime
 
-        log_file, err_msg = _get_log_file(state.get("log_path"))
-        if err_msg:
-            logger.error(err_msg)
-            return
+    log_file, err_msg = _get_log_file(state.get("log_path"))
+    if err_msg:
+        logger.error(err_msg)
+        return
 
-        if mode == "tail":
-            state["log_handle"] = lf = open(log_file, "rb")
-            # Seek to the end of the file and read the last `num_lines` lines going backwards.
-            # Uses a new line character as a delimiter to count the number of lines seen so far.
-            lf.seek(0, os.SEEK_END)
-            end = curr = lf.tell()
-            seen_lines = 0
-            while curr >= 0 and seen_lines < num_lines:
-                lf.seek(curr, os.SEEK_SET)
-                char = lf.read(1)
-                if char == b"\n" and curr != end - 1:
-                    seen_lines += 1
-                curr -= 1
-
-            if curr < 0:
-                lf.seek(0, os.SEEK_SET)
-
-            for line in lf:
-                print(line.decode().strip())
-
-            # If follow is set, keep reading the log file for new lines. Upon agent restarts,
-            # follow the new log file if the log path has changed
-            if follow:
-                try:
-                    while True:
-                        mstate_mtime = state_path.stat().st_mtime
-                        if mstate_mtime > state["mtime"]:
-                            sf.seek(0, os.SEEK_SET)
-                            mstate = json.load(sf)
-                            state["mtime"] = mstate_mtime
-
-                            path_change, err_msg = _valid_follow(state, mstate)
-                            if err_msg:
-                                logger.error(err_msg)
-                                break
-                            if path_change:
-                                lf = state["log_handle"]
-
-                        line = lf.readline()
-                        if not line:
-                            time.sleep(0.1)
-                        else:
-                            print(line.decode().strip())
-                except KeyboardInterrupt:
-                    print()
-
-            lf.close()
-        else:
-            # Display the first `num_lines` lines of the log file
-            with open(log_file, "r") as lf:
-                for _ in range(num_lines):
-                    line = lf.readline()
-                    if not line:
-                        break
-                    print(line.strip())
+    log_filter = log_filter or LogFilter()
+    for line in query(log_file, num_lines, mode, log_filter, use_index):
+        print(line)
+
+    # If follow is set, keep reading the log file for new lines. Upon agent restarts,
+    # follow the new log file if the log path has changed
+    if follow:
+        state["log_handle"] = open(log_file, "rb")
+        state["log_handle"].seek(0, os.SEEK_END)
+        try:
+            _follow(state_path, state, log_filter)
+        except KeyboardInterrupt:
+            print()
+        finally:
+            state["log_handle"].close()
+
+
+def _follow(state_path, state, log_filter):
+    """Print the records appended to the agent's log until interrupted.
+
+    Sleeps until the log file or the agent's state changes, using inotify
+    where it is available and polling otherwise.
+
+    Parameters
+    ----------
+    state_path : pathlib.Path
+        Path of the agent's state file.
+    state : dict
+        The current state of the agent, with the handle of the followed log.
+    log_filter : LogFilter
+        Records to display.
+    """
+    from zambeze.utils.log_query import FileWatcher
+
+    watcher = FileWatcher([state["log_path"], state_path])
+    partial = b""
+    try:
+        while True:
+            line = state["log_handle"].readline()
+            if line.endswith(b"\n"):
+                line, partial = partial + line, b""
+                if log_filter.matches(line):
+                    print(line.decode(errors="replace").rstrip("\n"))
+                continue
+            # Keep a line still being written until it is complete.
+            partial += line
+
+            changed = watcher.wait(timeout=1.0)
+            if state_path.absolute() not in changed:
+                continue
+            try:
+                with state_path.open("r") as sf:
+                    new_state = json.load(sf)
+            except ValueError:
+                # Caught the state halfway through a write.
+                continue
+            old_path = state["log_path"]
+            path_change, err_msg = _valid_follow(state, new_state)
+            if err_msg:
+                logger.error(err_msg)
+                break
+            if path_change:
+                partial = b""
+                watcher.discard(old_path)
+                watcher.add(state["log_path"])
+    finally:
+        watcher.close()
 
 
 def main():
@@ -291,7 +326,13 @@ def main():
     parser = argparse.ArgumentParser(description="Zambeze command line interface")
     subparsers = parser.add_subparsers(dest="command")
 
-    subparsers.add_parser("start", help="Start the agent")
+    start_parser = subparsers.add_parser("start", help="Start the agent")
+    start_parser.add_argument(
+        "--agent-mode",
+        choices=["threaded", "async"],
+        default="threaded",
+        help="Agent core to run (default: threaded)",
+    )
     subparsers.add_parser("stop", help="Stop the agent")
     subparsers.add_parser("status", help="Check the status of the agent")
     logs_parser = subparsers.add_parser("logs", help="View logs of the agent")
@@ -313,9 +354,33 @@ def main():
         action="store_true",
         help="Follow the log file",
     )
+    logs_parser.add_argument(
+        "--campaign",
+        help="Only display the records mentioning this campaign ID",
+    )
+    logs_parser.add_argument(
+        "--activity",
+        help="Only display the records mentioning this activity ID",
+    )
+    logs_parser.add_argument(
+        "--level",
+        type=str.upper,
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        help="Only display the records at this level or above",
+    )
+    logs_parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Look IDs up in an offset index kept next to the log file",
+    )
 
     parser.add_argument("-c", "--config", action="store_true", help="blah blah")
-    parser.add_argument("-v", "--version", action="version", version=version("zambeze"))
+    parser.add_argument(
+        "-v",
+        "--version",
+        action=_VersionAction,
+        help="show program's version number and exit",
+    )
     args = parser.parse_args()
 
     # Configure logging
@@ -331,12 +396,15 @@ def main():
 
     # Handle commands
     if args.command == "start":
-        start()
+        start(args.agent_mode)
     elif args.command == "stop":
         stop()
     elif args.command == "status":
         status()
     elif args.command == "logs":
-        logs(args.mode, args.numlines, args.follow)
+        from zambeze.utils.log_query import LogFilter
+
+        log_filter = LogFilter(args.campaign, args.activity, args.level)
+        logs(args.mode, args.numlines, args.follow, log_filter, args.index)
     else:
         print("Use \33[32mzambeze --help\33[0m for zambeze agent commands")
@@ -7,41 +7,49 @@ import argparse
 import logging
 import pathlib
 
-from zambeze.orchestration.agent.agent import Agent
 
-
-def run_agent(log_path, debug):
+def run_agent(log_path, debug, mode="threaded", log_format="json"):
     """
     Run the zambeze agent.
+
+    :param mode: "threaded" for the RabbitMQ agent, "async" for the
+        single event loop agent on NATS.
+    :type mode: str
+    :param log_format: "json" for one JSON record per line, or "text".
+    :type log_format: str
     """
+    from zambeze.utils.structured_log import start_logging
 
     # Path for config files
     config_path = pathlib.Path.home().joinpath(".zambeze").joinpath("agent.yaml")
 
-    # Configure logging
+    # Configure logging; records are written by a background thread.
     agent_logger = logging.getLogger(__name__)
-    fh = logging.FileHandler(log_path)
-
-    fmt = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    fh.setFormatter(fmt)
+    start_logging(
+        agent_logger,
+        log_path,
+        level=logging.DEBUG if debug else logging.INFO,
+        log_format=log_format,
+    )
 
-    if debug:
-        agent_logger.setLevel(logging.DEBUG)
-    else:
-        agent_logger.setLevel(logging.INFO)
+    agent_logger.info(
+        "Creating Zambeze agent subprocess with log path %s, config path %s, "
+        "debug logs %s, agent mode %s",
+        log_path,
+        config_path,
+        debug,
+        mode,
+    )
 
-    agent_logger.addHandler(fh)
+    # Create an agent
+    if mode == "async":
+        from zambeze.orchestration.agent.async_agent import AsyncAgent
 
-    agent_logger.info("*****************************************************")
-    agent_logger.info("Creating Zambeze agent subprocess with configuration:")
-    agent_logger.info("*****************************************************")
-    agent_logger.info(f"Log Path:     {log_path}")
-    agent_logger.info(f"Config Path:  {config_path}")
-    agent_logger.info(f"Debug Logs:   {debug}")
-    agent_logger.info("*****************************************************")
+        AsyncAgent(conf_file=config_path, logger=agent_logger).run()
+    else:
+        from zambeze.orchestration.agent.agent import Agent
 
-    # Create an agent
-    Agent(conf_file=config_path, logger=agent_logger)
+        Agent(conf_file=config_path, logger=agent_logger)
 
 
 def main():
@@ -55,9 +63,21 @@ def main():
     parser.add_argument(
         "-d", "--debug", action="store_true", help="enable debug log level"
     )
+    parser.add_argument(
+        "--mode",
+        choices=["threaded", "async"],
+        default="threaded",
+        help="agent core: threads over RabbitMQ or one asyncio loop over NATS",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=["json", "text"],
+        default="json",
+        help="write one JSON record per line (default) or plain text lines",
+    )
     args = parser.parse_args()
 
     # Get args from command line and run zambeze agent
     log_path = args.log_path
     debug = args.debug
-    run_agent(log_path, debug)
+    run_agent(log_path, debug, args.mode, args.log_format)
@@ -11,6 +11,10 @@ HOST = os.getenv("HOST", "127.0.0.1")
 RABBIT_HOST = os.getenv("RABBIT_HOST", "127.0.0.1")
 RABBIT_PORT = int(os.getenv("RABBIT_PORT", 5672))
 
+# Hostname and port of the NATS server (used by the asyncio agent)
+NATS_HOST = os.getenv("NATS_HOST", "127.0.0.1")
+NATS_PORT = int(os.getenv("NATS_PORT", 4222))
+
 # PATHS
 SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_DIR = os.path.realpath(os.path.join(SOURCE_DIR, ".."))
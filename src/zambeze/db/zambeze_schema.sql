@@ -7,10 +7,28 @@ CREATE TABLE IF NOT EXISTS activity (
     created_at INTEGER NOT NULL,
     started_at INTEGER,
     ended_at INTEGER,
-    -- campaign_id TEXT NOT NULL, 
     -- depends_on TEXT NOT NULL, -- list of other activity_id's?
     -- user_id INTEGER,
-    params TEXT -- JSON object?
-    
+    params TEXT, -- JSON object?
+    campaign_id TEXT,
+    activity_uuid TEXT, -- activity ID used in the campaign DAG
+    status TEXT, -- QUEUED, RUNNING, SUCCEEDED or FAILED
+    queued_at INTEGER
 
 );
+
+-- DAG nodes an agent accepted and has not finished, to resume after a crash.
+CREATE TABLE IF NOT EXISTS checkpoint (
+
+    campaign_id TEXT NOT NULL,
+    node_id TEXT NOT NULL, -- activity ID, or MONITOR
+    node BLOB NOT NULL, -- wire format DAG node
+    PRIMARY KEY (campaign_id, node_id)
+
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS activity_uuid_idx ON activity (activity_uuid);
+
+CREATE INDEX IF NOT EXISTS activity_campaign_idx ON activity (campaign_id);
+
+CREATE INDEX IF NOT EXISTS activity_status_idx ON activity (status);
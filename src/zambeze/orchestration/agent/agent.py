@@ -16,6 +16,7 @@ from zambeze.orchestration.agent.message_handler import MessageHandler
 from zambeze.orchestration.db.dao.activity_dao import ActivityDAO
 from zambeze.orchestration.executor import Executor
 from zambeze.settings import ZambezeSettings
+from zambeze.utils.structured_log import event
 
 
 class Agent:
@@ -51,6 +52,9 @@ class Agent:
         )
         self._msg_handler_thd = self._init_message_handler()
 
+        # Pick up the campaigns that were in flight when the agent stopped.
+        self._executor.recover()
+
         self._start_thread(self.recv_activity_process_thd, name="ActivitySorterThread")
         self._start_thread(self.send_control_thd, name="ControlSenderThread")
         self._start_thread(self.recv_control_thd, name="ControlReceiverThread")
@@ -106,7 +110,13 @@ class Agent:
             try:
                 # Retrieve an activity from the message handler's activity queue.
                 activ_to_sort = self._msg_handler_thd.check_activity_q.get()
-                self._logger.info(f"[agent] Received activity: {activ_to_sort}")
+                self._logger.debug(
+                    "[agent] Received activity %s",
+                    activ_to_sort[0],
+                    extra=event(
+                        "sorted", activ_to_sort[1].get("campaign_id"), activ_to_sort[0]
+                    ),
+                )
 
                 # Place the activity into the executor's processing queue.
                 self._executor.to_process_q.put(activ_to_sort)
@@ -130,31 +140,25 @@ class Agent:
             try:
                 # Retrieve a control message from the message handler's control queue.
                 control_to_sort = self._msg_handler_thd.recv_control_q.get()
-                self._logger.info(
-                    f"[agent] Received control message: {control_to_sort}"
+                self._logger.debug(
+                    "[agent] Received %s of activity %s",
+                    control_to_sort.get("status"),
+                    control_to_sort.get("activity_id"),
+                    extra=event(
+                        "status",
+                        control_to_sort.get("campaign_id"),
+                        control_to_sort.get("activity_id"),
+                    ),
                 )
 
-                # TEMPORARY: update local dict for non-MONITOR / non-TERMINATOR controls
-                activity_id = control_to_sort["activity_id"]
-                if activity_id not in self._executor.control_dict:
-                    self._executor.control_dict[activity_id] = dict()
-
-                self._executor.control_dict[activity_id]["status"] = control_to_sort[
-                    "status"
-                ]
-                # ************************************************
-
                 # The control message needs to be processed in two places:
-                # 1. If there is an executor monitor, it may need the control message.
-                if self._executor.monitor is not None:
-                    self._executor.monitor.to_monitor_q.put(control_to_sort)
-                    self._logger.debug(
-                        "[agent] Put control message into monitor queue."
-                    )
-
-                # 2. The executor itself may need the control message.
-                self._executor.incoming_control_q.put(control_to_sort)
-                self._logger.debug("[agent] Put control message into executor queue.")
+                # 1. The monitor service routes it to its campaign, if any.
+                self._executor.monitor.to_monitor_q.put(control_to_sort)
+                self._logger.debug("[agent] Put control message into monitor queue.")
+
+                # 2. The executor releases activities whose predecessors are met.
+                self._executor.update_status(control_to_sort)
+                self._logger.debug("[agent] Updated executor dependency tracker.")
 
             except Exception as e:
                 self._logger.error(
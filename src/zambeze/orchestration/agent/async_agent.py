@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+import asyncio
+import logging
+import os
+import pathlib
+
+from typing import Optional
+from uuid import uuid4
+
+import zmq
+import zmq.asyncio
+
+from zambeze.campaign.activities.dag import DAG
+from zambeze.orchestration.db.activity_store import get_activity_store, now_ms
+from zambeze.orchestration.dependency_tracker import DependencyTracker
+from zambeze.orchestration.executor import start_staging
+from zambeze.orchestration.monitor import CampaignMonitor
+from zambeze.orchestration.plugin_modules.shell.shell import merge_env_variables
+from zambeze.orchestration.queue.queue_exceptions import QueueTimeoutException
+from zambeze.orchestration.queue.queue_factory import QueueFactory
+from zambeze.orchestration.zambeze_types import ChannelType, QueueType
+from zambeze.settings import ZambezeSettings
+
+from .temp_activity_to_plugin_map import plugin_for_node
+
+# NATS queue group shared by all agents: each activity goes to one of them.
+AGENT_QUEUE_GROUP = "zambeze-agents"
+
+
+def activity_subject(plugin_name: Optional[str] = None) -> str:
+    """NATS subject for activities run by ``plugin_name``.
+
+    Without a plugin name this is the shared subject for activities any
+    agent can run (MONITOR, TERMINATOR, ...).
+    """
+    if plugin_name is None:
+        return ChannelType.ACTIVITY.value
+    return f"{ChannelType.ACTIVITY.value}.{plugin_name.lower()}"
+
+
+class AsyncAgent:
+    """
+    A distributed Agent that runs on a single asyncio event loop.
+
+    Campaign intake over ZMQ, consuming and publishing on NATS, monitor
+    heartbeats and activity execution are all coroutines on one loop, so
+    messages are handed over by awaiting instead of through ``queue.Queue``
+    objects polled by dedicated threads. Shell activities run as asyncio
+    subprocesses; blocking work (file staging, non-shell plugins) is pushed
+    to the loop's default thread pool, Globus transfers are awaited through
+    the shared transfer tracker and the activity lifecycle is written to the
+    local database behind the loop's back by the activity store.
+
+    Activities are consumed through a NATS queue group on the shared
+    activity subject and on one subject per configured plugin. Status and
+    control messages are published on the STATUS subject, which every agent
+    receives.
+
+    Args:
+        conf_file (Optional[pathlib.Path]): Path to the configuration file.
+        logger (Optional[logging.Logger]): Logger object for logging messages.
+    """
+
+    # Seconds between MONITOR heartbeats.
+    monitor_hb_s = 5
+
+    def __init__(
+        self, conf_file: Optional[pathlib.Path], logger: Optional[logging.Logger] = None
+    ):
+        self._logger = logger or logging.getLogger(__name__)
+
+        self._agent_id = str(uuid4())
+        self._settings = ZambezeSettings(conf_file=conf_file, logger=self._logger)
+        self._store = get_activity_store(
+            self._settings, agent_id=self._agent_id, logger=self._logger
+        )
+
+        self._queue = QueueFactory(logger=self._logger).create(
+            QueueType.NATS,
+            {
+                "ip": self._settings.settings["nats"]["host"],
+                "port": self._settings.settings["nats"]["port"],
+            },
+        )
+
+        self._tracker = DependencyTracker(
+            on_ready=self._on_ready, on_failed=self._on_failed, logger=self._logger
+        )
+        self._max_workers = self._settings.settings["executor"]["max_workers"]
+        self._slots = None
+
+        # campaign_id -> (CampaignMonitor, event set once it completed)
+        self._monitors = {}
+        # Strong references to fire-and-forget tasks.
+        self._tasks = set()
+
+    def run(self) -> None:
+        """Run the agent until it is interrupted."""
+        asyncio.run(self.main())
+
+    async def main(self) -> None:
+        connected, msg = await self._queue.connect()
+        self._logger.info(f"[async-agent] {msg}")
+        if not connected:
+            return
+
+        self._slots = asyncio.Semaphore(self._max_workers)
+        self._chdir_working_directory()
+
+        subjects = [activity_subject()] + [
+            activity_subject(plugin) for plugin in self._settings.plugins.configured
+        ]
+        for subject in subjects:
+            await self._queue.subscribe(subject, queue=AGENT_QUEUE_GROUP)
+        await self._queue.subscribe(ChannelType.STATUS)
+        self._logger.info(f"[async-agent] Consuming activities from: {subjects}")
+
+        context = zmq.asyncio.Context()
+        socket = context.socket(zmq.REP)
+        port = socket.bind_to_random_port("tcp://*", min_port=60000, max_port=65000)
+        self._settings.settings["zmq"]["port"] = port
+        self._settings.flush()
+        self._logger.info(f"[async-agent] Advertised port in agent.yaml file: {port}")
+
+        try:
+            await asyncio.gather(
+                self._recv_dag_from_campaign(socket),
+                self._consume(ChannelType.STATUS, self._handle_control),
+                *[self._consume(s, self._handle_activity) for s in subjects],
+            )
+        finally:
+            socket.close()
+            context.term()
+            await self._queue.close()
+
+    def _chdir_working_directory(self) -> None:
+        working_dir = self._settings.settings["plugins"]["All"][
+            "default_working_directory"
+        ]
+        os.makedirs(working_dir, exist_ok=True)
+        os.chdir(working_dir)
+        self._logger.info(f"[async-agent] Moved to working directory {working_dir}")
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # ------------------------------------------------------------------ #
+    # Intake and consumers
+    # ------------------------------------------------------------------ #
+    async def _recv_dag_from_campaign(self, socket) -> None:
+        """Receive campaign DAGs over ZMQ and publish every node."""
+        while True:
+            dag_bytestring = await socket.recv()
+            await socket.send(b"Notification of activity-dag receipt by ZMQ...")
+            activity_dag = DAG.deserialize_dag(dag_bytestring)
+
+            for activity_id, node_data in activity_dag.nodes(data=True):
+                if activity_id == "MONITOR":
+                    node_data["all_activity_ids"] = activity_dag.get_node_ids()
+                elif activity_id != "TERMINATOR":
+                    node_data["activity"].origin_agent_id = self._agent_id
+                    node_data["activity_status"] = "SUBMITTED"
+                    self._store.record(
+                        activity_id,
+                        node_data["campaign_id"],
+                        "SUBMITTED",
+                        queued_at=now_ms(),
+                    )
+
+                dag_msg = (activity_id, node_data)
+                await self._queue.send(
+                    activity_subject(plugin_for_node(dag_msg)), dag_msg
+                )
+
+            self._logger.info(
+                f"[async-agent] Published {activity_dag.number_of_nodes()} "
+                "activities for campaign."
+            )
+
+    async def _consume(self, subject, handler) -> None:
+        while True:
+            try:
+                msg = await self._queue.next_msg(subject)
+            except QueueTimeoutException:
+                continue
+            except Exception as e:
+                self._logger.error(f"[async-agent] Unable to read from {subject}: {e}")
+                await asyncio.sleep(1)
+                continue
+            try:
+                await handler(msg)
+            except Exception as e:
+                self._logger.exception(
+                    f"[async-agent] Error handling message on {subject}: {e}"
+                )
+
+    async def _handle_activity(self, dag_msg: tuple) -> None:
+        activity_id = dag_msg[0]
+        self._logger.info(f"[async-agent] Received activity: {activity_id}")
+        if activity_id == "MONITOR":
+            self._spawn(self._monitor(dag_msg))
+        elif activity_id == "TERMINATOR":
+            # TERMINATOR ALWAYS SUCCEEDS.
+            await self._send_status(
+                dag_msg, "SUCCEEDED", "TERMINATION CONDITION ACTIVATED."
+            )
+        else:
+            self._store.record(
+                activity_id, dag_msg[1]["campaign_id"], "QUEUED", queued_at=now_ms()
+            )
+            self._tracker.add(dag_msg)
+
+    async def _handle_control(self, control_msg: dict) -> None:
+        self._logger.debug(f"[async-agent] Received control message: {control_msg}")
+        monitor = self._monitors.get(control_msg.get("campaign_id"))
+        if monitor is not None:
+            campaign, done = monitor
+            if campaign.update(control_msg) and campaign.completed:
+                done.set()
+        self._tracker.update(control_msg)
+
+    # ------------------------------------------------------------------ #
+    # Monitor and execution
+    # ------------------------------------------------------------------ #
+    async def _monitor(self, dag_msg: tuple) -> None:
+        """Send MONITOR heartbeats until every activity of the campaign ended."""
+        campaign = CampaignMonitor(dag_msg)
+        done = asyncio.Event()
+        if campaign.completed:
+            done.set()
+        self._monitors[campaign.campaign_id] = (campaign, done)
+        self._logger.info(f"[async-agent] Monitoring campaign {campaign.campaign_id}")
+
+        try:
+            while not done.is_set():
+                await self._queue.send(ChannelType.STATUS, campaign.heartbeat())
+                try:
+                    await asyncio.wait_for(done.wait(), self.monitor_hb_s)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            del self._monitors[campaign.campaign_id]
+        self._logger.info(
+            f"[async-agent] Campaign {campaign.campaign_id} completed: "
+            f"{dict(campaign.status_counts)}"
+        )
+
+    def _on_ready(self, dag_msg: tuple) -> None:
+        self._spawn(self._run_activity(dag_msg))
+
+    def _on_failed(self, dag_msg: tuple, failed_pred_id: str) -> None:
+        self._logger.error(
+            f"[async-agent] Skipping {dag_msg[0]}: predecessor {failed_pred_id} failed."
+        )
+        self._spawn(
+            self._send_status(
+                dag_msg, "FAILED", "PREDECESSOR FAILED.", details=failed_pred_id
+            )
+        )
+
+    async def _run_activity(self, dag_msg: tuple) -> None:
+        activity = dag_msg[1]["activity"]
+        loop = asyncio.get_running_loop()
+        self._store.record(
+            dag_msg[0], dag_msg[1]["campaign_id"], "RUNNING", started_at=now_ms()
+        )
+
+        # Transfers are awaited without holding an execution slot.
+        if activity.files:
+            try:
+                future = await loop.run_in_executor(
+                    None,
+                    start_staging,
+                    activity.files,
+                    self._agent_id,
+                    self._settings,
+                    self._logger,
+                    dag_msg[1].get("transfer_tokens"),
+                )
+                if future is not None:
+                    # Completed by the transfer tracker thread.
+                    await asyncio.wrap_future(future)
+            except Exception as e:
+                self._logger.error(f"[async-agent] Unable to acquire files: {e}")
+                await self._send_status(
+                    dag_msg, "FAILED", "UNABLE TO ACQUIRE FILES.", details=e
+                )
+                return
+
+        async with self._slots:
+            try:
+                if getattr(activity, "type", "").upper() == "SHELL":
+                    returncode = await self._run_shell(activity)
+                    if returncode != 0:
+                        await self._send_status(
+                            dag_msg,
+                            "FAILED",
+                            "SHELL COMMAND EXITED WITH NONZERO STATUS.",
+                            details=returncode,
+                        )
+                        return
+                else:
+                    await loop.run_in_executor(
+                        None, self._settings.plugins.run, activity
+                    )
+            except Exception as e:
+                self._logger.error(f"[async-agent] Activity {dag_msg[0]} failed: {e}")
+                await self._send_status(
+                    dag_msg, "FAILED", "ACTIVITY RAISED AN EXCEPTION.", details=e
+                )
+                return
+
+        await self._send_status(
+            dag_msg, "SUCCEEDED", "SUCCESSFULLY COMPLETED TASK.", result=None
+        )
+
+    async def _run_shell(self, activity) -> int:
+        """Run a shell activity as an asyncio subprocess; return its exit code."""
+        params = activity.plugin_args["parameters"]
+        shell_cmd = " ".join([params["command"]] + list(params["args"]))
+
+        env = os.environ.copy()
+        if params["env_vars"]:
+            env = merge_env_variables(env, dict(params["env_vars"]))
+
+        self._logger.debug(f"[async-agent] Running SHELL command: {shell_cmd}")
+        proc = await asyncio.create_subprocess_shell(shell_cmd, env=env)
+        return await proc.wait()
+
+    async def _send_status(
+        self, dag_msg: tuple, status: str, msg: str, **extra
+    ) -> None:
+        status_msg = {
+            "status": status,
+            "activity_id": dag_msg[0],
+            "campaign_id": dag_msg[1]["campaign_id"],
+            "msg": msg,
+            **extra,
+        }
+        await self._queue.send(ChannelType.STATUS, status_msg)
+        if dag_msg[0] != "TERMINATOR":
+            self._store.record(
+                dag_msg[0], status_msg["campaign_id"], status, ended_at=now_ms()
+            )
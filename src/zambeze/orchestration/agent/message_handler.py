@@ -1,17 +1,23 @@
-import pickle
+import functools
 import threading
-import time
 import zmq
 
 from queue import Queue
 
-from zambeze.orchestration.db.model.activity_model import ActivityModel
-from zambeze.orchestration.db.dao.activity_dao import ActivityDAO
+from zambeze.orchestration.message import wire_format
+from zambeze.orchestration.db.activity_store import get_activity_store, now_ms
 from zambeze.orchestration.queue.queue_factory import QueueFactory
+from zambeze.orchestration.queue.queue_publisher import RMQPublisher
+from zambeze.orchestration.queue.queue_rmq import (
+    ACTIVITIES_QUEUE,
+    CONTROL_EXCHANGE,
+    activity_queue,
+)
 from zambeze.orchestration.zambeze_types import QueueType
 from zambeze.campaign.activities.dag import DAG
+from zambeze.utils.structured_log import event
 
-from .temp_activity_to_plugin_map import activity_to_plugin_map
+from .temp_activity_to_plugin_map import activity_to_plugin_map, plugin_for_node
 
 
 class MessageHandler(threading.Thread):
@@ -24,13 +30,24 @@ class MessageHandler(threading.Thread):
         self.mq_args = {
             "ip": self._settings.settings["rmq"]["host"],
             "port": self._settings.settings["rmq"]["port"],
+            "plugins": self._settings.plugins.registered,
         }
 
         self.queue_factory = QueueFactory(logger=self._logger)
 
+        # One long-lived publisher shared by the activity and control senders.
+        self.publisher = RMQPublisher(
+            self.mq_args,
+            logger=self._logger,
+            batch_size=self._settings.settings["rmq"]["publish_batch_size"],
+            linger=self._settings.settings["rmq"]["publish_linger_ms"] / 1000,
+        )
+
         self._logger.info("[mh] RabbitMQ broker and channel both created successfully!")
 
-        self._activity_dao = ActivityDAO(self._logger)
+        self._store = get_activity_store(
+            self._settings, agent_id=self.agent_id, logger=self._logger
+        )
 
         self._zmq_context = zmq.Context()
         self._zmq_socket = self._zmq_context.socket(zmq.REP)
@@ -60,8 +77,12 @@ class MessageHandler(threading.Thread):
             target=self.recv_activity_dag_from_campaign, args=()
         )
 
-        # THREAD 2: recv activities from rmq
-        activity_listener = threading.Thread(target=self.recv_activity, args=())
+        # THREAD 2: recv activities from rmq (one consumer per thread, each
+        # with its own connection and channel)
+        activity_listeners = [
+            threading.Thread(target=self.recv_activity, args=())
+            for _ in range(self._settings.settings["rmq"]["activity_consumers"])
+        ]
         # TODO: bring back.
         # THREAD 3: recv control from RMQ
         control_listener = threading.Thread(target=self.recv_control, args=())
@@ -82,8 +103,10 @@ class MessageHandler(threading.Thread):
             self.fc_consumer.start()
             self._logger.info("[mh] Flowcept libraries succesfully loaded.")
 
+        self.publisher.start()
         campaign_listener.start()
-        activity_listener.start()
+        for activity_listener in activity_listeners:
+            activity_listener.start()
         control_listener.start()
         activity_sender.start()
         control_sender.start()
@@ -111,7 +134,8 @@ class MessageHandler(threading.Thread):
             activity_dag = DAG.deserialize_dag(dag_bytestring)
 
             self._logger.debug(
-                f"[recv_activity_dag_from_campaign] Received message from campaign: {activity_dag}"
+                "[recv_activity_dag_from_campaign] Received message from campaign: %s",
+                activity_dag,
             )
 
             # Iterating over nodes in NetworkX DAG
@@ -128,63 +152,55 @@ class MessageHandler(threading.Thread):
                 # If not monitor or terminator
                 try:
                     if (not is_monitor) or (not is_terminator):
-                        self._logger.info("[mh] Flushing activity message to flowcept")
                         node_data["activity"].origin_agent_id = self.agent_id
                         node_data["activity_status"] = "SUBMITTED"
 
                 except Exception as e:
                     self._logger.error(e)
 
-                self._logger.info(
-                    f"[message_handler] The activity_node to send...:\n{(activity_id, node_data)}"
+                self._logger.debug(
+                    "[message_handler] Sending activity node %s",
+                    activity_id,
+                    extra=event("submitted", node_data.get("campaign_id"), activity_id),
                 )
 
-                activity_model = ActivityModel(
-                    agent_id=str(self.agent_id), created_at=int(time.time() * 1000)
-                )
-                self._activity_dao.insert(activity_model)
-                self._logger.debug("[recv_activity_dag_from_campaign] Saved in the DB!")
+                if activity_id not in ("MONITOR", "TERMINATOR"):
+                    self._store.record(
+                        activity_id,
+                        node_data["campaign_id"],
+                        "SUBMITTED",
+                        queued_at=now_ms(),
+                    )
 
                 self.msg_handler_send_activity_q.put((activity_id, node_data))
                 num_activities += 1
                 self._logger.debug("[recv_activity_dag_from_campaign] Sent node!")
 
             self._logger.info(
-                f"[message_handler] Number of activities sent for campaign: {num_activities}"
+                "[message_handler] Number of activities sent for campaign: %d",
+                num_activities,
             )
 
     # Custom RabbitMQ callback; made decision to put here so that we can access the messages.
-    def _callback(self, ch, method, _properties, body):
-        self._logger.debug("uno")
+    def _callback(self, queue_client, ch, method, _properties, body):
+        activity_node = DAG.deserialize_node(body)
         self._logger.debug(
-            "[mh-recv-activity] Processing callback function for activity queue recv."
+            "[mh-recv-activity] Received activity %s",
+            activity_node[0],
+            extra=event(
+                "received", activity_node[1].get("campaign_id"), activity_node[0]
+            ),
         )
-        activity_node = DAG.deserialize_node(body)
-        self._logger.info(f"[mn-recv-activity] receiving activity...{activity_node}")
 
         plugins_are_configured = False
         actions_are_supported = False
 
         # Anyone can monitor or terminate.
-        self._logger.debug("dos")
-
         if activity_node[0] in ["MONITOR", "TERMINATOR"]:
-            self._logger.debug("tres")
             plugins_are_configured = True
             actions_are_supported = True
-            self._logger.info(
-                f"[mh] Zambeze activity received of ID: {activity_node[0]}"
-            )
 
         else:
-            self._logger.debug("quatro")
-            try:
-                self._logger.info("[mh] Unpacking activity info from queue...")
-            except Exception as e:
-                self._logger.error(e)
-
-            self._logger.debug("cinco")
-
             # TODO: TYLER THIS IS CAUSING PROBLEM
             # I THINK I NEED TO MAXIMIZE
             try:
@@ -192,45 +208,62 @@ class MessageHandler(threading.Thread):
                     activity_node[1]["activity"].type.upper()
                 ]
             except Exception as e:
-                self._logger.exception(f"Caught-a-lot: {e}")
-            self._logger.debug("ses")
+                self._logger.exception("[mh] No plugin for activity: %s", e)
             plugins_are_configured = self.are_plugins_configured(required_plugin)
             actions_are_supported = (
                 True  # self.are_actions_supported(action_labels=[""])
             )
 
-        self._logger.debug("siete")
         should_ack = plugins_are_configured and actions_are_supported
-
-        self._logger.info(
-            f"[mh] Should ack: {should_ack} | Plugins Configured: {plugins_are_configured}"
+        if should_ack and activity_node[0] != "TERMINATOR":
+            # Written before the ack: RabbitMQ does not redeliver an acked
+            # node, so it must be recoverable if the agent dies before it ran.
+            try:
+                self._store.checkpoint(activity_node, wait=True)
+            except Exception as e:
+                self._logger.error(
+                    "[mh] Unable to checkpoint activity %s: %s", activity_node[0], e
+                )
+                should_ack = False
+        self._logger.debug(
+            "[mh] Should ack: %s | Plugins Configured: %s",
+            should_ack,
+            plugins_are_configured,
         )
 
-        self._logger.debug("ocho")
-
         try:
             if should_ack:
                 ch.basic_ack(delivery_tag=method.delivery_tag, multiple=False)
                 self._logger.debug("[recv activity] ACKED activity message.")
                 self.check_activity_q.put(activity_node)
-                self._logger.debug("nueve")
             else:
-                ch.basic_nack(delivery_tag=method.delivery_tag, multiple=False)
-                self._logger.debug("[recv activity] NACKED activity message.")
-                # stuck in NACK loop; sleep helps alleviate what happens when
-                #   a task can't get picked up by anyone (temporary).
-                self._logger.debug("dies")
-                time.sleep(1)
+                # Park the activity on the delay exchange instead of nacking
+                # it straight back: an immediate requeue would bounce it
+                # between agents that cannot run it, and sleeping here would
+                # stall this consumer for the agents that can.
+                queue_client.delay_requeue(
+                    ch,
+                    method,
+                    body,
+                    self._settings.settings["rmq"]["requeue_delay_ms"],
+                )
+                self._logger.debug("[recv activity] Delayed requeue of activity.")
         except Exception as e:
-            self._logger.error(f"[mh] COULD NOT ACK! CAUGHT: {type(e).__name__}: {e}")
+            self._logger.error(
+                "[mh] COULD NOT ACK! CAUGHT: %s: %s", type(e).__name__, e
+            )
 
     def recv_activity(self):
         """
         >> Async
 
-        Get activity from 'ACTIVITIES' queue.
+        Get activities from the shared 'ACTIVITIES' queue and from the queue
+        of every plugin configured on this agent, which is how the agent
+        advertises what it can run.
         If we have the correct plugins, then we keep it (ack). Otherwise, we
-        put it back (nack).
+        hand it back to the queue after a delay (see QueueRMQ.delay_requeue).
+        Several of these consumers run per agent, each with its own channel
+        and a prefetch window of rmq.prefetch messages.
         """
 
         self._logger.info("[mh] Connecting to RabbitMQ RECV ACTIVITY broker...")
@@ -239,35 +272,46 @@ class MessageHandler(threading.Thread):
         queue_client = self.queue_factory.create(QueueType.RABBITMQ, self.mq_args)
         queue_client.connect()
 
+        queues = [ACTIVITIES_QUEUE] + [
+            activity_queue(plugin) for plugin in self._settings.plugins.configured
+        ]
+        self._logger.info(f"[mh] Consuming activities from queues: {queues}")
+
         queue_client.listen_and_do_callback(
-            callback_func=self._callback,
-            channel_to_listen="ACTIVITIES",
+            callback_func=functools.partial(self._callback, queue_client),
+            channel_to_listen=queues,
             should_auto_ack=False,
+            prefetch_count=self._settings.settings["rmq"]["prefetch"],
         )
 
     def send_activity_dag(self):
         """
-        (from agent.py) input activity; send to "ACTIVITIES" queue.
+        (from agent.py) input activity; send it to the queue of the plugin
+        that runs it (see route_activity).
         """
 
-        self._logger.info("[mh] Connecting to RabbitMQ SEND ACTIVITY broker...")
-        queue_client = self.queue_factory.create(QueueType.RABBITMQ, self.mq_args)
-        queue_client.connect()
-
         while True:
-            self._logger.info("[send_activity] Waiting for messages...")
+            self._logger.debug("[send_activity] Waiting for messages...")
             activity_msg = self.msg_handler_send_activity_q.get()
 
-            self._logger.info(f"[send_activity] Dispatching message: {activity_msg}...")
+            self._logger.debug(
+                "[send_activity] Dispatching activity %s",
+                activity_msg[0],
+                extra=event(
+                    "dispatched", activity_msg[1].get("campaign_id"), activity_msg[0]
+                ),
+            )
 
             try:
-                queue_client.send(exchange="", channel="ACTIVITIES", body=activity_msg)
+                self.publisher.publish(
+                    channel=self.route_activity(activity_msg), body=activity_msg
+                )
             except Exception as e:
                 self._logger.error(
                     f"[mh] UNABLE TO SEND ACTIVITY MESSAGE! CAUGHT: {type(e).__name__}: {e}"
                 )
             else:
-                self._logger.debug("[send_activity] Successfully sent activity!")
+                self._logger.debug("[send_activity] Queued activity for publishing!")
 
     def recv_control(self):
         """
@@ -279,36 +323,67 @@ class MessageHandler(threading.Thread):
         queue_client.connect()
 
         def callback(_1, _2, _3, body):
-            control_msg = pickle.loads(body)
-            self._logger.info(" [x recv_control] Received %r" % control_msg)
+            control_msg = wire_format.decode_control(body)
+            self._logger.debug(
+                "[recv_control] Received %s of activity %s",
+                control_msg.get("status"),
+                control_msg.get("activity_id"),
+                extra=event(
+                    "status",
+                    control_msg.get("campaign_id"),
+                    control_msg.get("activity_id"),
+                ),
+            )
             self.recv_control_q.put(control_msg)
 
+        # A private queue per agent: a shared queue would hand each control
+        # message to only one of the agents listening on it.
+        control_queue = queue_client.bind_exclusive_queue(CONTROL_EXCHANGE)
+
         queue_client.listen_and_do_callback(
-            channel_to_listen="CONTROL", callback_func=callback, should_auto_ack=True
+            channel_to_listen=control_queue,
+            callback_func=callback,
+            should_auto_ack=True,
         )
 
     def send_control(self):
         """
-        (from agent.py) input control message; send to "CONTROL" queue.
+        (from agent.py) input control message; fan it out to every agent.
         """
 
-        self._logger.info("[mh] Connecting to RabbitMQ SEND CONTROL broker...")
-        queue_client = self.queue_factory.create(QueueType.RABBITMQ, self.mq_args)
-        queue_client.connect()
-
         while True:
             self._logger.debug("[send_control] Waiting for messages...")
             activity_msg = self.msg_handler_send_control_q.get()
 
             self._logger.debug("[send_control] Message received! Sending...")
             try:
-                queue_client.send(exchange="", channel="CONTROL", body=activity_msg)
+                self.publisher.publish(
+                    channel="", body=activity_msg, exchange=CONTROL_EXCHANGE
+                )
             except Exception as e:
                 self._logger.error(
                     f"[mh] COULD NOT SEND CONTROL MESSAGE! CAUGHT: {type(e).__name__}: {e}"
                 )
             else:
-                self._logger.info("[send_control] Successfully sent control message!")
+                self._logger.debug("[send_control] Queued control message!")
+
+    @staticmethod
+    def route_activity(activity_msg: tuple) -> str:
+        """Name of the queue an activity node should be published to.
+
+        MONITOR and TERMINATOR, and activities of a type without a known
+        plugin, can be picked up by any agent; everything else goes to the
+        queue of the plugin that runs it.
+
+        :param activity_msg: DAG node of the form (activity_id, node_data)
+        :type activity_msg: tuple
+        :return: The queue name.
+        :rtype: str
+        """
+        plugin = plugin_for_node(activity_msg)
+        if plugin is None:
+            return ACTIVITIES_QUEUE
+        return activity_queue(plugin)
 
     def message_to_plugin_validator(self, plugin, cmd):
         """Determine whether plugin can execute based on plugin input schema.
@@ -4,3 +4,22 @@ Keys are activities; values are associated plugins.
 """
 
 activity_to_plugin_map = {"SHELL": "SHELL", "TRANSFER": "globus"}
+
+
+def plugin_for_node(activity_msg: tuple):
+    """Plugin that runs a DAG node, or None if any agent can take it.
+
+    MONITOR and TERMINATOR, and activities of a type without a known plugin,
+    return None.
+
+    :param activity_msg: DAG node of the form (activity_id, node_data)
+    :type activity_msg: tuple
+    :rtype: Optional[str]
+    """
+    activity_id, node_data = activity_msg
+    if activity_id in ("MONITOR", "TERMINATOR"):
+        return None
+    try:
+        return activity_to_plugin_map[node_data["activity"].type.upper()]
+    except (AttributeError, KeyError):
+        return None
@@ -0,0 +1,324 @@
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+import json
+import logging
+import os
+import threading
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+# Bytes read from the socket and written to disk at a time.
+BUFFER_SIZE = 1024 * 1024
+# Files at least twice this size are fetched as concurrent ranged parts.
+PART_SIZE = 16 * 1024 * 1024
+
+# Errors after which a download is resumed instead of failed.
+_RESUMABLE = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class HTTPDownloadError(Exception):
+    """Raised when one or more HTTP downloads failed."""
+
+    pass
+
+
+class HTTPDownloader:
+    """Concurrent, resumable HTTP(S) file downloader.
+
+    All requests go through one ``requests.Session`` whose connection pool is
+    sized for ``max_workers`` concurrent downloads, so connections to the
+    same host are reused across files and activities. Bodies are streamed to
+    disk in ``buffer_size`` chunks.
+
+    Files are written to ``<dest>.part`` and renamed once complete, with the
+    ETag or Last-Modified of the version being fetched recorded in
+    ``<dest>.part.json``. When the server supports byte ranges, an
+    interrupted download resumes from a partial file of the same version
+    (guarded by ``If-Range`` so a file changed since is fetched from
+    scratch), and files of at least ``2 * part_size`` bytes are fetched as
+    concurrent ranged parts whose progress is recorded there too.
+
+    :param logger: The logger where to log information/warning or errors.
+    :type logger: Optional[logging.Logger]
+    :param max_workers: Number of files downloaded at once.
+    :type max_workers: int
+    :param part_size: Size of the ranged parts of large files.
+    :type part_size: int
+    :param buffer_size: Read/write buffer size.
+    :type buffer_size: int
+    :param retries: Attempts per file (or part) before giving up.
+    :type retries: int
+    :param timeout: Connect/read timeout in seconds.
+    :type timeout: float
+    """
+
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        max_workers: int = 8,
+        part_size: int = PART_SIZE,
+        buffer_size: int = BUFFER_SIZE,
+        retries: int = 3,
+        timeout: float = 60,
+    ) -> None:
+        self._logger: logging.Logger = (
+            logging.getLogger(__name__) if logger is None else logger
+        )
+        self._part_size = part_size
+        self._buffer_size = buffer_size
+        self._retries = retries
+        self._timeout = timeout
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_workers, pool_maxsize=max_workers * 2
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # Files and ranged parts run on separate pools so a file waiting on
+        # its parts never starves them of workers.
+        self._files = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="HTTPDownload"
+        )
+        self._parts = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="HTTPDownloadPart"
+        )
+
+    def head(self, url: str) -> dict:
+        """Return the size and version metadata the server reports for ``url``.
+
+        :return: ``size`` (None if unknown), ``etag``, ``last_modified`` and
+            ``ranges`` (whether byte ranges are supported).
+        :rtype: dict
+        """
+        response = self._session.head(url, allow_redirects=True, timeout=self._timeout)
+        if response.status_code in (405, 501):
+            # HEAD not supported: download in one stream, uncached.
+            return {"size": None, "etag": None, "last_modified": None, "ranges": False}
+        response.raise_for_status()
+        headers = response.headers
+        size = headers.get("Content-Length")
+        return {
+            "size": int(size) if size is not None else None,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "ranges": headers.get("Accept-Ranges") == "bytes",
+        }
+
+    def download_all(self, items: list) -> Future:
+        """Download ``(url, dest)`` pairs concurrently.
+
+        :param items: URLs and the paths to save them to. An optional third
+            element holds metadata from :meth:`head`, saving a request.
+        :type items: list
+        :return: Future resolving to {dest: bytes} once every file is
+            downloaded, or failing with :class:`HTTPDownloadError`.
+        :rtype: concurrent.futures.Future
+        """
+        result = Future()
+        if not items:
+            result.set_result({})
+            return result
+
+        sizes = {}
+        errors = []
+        remaining = [len(items)]
+        lock = threading.Lock()
+
+        def done(dest, future):
+            try:
+                nbytes = future.result()
+            except Exception as e:
+                error = f"{dest}: {e}"
+            else:
+                error = None
+            with lock:
+                if error is None:
+                    sizes[dest] = nbytes
+                else:
+                    errors.append(error)
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if not finished:
+                return
+            if errors:
+                result.set_exception(
+                    HTTPDownloadError(
+                        f"Failed to download {len(errors)} files: {errors}"
+                    )
+                )
+            else:
+                result.set_result(sizes)
+
+        for url, dest, *metadata in items:
+            future = self._files.submit(self.download, url, dest, *metadata)
+            future.add_done_callback(lambda f, dest=dest: done(dest, f))
+        return result
+
+    def download(self, url: str, dest, metadata: Optional[dict] = None) -> int:
+        """Download ``url`` to ``dest``, resuming a previous partial download.
+
+        :return: Size of the downloaded file.
+        :rtype: int
+        """
+        if metadata is None:
+            metadata = self.head(url)
+        part = f"{dest}.part"
+        size = metadata["size"]
+        if metadata["ranges"] and size is not None and size >= 2 * self._part_size:
+            self._download_parts(url, part, metadata)
+        else:
+            self._retry(self._download_stream, url, part, metadata)
+        os.replace(part, dest)
+        self._logger.debug(f"[http] Downloaded {url} to {dest}")
+        return os.path.getsize(dest)
+
+    def _retry(self, fn, *args):
+        for attempt in range(1, self._retries + 1):
+            try:
+                return fn(*args)
+            except _RESUMABLE as e:
+                if attempt == self._retries:
+                    raise
+                self._logger.warning(
+                    f"[http] {args[0]} interrupted ({e}); resuming, "
+                    f"attempt {attempt + 1}/{self._retries}"
+                )
+
+    @staticmethod
+    def _validator(metadata: dict) -> Optional[str]:
+        return metadata.get("etag") or metadata.get("last_modified")
+
+    @staticmethod
+    def _save_state(state_file: str, state: dict) -> None:
+        tmp = f"{state_file}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, state_file)
+
+    def _download_stream(self, url: str, part: str, metadata: dict) -> None:
+        state_file = f"{part}.json"
+        validator = self._validator(metadata)
+        offset = 0
+        try:
+            with open(state_file) as f:
+                state = json.load(f)
+            # A partial file is only continued if it is of the same version,
+            # and was streamed: files fetched as ranged parts have holes.
+            if validator and state["validator"] == validator and "done" not in state:
+                offset = os.path.getsize(part)
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        if offset and offset == metadata["size"]:
+            os.remove(state_file)
+            return
+
+        headers = {}
+        if offset and metadata["ranges"]:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+        with self._session.get(
+            url, headers=headers, stream=True, timeout=self._timeout
+        ) as response:
+            if response.status_code == 416 and offset:
+                # The partial file is not a prefix of the file, start over.
+                os.remove(state_file)
+                return self._download_stream(url, part, metadata)
+            response.raise_for_status()
+            # 206 continues the partial file; anything else starts over.
+            mode = "ab" if response.status_code == 206 else "wb"
+            if mode == "wb" and validator:
+                self._save_state(state_file, {"validator": validator})
+            with open(part, mode) as f:
+                for chunk in response.iter_content(chunk_size=self._buffer_size):
+                    f.write(chunk)
+        if validator:
+            os.remove(state_file)
+
+    def _download_parts(self, url: str, part: str, metadata: dict) -> None:
+        size = metadata["size"]
+        state_file = f"{part}.json"
+        validator = self._validator(metadata)
+        done = set()
+        try:
+            with open(state_file) as f:
+                state = json.load(f)
+            if state["validator"] == validator and state["size"] == size:
+                done = set(state["done"])
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+        with open(part, "ab") as f:
+            f.truncate(size)
+
+        ranges = [
+            (start, min(start + self._part_size, size) - 1)
+            for start in range(0, size, self._part_size)
+            if start not in done
+        ]
+        lock = threading.Lock()
+
+        def fetch(first, last):
+            self._retry(self._download_range, url, part, first, last, validator)
+            with lock:
+                done.add(first)
+                self._save_state(
+                    state_file,
+                    {"validator": validator, "size": size, "done": sorted(done)},
+                )
+
+        futures = [self._parts.submit(fetch, first, last) for first, last in ranges]
+        for future in futures:
+            future.result()
+        os.remove(state_file)
+
+    def _download_range(
+        self, url: str, part: str, first: int, last: int, validator: Optional[str]
+    ) -> None:
+        headers = {"Range": f"bytes={first}-{last}"}
+        if validator:
+            headers["If-Range"] = validator
+        with self._session.get(
+            url, headers=headers, stream=True, timeout=self._timeout
+        ) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise HTTPDownloadError(f"{url} changed while being downloaded.")
+            fd = os.open(part, os.O_WRONLY)
+            try:
+                offset = first
+                for chunk in response.iter_content(chunk_size=self._buffer_size):
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+            finally:
+                os.close(fd)
+            if offset != last + 1:
+                raise requests.exceptions.ChunkedEncodingError(
+                    f"Range {first}-{last} of {url} ended at {offset}."
+                )
+
+
+_shared_downloader = None
+_shared_downloader_lock = threading.Lock()
+
+
+def get_http_downloader(logger: Optional[logging.Logger] = None) -> HTTPDownloader:
+    """Return the process-wide HTTPDownloader, creating it on first use."""
+    global _shared_downloader
+    with _shared_downloader_lock:
+        if _shared_downloader is None:
+            _shared_downloader = HTTPDownloader(logger=logger)
+        return _shared_downloader
@@ -0,0 +1,234 @@
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import threading
+
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlparse
+
+from zambeze.orchestration.data.staging_cache import StagingCache, get_staging_cache
+
+
+def local_path(file_uri: str) -> str:
+    """Where an activity file is found on this agent once it is staged.
+
+    Local files stay where they are; transferred files land in the working
+    directory under their base name.
+    """
+    parsed = urlparse(file_uri)
+    if parsed.scheme in ("", "file", "local"):
+        return os.path.abspath(parsed.path)
+    return os.path.join(os.getcwd(), os.path.basename(parsed.path))
+
+
+def file_digest(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Memoized results of shell activities.
+
+    A result is keyed by the activity's command, arguments and environment
+    variables together with the content hashes of its input files, so the
+    same command on changed inputs runs again. Only successful runs are
+    recorded. The output files of a run are kept in the staging cache, which
+    bounds their size, and are copied back into place on a hit. The index
+    holds up to ``max_entries`` results, least recently used first, and is
+    kept in ``results.json`` so it survives agent restarts.
+
+    :param directory: Directory holding the index.
+    :type directory: str
+    :param max_entries: Number of results above which entries are evicted.
+    :type max_entries: int
+    :param files: Cache storing the output files.
+    :type files: StagingCache
+    :param logger: The logger where to log information/warning or errors.
+    :type logger: Optional[logging.Logger]
+    """
+
+    def __init__(
+        self,
+        directory,
+        max_entries: int,
+        files: StagingCache,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._logger: logging.Logger = (
+            logging.getLogger(__name__) if logger is None else logger
+        )
+        self._directory = pathlib.Path(directory).expanduser()
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._index_file = self._directory.joinpath("results.json")
+        self._files = files
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        # key -> {"outputs": [[path, sha256], ...]}, least recently used first.
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._load_index()
+
+    @staticmethod
+    def key(activity) -> Optional[str]:
+        """Key of a shell activity's result, or None if an input is missing.
+
+        :param activity: The shell activity, with its input files staged.
+        :type activity: ShellActivity
+        """
+        inputs = []
+        for file_uri in activity.files or []:
+            path = local_path(file_uri)
+            try:
+                inputs.append([file_uri, file_digest(path)])
+            except OSError:
+                return None
+        spec = {
+            "command": activity.command,
+            "arguments": list(activity.arguments or []),
+            "env_vars": activity.env_vars or {},
+            "inputs": inputs,
+        }
+        blob = json.dumps(spec, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    @staticmethod
+    def _output_uri(path: str) -> str:
+        return f"result://{path}"
+
+    def restore(self, key: str) -> bool:
+        """Copy the outputs of a recorded result back into place.
+
+        :return: True on a hit; False if there is no result for ``key`` or
+            one of its output files was evicted.
+        :rtype: bool
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        cached = []
+        for path, digest in (entry or {}).get("outputs", []):
+            blob = self._files.lookup(self._output_uri(path), {"sha256": digest})
+            if blob is None:
+                entry = None
+                break
+            cached.append((blob, path))
+
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                self._entries.pop(key, None)
+                return False
+            self._hits += 1
+
+        for blob, path in cached:
+            # Copied rather than linked, later activities may append to it.
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.restore"
+            shutil.copyfile(blob, tmp)
+            os.replace(tmp, path)
+        return True
+
+    def store(self, key: str, outputs: list) -> None:
+        """Record a successful result and copy its output files.
+
+        :param key: Key returned by :meth:`key` before the activity ran.
+        :type key: str
+        :param outputs: Paths of the files written by the activity.
+        :type outputs: list[str]
+        """
+        recorded = []
+        for output in outputs:
+            path = local_path(output)
+            try:
+                digest = file_digest(path)
+            except OSError:
+                self._logger.warning(
+                    f"[results] Output {path} not found; result not recorded."
+                )
+                return
+            uri = self._output_uri(path)
+            metadata = {"sha256": digest}
+            if self._files.lookup(uri, metadata) is None:
+                # Copied, the activity's own file may be modified later on.
+                incoming = self._files.incoming_path(StagingCache.key(uri, metadata))
+                shutil.copyfile(path, incoming)
+                self._files.insert(uri, metadata, incoming)
+            recorded.append([path, digest])
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = {"outputs": recorded}
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save_index()
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def _load_index(self) -> None:
+        try:
+            with open(self._index_file) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            self._logger.warning(f"[results] Ignoring corrupt index {self._index_file}")
+            return
+        self._entries.update((key, entry) for key, entry in entries)
+
+    def _save_index(self) -> None:
+        tmp = self._index_file.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(list(self._entries.items()), f)
+        os.replace(tmp, self._index_file)
+
+
+_shared_results = {}
+_shared_results_lock = threading.Lock()
+
+
+def get_result_cache(
+    settings, logger: Optional[logging.Logger] = None
+) -> Optional[ResultCache]:
+    """Return the process-wide ResultCache configured in ``settings``.
+
+    Returns None when it is disabled (``max_entries`` is 0) or when the
+    staging cache, which holds the output files, is disabled.
+    """
+    config = settings.settings.get("result_cache", {})
+    files = get_staging_cache(settings, logger=logger)
+    if not config.get("max_entries") or files is None:
+        return None
+    directory = os.path.expanduser(config["directory"])
+    with _shared_results_lock:
+        results = _shared_results.get(directory)
+        if results is None:
+            results = ResultCache(
+                directory, config["max_entries"], files, logger=logger
+            )
+            _shared_results[directory] = results
+        results.max_entries = config["max_entries"]
+        return results
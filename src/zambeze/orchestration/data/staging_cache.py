@@ -0,0 +1,255 @@
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+import hashlib
+import json
+import logging
+import fcntl
+import os
+import pathlib
+import shutil
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional
+
+# ioctl cloning a whole file, on file systems sharing extents (Btrfs, XFS).
+_FICLONE = 0x40049409
+
+
+class StagingCache:
+    """On-disk cache of staged activity input files.
+
+    Entries are content-addressed by a key derived from the source URI and
+    the metadata the source reports for it (size and modification time for
+    Globus, ETag or Last-Modified for HTTP), so a file that changed at the
+    source is fetched again instead of being served stale. Working
+    directories get their own copy of a cached file, cloned where the file
+    system supports it, so an activity writing to its input cannot change
+    what the cache serves to the next one.
+
+    Fetches are single-flight: the first activity missing a file claims it
+    with :meth:`reserve` and fetches it, while the activities asking for the
+    same file in the meantime wait for that fetch instead of starting their
+    own into the same incoming path.
+
+    When the cache grows beyond ``max_bytes`` the least recently used
+    entries are evicted. The index is kept in ``index.json`` inside the
+    cache directory so the cache survives agent restarts.
+
+    :param directory: Directory holding the cached files and the index.
+    :type directory: str
+    :param max_bytes: Size above which entries are evicted.
+    :type max_bytes: int
+    :param logger: The logger where to log information/warning or errors.
+    :type logger: Optional[logging.Logger]
+    """
+
+    def __init__(
+        self, directory, max_bytes: int, logger: Optional[logging.Logger] = None
+    ) -> None:
+        self._logger: logging.Logger = (
+            logging.getLogger(__name__) if logger is None else logger
+        )
+        self._directory = pathlib.Path(directory).expanduser()
+        self._objects = self._directory.joinpath("objects")
+        self._incoming = self._directory.joinpath("incoming")
+        self._index_file = self._directory.joinpath("index.json")
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._incoming.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # key -> {"uri": ..., "size": ...}, least recently used first.
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        # key -> Future resolved with the cached path once it was fetched.
+        self._in_flight = {}
+        self._load_index()
+
+    @staticmethod
+    def key(uri: str, metadata: dict) -> str:
+        """Cache key of a source URI and the metadata describing its version."""
+        blob = json.dumps([uri, metadata], sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def path(self, key: str) -> pathlib.Path:
+        return self._objects.joinpath(key[:2], key)
+
+    def incoming_path(self, key: str) -> pathlib.Path:
+        """Where a transfer for ``key`` should write before :meth:`insert`."""
+        return self._incoming.joinpath(key)
+
+    def lookup(self, uri: str, metadata: dict) -> Optional[pathlib.Path]:
+        """Return the cached copy of ``uri``, or None on a miss.
+
+        :param uri: Source URI of the file.
+        :type uri: str
+        :param metadata: Source metadata identifying the file version.
+        :type metadata: dict
+        :rtype: Optional[pathlib.Path]
+        """
+        key = self.key(uri, metadata)
+        path = self.path(key)
+        with self._lock:
+            if key in self._entries and path.exists():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return path
+            if key in self._entries:
+                # Removed behind our back.
+                self._bytes -= self._entries.pop(key)["size"]
+            self._misses += 1
+            return None
+
+    def reserve(self, uri: str, metadata: dict) -> Optional[Future]:
+        """Claim the fetch of a file that :meth:`lookup` missed.
+
+        :return: None if the caller is to fetch the file into its
+            :meth:`incoming_path`, then :meth:`insert` or :meth:`release` it;
+            otherwise a Future resolved with the cached path once the fetch
+            already in flight, or already finished, completes.
+        :rtype: Optional[Future]
+        """
+        key = self.key(uri, metadata)
+        with self._lock:
+            fetching = self._in_flight.get(key)
+            if fetching is not None:
+                return fetching
+            if key in self._entries and self.path(key).exists():
+                done = Future()
+                done.set_result(self.path(key))
+                return done
+            self._in_flight[key] = Future()
+            return None
+
+    def release(self, uri: str, metadata: dict, error: Exception) -> None:
+        """Give up a fetch claimed with :meth:`reserve`, failing its waiters."""
+        with self._lock:
+            fetching = self._in_flight.pop(self.key(uri, metadata), None)
+        if fetching is not None:
+            fetching.set_exception(error)
+
+    def insert(self, uri: str, metadata: dict, src) -> pathlib.Path:
+        """Move a freshly fetched file into the cache.
+
+        :param src: Path of the fetched file; it is moved, not copied.
+        :return: Path of the cached copy.
+        :rtype: pathlib.Path
+        """
+        key = self.key(uri, metadata)
+        path = self.path(key)
+        path.parent.mkdir(exist_ok=True)
+        try:
+            os.replace(src, path)
+        except FileNotFoundError:
+            # Inserted concurrently by another fetch of the same version.
+            if not path.exists():
+                raise
+        size = path.stat().st_size
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous["size"]
+            self._entries[key] = {"uri": uri, "size": size}
+            self._bytes += size
+            self._evict()
+            self._save_index()
+            fetching = self._in_flight.pop(key, None)
+        if fetching is not None:
+            fetching.set_result(path)
+        return path
+
+    def link(self, cached, dest) -> None:
+        """Copy a cached file to ``dest``, replacing whatever is there."""
+        dest = pathlib.Path(dest)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.link")
+        try:
+            _clone(cached, tmp)
+            os.replace(tmp, dest)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self._bytes -= entry["size"]
+            try:
+                # Working directories have their own copies.
+                self.path(key).unlink()
+            except FileNotFoundError:
+                pass
+            self._logger.debug(f"[cache] Evicted {entry['uri']}")
+
+    def _load_index(self) -> None:
+        try:
+            with open(self._index_file) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            self._logger.warning(f"[cache] Ignoring corrupt index {self._index_file}")
+            return
+        for key, entry in entries:
+            if self.path(key).exists():
+                self._entries[key] = entry
+                self._bytes += entry["size"]
+
+    def _save_index(self) -> None:
+        tmp = self._index_file.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(list(self._entries.items()), f)
+        os.replace(tmp, self._index_file)
+
+
+_shared_caches = {}
+_shared_caches_lock = threading.Lock()
+
+
+def get_staging_cache(
+    settings, logger: Optional[logging.Logger] = None
+) -> Optional[StagingCache]:
+    """Return the process-wide StagingCache configured in ``settings``.
+
+    Returns None when the cache is disabled (``max_bytes`` is 0).
+    """
+    config = settings.settings.get("staging_cache", {})
+    if not config.get("max_bytes"):
+        return None
+    directory = os.path.expanduser(config["directory"])
+    with _shared_caches_lock:
+        cache = _shared_caches.get(directory)
+        if cache is None:
+            cache = StagingCache(directory, config["max_bytes"], logger=logger)
+            _shared_caches[directory] = cache
+        cache.max_bytes = config["max_bytes"]
+        return cache
+
+
+def _clone(src, dst) -> None:
+    """Copy ``src`` to ``dst``, sharing its blocks when the file system can."""
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except OSError:
+            # Cross-device or a file system without reflinks.
+            shutil.copyfileobj(fsrc, fdst)
@@ -1,11 +1,20 @@
+import functools
 import os
 import pathlib
-import time
+import threading
 import globus_sdk
 
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from urllib.parse import urlparse
 from zambeze.utils.identity import valid_uuid
 
+from .http_downloader import get_http_downloader
+from .transfer_tracker import get_transfer_tracker
+
+# Upper bound on Globus transfer submissions in flight at once.
+MAX_CONCURRENT_SUBMISSIONS = 8
+
 
 class TransferHippoError(Exception):
     """Custom exception class for TransferHippo errors."""
@@ -26,18 +35,35 @@ class TransferHippo:
     Supported source types are:
     A. Local file: 'local'.
     B. Globus-accessible file: 'globus'.
+    C. Web-accessible file: 'http' or 'https'.
+
+    When given a StagingCache, remote files whose source metadata matches a
+    cached copy are linked into the working directory instead of being
+    transferred, and transferred files are added to the cache. Files that
+    another activity is already fetching into the cache are linked once
+    that fetch finished.
     """
 
-    def __init__(self, agent_id, settings, logger, tokens=None):
+    def __init__(self, agent_id, settings, logger, tokens=None, cache=None):
         self._logger = logger
         self._settings = settings
         self._agent_id = agent_id
         self.tokens = tokens
+        # Optional StagingCache; files found in it are linked, not fetched.
+        self._cache = cache
+        # Cache incoming path -> (source URI, source metadata, destination).
+        self._cache_pending = {}
+        # (Future of another activity's fetch, destination) to link once done.
+        self._cache_waiting = []
 
         self.file_objects = {}
-        self._supported_schemes = ["local", "globus"]
+        self._supported_schemes = ["local", "globus", "http", "https"]
         self.globus_transfer_client = None  # Globus-specific tooling.
         self.globus_task_ids = []
+        # Globus task id -> destination paths of the files it moves.
+        self.globus_task_files = {}
+        # Completed once every HTTP(S) download finished.
+        self.http_future = None
 
     def load(self, raw_file_paths):
         """
@@ -112,6 +138,12 @@ class TransferHippo:
                     self._logger.error("[th-validate] Globus path to file is empty.")
                     return False
 
+            if file_url.scheme in ["http", "https"] and not file_url.netloc:
+                self._logger.error(
+                    f"[th-validate] No host in URL of {file_path_resolved}."
+                )
+                return False
+
         return True
 
     def check_auth(self):
@@ -124,17 +156,14 @@ class TransferHippo:
         # TODO: Implement authentication check logic.
         return True
 
-    def start_transfer(self):
-        """
-        Start the transfer process for files loaded into the TransferHippo.
+    def _globus_groups(self):
         """
-        globus_init = False
-        globus_counter = 0
-        task_data = None
+        Group the Globus files by (source endpoint, destination endpoint).
 
-        # TODO: Make this generic; Create transfer holder for each type. Then
-        # pack the files in each in a loop. at the end, start each of the
-        # transfers.
+        Returns:
+            dict: (source_ep, dest_ep) -> list of (source path, destination path).
+        """
+        groups = {}
         for resolved_file_url, file_data in self.file_objects.items():
             file_url_obj = file_data["file_url"]
 
@@ -146,36 +175,328 @@ class TransferHippo:
                 "local",
             ]:  # TODO: should just be 'local'.
                 continue
+            if file_url_obj.scheme in ["http", "https"]:
+                continue
 
-            if not globus_init:
-                globus_init = True
-                source_ep = file_url_obj.netloc
-                dest_ep = self._settings.settings["plugins"]["globus"]["local_ep"]
+            source_ep = file_url_obj.netloc
+            dest_ep = self._settings.settings["plugins"]["globus"]["local_ep"]
+            filename = os.path.basename(resolved_file_url)
+            dest_filename = os.path.join(os.getcwd(), filename)
+            groups.setdefault((source_ep, dest_ep), []).append(
+                (file_url_obj.path, dest_filename)
+            )
+        return groups
+
+    def _globus_metadata(self, source_ep, directory):
+        """Map file names in a Globus directory to their size and mtime."""
+        try:
+            listing = self.globus_transfer_client.operation_ls(
+                source_ep, path=directory
+            )
+        except Exception as e:
+            self._logger.warning(
+                f"[th-cache] Unable to list {source_ep}:{directory}: {e}"
+            )
+            return {}
+        return {
+            entry["name"]: {
+                "size": entry["size"],
+                "last_modified": entry["last_modified"],
+            }
+            for entry in listing
+            if entry["type"] == "file"
+        }
+
+    def _apply_cache(self, groups):
+        """
+        Link cached files into place and redirect the remaining transfers to
+        the cache's incoming directory.
 
-                self._logger.info(f"EXTOKENS: {self.tokens}")
-                self.globus_transfer_client = globus_sdk.TransferClient(
-                    authorizer=globus_sdk.AccessTokenAuthorizer(
-                        self.tokens["globus"]["access_token"]
+        Returns:
+            dict: The groups, without the files that were served from cache.
+        """
+        listings = {}
+        remaining = {}
+        hits = 0
+        for (source_ep, dest_ep), items in groups.items():
+            for source_path, dest_path in items:
+                directory, name = os.path.split(source_path)
+                if (source_ep, directory) not in listings:
+                    listings[(source_ep, directory)] = self._globus_metadata(
+                        source_ep, directory
                     )
+                metadata = listings[(source_ep, directory)].get(name)
+                if metadata is None:
+                    # Unknown version; fetch it without caching.
+                    remaining.setdefault((source_ep, dest_ep), []).append(
+                        (source_path, dest_path)
+                    )
+                    continue
+
+                uri = f"globus://{source_ep}{source_path}"
+                target = self._cache_or_redirect(uri, metadata, dest_path)
+                if target is None:
+                    hits += 1
+                    continue
+                remaining.setdefault((source_ep, dest_ep), []).append(
+                    (source_path, target)
                 )
-                task_data = globus_sdk.TransferData(
-                    self.globus_transfer_client,
-                    source_endpoint=source_ep,
-                    destination_endpoint=dest_ep,
-                )
 
+        self._log_cache_hits(hits)
+        return remaining
+
+    def _cache_or_redirect(self, uri, metadata, dest_path):
+        """
+        Link the cached copy of a file into place, or pick where to fetch it.
+
+        Returns:
+            str: Path the file should be fetched to, or None on a cache hit.
+        """
+        cached = self._cache.lookup(uri, metadata)
+        if cached is not None:
+            self._cache.link(cached, dest_path)
+            return None
+        fetching = self._cache.reserve(uri, metadata)
+        if fetching is not None:
+            self._cache_waiting.append((fetching, dest_path))
+            return None
+        incoming = str(self._cache.incoming_path(self._cache.key(uri, metadata)))
+        self._cache_pending[incoming] = (uri, metadata, dest_path)
+        return incoming
+
+    def _log_cache_hits(self, hits):
+        stats = self._cache.stats
+        self._logger.info(
+            f"[th-cache] {hits} files served from cache; "
+            f"hit rate {stats['hit_rate']:.1%} over {stats['hits'] + stats['misses']}"
+            " lookups"
+        )
+
+    def _http_items(self):
+        """
+        Returns:
+            list: (url, destination path) of every HTTP(S) file.
+        """
+        items = []
+        for resolved_file_url, file_data in self.file_objects.items():
+            file_url_obj = file_data["file_url"]
+            if file_url_obj.scheme not in ["http", "https"]:
+                continue
             filename = os.path.basename(resolved_file_url)
-            dest_filename = os.path.join(os.getcwd(), filename)
-            task_data.add_item(file_url_obj.path, dest_filename)
-            globus_counter += 1
+            items.append((file_url_obj.geturl(), os.path.join(os.getcwd(), filename)))
+        return items
+
+    def _start_http(self, items):
+        """Start downloading HTTP(S) files that are not in the cache."""
+        downloader = get_http_downloader(self._logger)
+        workers = min(len(items), MAX_CONCURRENT_SUBMISSIONS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            heads = list(pool.map(downloader.head, [url for url, _ in items]))
+
+        downloads = []
+        hits = 0
+        for (url, dest_path), metadata in zip(items, heads):
+            version = {key: metadata[key] for key in ["size", "etag", "last_modified"]}
+            if self._cache is None or not (
+                metadata["etag"] or metadata["last_modified"]
+            ):
+                # Without a version there is nothing safe to cache it under.
+                downloads.append((url, dest_path, metadata))
+                continue
+            target = self._cache_or_redirect(url, version, dest_path)
+            if target is None:
+                hits += 1
+                continue
+            downloads.append((url, target, metadata))
+
+        if self._cache is not None:
+            self._log_cache_hits(hits)
+        if downloads:
+            self._logger.info(f"[th-start] downloading {len(downloads)} files")
+            self.http_future = downloader.download_all(downloads)
+
+    def _finish_cached(self):
+        """Move fetched files into the cache and link them into place."""
+        for incoming, (uri, metadata, dest_path) in list(self._cache_pending.items()):
+            cached = self._cache.insert(uri, metadata, incoming)
+            del self._cache_pending[incoming]
+            self._cache.link(cached, dest_path)
+
+    def _release_cached(self, error):
+        """Give up the cache fetches claimed by this hippo that did not finish."""
+        for uri, metadata, _ in self._cache_pending.values():
+            self._cache.release(uri, metadata, error)
+        self._cache_pending.clear()
+
+    def _link_when_fetched(self):
+        """
+        Returns:
+            Future: Resolves once every file fetched by another activity is
+                linked into place.
+        """
+        linked = Future()
+        remaining = [len(self._cache_waiting)]
+        lock = threading.Lock()
+
+        def link(dest_path, fetching):
+            with lock:
+                if linked.done():
+                    return
+                try:
+                    self._cache.link(fetching.result(), dest_path)
+                except Exception as e:
+                    linked.set_exception(e)
+                    return
+                remaining[0] -= 1
+                if not remaining[0]:
+                    linked.set_result({})
+
+        for fetching, dest_path in self._cache_waiting:
+            fetching.add_done_callback(functools.partial(link, dest_path))
+        return linked
+
+    def _submit_globus_group(self, source_ep, dest_ep, items):
+        """Submit one bulk Globus transfer task; return its task id."""
+        task_data = globus_sdk.TransferData(
+            source_endpoint=source_ep, destination_endpoint=dest_ep
+        )
+        for source_path, dest_path in items:
+            task_data.add_item(source_path, dest_path)
+        return self.globus_transfer_client.submit_transfer(task_data)["task_id"]
 
-        if task_data and globus_counter > 0:
-            transfer_task_id = self.globus_transfer_client.submit_transfer(task_data)[
-                "task_id"
-            ]
-            s = f"[th-start] submitted transfer {globus_counter} files: task_id={transfer_task_id}"
-            self._logger.info(s)
+    def start_transfer(self):
+        """
+        Start the transfer process for files loaded into the TransferHippo.
+
+        HTTP(S) downloads are started in the background. Globus files are
+        grouped by (source endpoint, destination endpoint) and each group is
+        submitted as a single bulk transfer task. The groups are submitted
+        concurrently.
+
+        Raises:
+            TransferHippoError: If any of the submissions failed. Tasks that
+                were submitted successfully are still recorded.
+        """
+        http_items = self._http_items()
+        if http_items:
+            self._start_http(http_items)
+
+        groups = self._globus_groups()
+        if not groups:
+            return
+
+        self._logger.info(f"EXTOKENS: {self.tokens}")
+        self.globus_transfer_client = globus_sdk.TransferClient(
+            authorizer=globus_sdk.AccessTokenAuthorizer(
+                self.tokens["globus"]["access_token"]
+            )
+        )
+        if self._cache is not None:
+            groups = self._apply_cache(groups)
+            if not groups:
+                return
+
+        workers = min(len(groups), MAX_CONCURRENT_SUBMISSIONS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                key: pool.submit(self._submit_globus_group, *key, items)
+                for key, items in groups.items()
+            }
+
+        errors = []
+        for (source_ep, dest_ep), future in futures.items():
+            items = groups[(source_ep, dest_ep)]
+            try:
+                transfer_task_id = future.result()
+            except Exception as e:
+                errors.append(f"{source_ep} -> {dest_ep}: {e}")
+                continue
+            s = f"[th-start] submitted transfer {len(items)} files from {source_ep}"
+            self._logger.info(f"{s}: task_id={transfer_task_id}")
             self.globus_task_ids.append(transfer_task_id)
+            self.globus_task_files[transfer_task_id] = [
+                self._cache_pending.get(dest, (None, None, dest))[2]
+                for _, dest in items
+            ]
+
+        if errors:
+            error = TransferHippoError(
+                f"Failed to submit {len(errors)} Globus transfers: {errors}"
+            )
+            # Nothing will track the other fetches into the cache either.
+            self._release_cached(error)
+            raise error
+
+    def track(self, tracker=None):
+        """
+        Hand the submitted Globus tasks to a TransferTracker and combine them
+        with the HTTP(S) downloads.
+
+        Args:
+            tracker (TransferTracker): Tracker to use; defaults to the shared
+                per-process tracker.
+
+        Returns:
+            Future: Resolves once every transfer succeeded, or None if nothing
+                was started.
+        """
+        futures = []
+        if self.globus_task_ids:
+            if tracker is None:
+                tracker = get_transfer_tracker(self._logger)
+            futures.append(
+                tracker.track(
+                    self.globus_transfer_client,
+                    dict(self.globus_task_files),
+                    on_progress=self._log_progress,
+                )
+            )
+        if self.http_future is not None:
+            futures.append(self.http_future)
+        if self._cache_waiting:
+            futures.append(self._link_when_fetched())
+        if not futures:
+            return None
+        if len(futures) == 1 and not self._cache_pending:
+            return futures[0]
+
+        staged = Future()
+        results = {}
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def finish(transferred):
+            with lock:
+                if staged.done():
+                    return
+                try:
+                    results.update(transferred.result())
+                except Exception as e:
+                    self._release_cached(e)
+                    staged.set_exception(e)
+                    return
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+                try:
+                    self._finish_cached()
+                except Exception as e:
+                    self._release_cached(e)
+                    staged.set_exception(e)
+                else:
+                    staged.set_result(results)
+
+        for future in futures:
+            future.add_done_callback(finish)
+        return staged
+
+    def _log_progress(self, report):
+        done = report["files_transferred"] + report["files_skipped"]
+        self._logger.info(
+            f"[th-progress] task_id={report['task_id']} {report['status']}: "
+            f"{done}/{report['files']} files, "
+            f"{report['bytes_transferred']} bytes"
+        )
 
     def transfer_wait(self, timeout=-1):
         """
@@ -186,20 +507,17 @@ class TransferHippo:
 
         Returns:
             bool: True if transfer is completed or False if timed out.
-        """
 
-        # TODO: generalize
-        if len(self.globus_task_ids) == 0:
+        Raises:
+            TransferFailedError: If one of the Globus tasks failed.
+        """
+        future = self.track()
+        if future is None:
             return True
 
-        wait_start_t = time.time()
-        while True:
-            for task_id in self.globus_task_ids:
-                status = self.globus_transfer_client.get_task(task_id)["status"]
-                if status in ["SUCCEEDED", "FAILED"]:
-                    return True
-                if timeout != -1 and time.time() - wait_start_t > timeout:
-                    self._logger.error("TIMEOUT CONDITION ACHIEVED!")
-                    return False
-                time.sleep(2)
-            time.sleep(0.5)
+        try:
+            future.result(None if timeout == -1 else timeout)
+        except FutureTimeoutError:
+            self._logger.error("TIMEOUT CONDITION ACHIEVED!")
+            return False
+        return True
@@ -0,0 +1,244 @@
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+import logging
+import threading
+
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+
+class TransferFailedError(Exception):
+    """Raised through a tracked future when a Globus task did not succeed."""
+
+    pass
+
+
+class _TrackedTask:
+    def __init__(self, task_id, client, group, files):
+        self.task_id = task_id
+        self.client = client
+        self.group = group
+        self.files = files
+        self.status = None
+        self.progress = None
+
+
+class _TrackedGroup:
+    """The Globus tasks of one activity, completed together."""
+
+    def __init__(self, task_ids, on_progress):
+        self.future = Future()
+        self.pending = set(task_ids)
+        self.statuses = {}
+        self.on_progress = on_progress
+
+
+class TransferTracker(threading.Thread):
+    """Track the completion of Globus transfer tasks for many activities.
+
+    A single thread polls every outstanding task with batched ``task_list``
+    calls (one call per transfer client and up to ``batch_size`` tasks)
+    instead of one ``get_task`` call per task. The poll interval starts at
+    ``min_interval`` and is multiplied by ``backoff`` after every poll in
+    which no task made progress, up to ``max_interval``; any progress, or a
+    newly tracked task, resets it.
+
+    :meth:`track` returns a :class:`concurrent.futures.Future` that resolves
+    to ``{task_id: status}`` once all the given tasks succeeded, or fails
+    with :class:`TransferFailedError` as soon as one of them fails, so the
+    caller can attach a continuation instead of blocking.
+
+    :param logger: The logger where to log information/warning or errors.
+    :type logger: Optional[logging.Logger]
+    """
+
+    batch_size = 100
+
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        min_interval: float = 0.5,
+        max_interval: float = 30.0,
+        backoff: float = 2.0,
+    ) -> None:
+        threading.Thread.__init__(self, name="TransferTracker", daemon=True)
+        self._logger: logging.Logger = (
+            logging.getLogger(__name__) if logger is None else logger
+        )
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff = backoff
+        self._interval = min_interval
+
+        self._cond = threading.Condition()
+        self._tasks = {}
+        self._stopped = False
+
+    @property
+    def outstanding(self) -> int:
+        """Number of Globus tasks still being tracked."""
+        with self._cond:
+            return len(self._tasks)
+
+    def track(
+        self,
+        transfer_client,
+        task_files: dict,
+        on_progress: Optional[Callable[[dict], None]] = None,
+    ) -> Future:
+        """Track a set of Globus tasks belonging to one activity.
+
+        :param transfer_client: Globus TransferClient owning the tasks.
+        :param task_files: Task id -> destination paths of its files.
+        :type task_files: dict
+        :param on_progress: Called from the tracker thread with a progress
+            report whenever a task's status or file counts change.
+        :type on_progress: Optional[Callable[[dict], None]]
+        :return: Future resolving to {task_id: status}.
+        :rtype: concurrent.futures.Future
+        """
+        group = _TrackedGroup(task_files, on_progress)
+        if not task_files:
+            group.future.set_result({})
+            return group.future
+
+        with self._cond:
+            for task_id, files in task_files.items():
+                self._tasks[task_id] = _TrackedTask(
+                    task_id, transfer_client, group, files
+                )
+            self._interval = self._min_interval
+            self._cond.notify()
+        return group.future
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._tasks and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                tasks = list(self._tasks.values())
+
+            changed = self.poll(tasks)
+
+            with self._cond:
+                if changed:
+                    self._interval = self._min_interval
+                else:
+                    self._interval = min(
+                        self._interval * self._backoff, self._max_interval
+                    )
+                # Woken early when new tasks are tracked or on stop.
+                self._cond.wait(self._interval)
+
+    def poll(self, tasks: list) -> bool:
+        """Poll a list of tracked tasks once.
+
+        :return: True if any task changed status or made progress.
+        :rtype: bool
+        """
+        by_client = {}
+        for task in tasks:
+            by_client.setdefault(id(task.client), []).append(task)
+
+        changed = False
+        for client_tasks in by_client.values():
+            client = client_tasks[0].client
+            for start in range(0, len(client_tasks), self.batch_size):
+                batch = {
+                    task.task_id: task
+                    for task in client_tasks[start : start + self.batch_size]
+                }
+                try:
+                    docs = client.task_list(
+                        filter="task_id:" + ",".join(batch), limit=len(batch)
+                    )
+                except Exception as e:
+                    self._logger.error(f"[tracker] Unable to poll Globus tasks: {e}")
+                    continue
+                for doc in docs:
+                    task = batch.get(doc["task_id"])
+                    if task is not None:
+                        changed |= self._update(task, doc)
+        return changed
+
+    def _update(self, task: _TrackedTask, doc) -> bool:
+        progress = (
+            doc.get("files_transferred", 0),
+            doc.get("files_skipped", 0),
+            doc.get("bytes_transferred", 0),
+        )
+        status = doc["status"]
+        if status == task.status and progress == task.progress:
+            return False
+        task.status = status
+        task.progress = progress
+
+        report = {
+            "task_id": task.task_id,
+            "status": status,
+            "files": doc.get("files", len(task.files)),
+            "files_transferred": progress[0],
+            "files_skipped": progress[1],
+            "bytes_transferred": progress[2],
+            "paths": task.files,
+        }
+        self._logger.debug(
+            f"[tracker] Task {task.task_id} {status}: "
+            f"{progress[0] + progress[1]}/{report['files']} files"
+        )
+        group = task.group
+        if group.on_progress is not None:
+            try:
+                group.on_progress(report)
+            except Exception as e:
+                self._logger.error(f"[tracker] Progress callback failed: {e}")
+
+        if status in ("SUCCEEDED", "FAILED"):
+            self._finish(task)
+        return True
+
+    def _finish(self, task: _TrackedTask) -> None:
+        group = task.group
+        with self._cond:
+            self._tasks.pop(task.task_id, None)
+            group.pending.discard(task.task_id)
+            group.statuses[task.task_id] = task.status
+            if task.status == "FAILED":
+                # Stop tracking the rest of the group; the activity failed.
+                for task_id in group.pending:
+                    self._tasks.pop(task_id, None)
+                group.pending.clear()
+            done = not group.pending
+
+        if not done or group.future.done():
+            return
+        if task.status == "FAILED":
+            group.future.set_exception(
+                TransferFailedError(f"Globus task {task.task_id} failed.")
+            )
+        else:
+            group.future.set_result(dict(group.statuses))
+
+
+_shared_tracker = None
+_shared_tracker_lock = threading.Lock()
+
+
+def get_transfer_tracker(logger: Optional[logging.Logger] = None) -> TransferTracker:
+    """Return the process-wide TransferTracker, starting it on first use."""
+    global _shared_tracker
+    with _shared_tracker_lock:
+        if _shared_tracker is None or not _shared_tracker.is_alive():
+            _shared_tracker = TransferTracker(logger=logger)
+            _shared_tracker.start()
+        return _shared_tracker
@@ -0,0 +1,364 @@
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+import logging
+import threading
+import time
+
+from collections import deque
+from typing import Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from zambeze.config import LOCAL_DB_FILE
+from zambeze.orchestration.db.dao.dao_utils import create_local_db, get_db_engine
+from zambeze.orchestration.message import wire_format
+
+# Lifecycle timestamps an event may carry, in epoch milliseconds.
+_TIMESTAMPS = ("queued_at", "started_at", "ended_at")
+
+_UPSERT_STMT = text(
+    """INSERT INTO activity
+    (agent_id, created_at, campaign_id, activity_uuid, status,
+     queued_at, started_at, ended_at)
+    VALUES
+    (:agent_id, :created_at, :campaign_id, :activity_uuid, :status,
+     :queued_at, :started_at, :ended_at)
+    ON CONFLICT (activity_uuid) DO UPDATE SET
+    agent_id = COALESCE(excluded.agent_id, activity.agent_id),
+    campaign_id = COALESCE(excluded.campaign_id, activity.campaign_id),
+    status = COALESCE(excluded.status, activity.status),
+    queued_at = COALESCE(excluded.queued_at, activity.queued_at),
+    started_at = COALESCE(excluded.started_at, activity.started_at),
+    ended_at = COALESCE(excluded.ended_at, activity.ended_at)"""
+)
+
+
+_CHECKPOINT_STMT = text(
+    """INSERT OR REPLACE INTO checkpoint (campaign_id, node_id, node)
+    VALUES (:campaign_id, :node_id, :node)"""
+)
+
+_FORGET_STMT = text(
+    "DELETE FROM checkpoint WHERE campaign_id = :campaign_id AND node_id = :node_id"
+)
+
+_FINAL_STATUSES_STMT = text(
+    """SELECT campaign_id, activity_uuid, status FROM activity
+    WHERE campaign_id IN :campaign_ids AND status IN ('SUCCEEDED', 'FAILED')"""
+).bindparams(bindparam("campaign_ids", expanding=True))
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class ActivityStore(threading.Thread):
+    """Write-behind store of the activity lifecycle in the local database.
+
+    :meth:`record` only appends the event to an in-memory queue, so the
+    executor never waits on SQLite. The store thread writes the queue once
+    ``batch_size`` events are waiting or ``linger`` seconds after the first
+    event of a batch arrived, whichever comes first. A batch is written in a
+    single transaction, after the events of each activity in it have been
+    merged into one row, and is upserted on the activity's DAG ID.
+
+    The store also checkpoints the DAG nodes an agent accepted, until they
+    are finished, so that :meth:`recover` can hand them back after a crash
+    together with the final statuses known for their campaigns.
+
+    :param agent_id: ID of the agent recording the events.
+    :type agent_id: Optional[str]
+    :param logger: The logger where to log information/warning or errors.
+    :type logger: Optional[logging.Logger]
+    :param batch_size: Number of queued events that triggers a write.
+    :type batch_size: int
+    :param linger: Seconds to wait for a batch to fill before writing.
+    :type linger: float
+    :param db_file: Path of the SQLite database.
+    :type db_file: str
+    """
+
+    def __init__(
+        self,
+        agent_id: Optional[str] = None,
+        logger: Optional[logging.Logger] = None,
+        batch_size: int = 256,
+        linger: float = 0.05,
+        db_file: str = LOCAL_DB_FILE,
+    ) -> None:
+        threading.Thread.__init__(self, name="ActivityStore", daemon=True)
+        self._logger: logging.Logger = (
+            logging.getLogger(__name__) if logger is None else logger
+        )
+        self.agent_id = agent_id
+        self._batch_size = batch_size
+        self._linger = linger
+        self._engine = get_db_engine(db_file)
+        create_local_db(db_file)
+
+        # Guards the pending events; notified when events are queued and
+        # when a batch has been written, so flush() can wait on it.
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._writing = 0
+        self._flushing = 0
+        self._stopped = False
+
+        self._written = 0
+        self._batches = 0
+        self._errors = 0
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    def record(
+        self,
+        activity_id: str,
+        campaign_id: Optional[str] = None,
+        status: Optional[str] = None,
+        **timestamps,
+    ) -> None:
+        """Queue a lifecycle event of an activity.
+
+        :param activity_id: ID of the activity in its campaign DAG.
+        :type activity_id: str
+        :param campaign_id: ID of the campaign of the activity.
+        :type campaign_id: Optional[str]
+        :param status: New status, e.g. QUEUED, RUNNING, SUCCEEDED or FAILED.
+        :type status: Optional[str]
+        :param timestamps: ``queued_at``, ``started_at`` and/or ``ended_at``
+            in epoch milliseconds.
+        """
+        unknown = set(timestamps) - set(_TIMESTAMPS)
+        if unknown:
+            raise ValueError(f"Unknown activity timestamps: {sorted(unknown)}")
+        event = {
+            "activity_uuid": activity_id,
+            "campaign_id": campaign_id,
+            "status": status,
+            **timestamps,
+        }
+        self._queue(("activity", event))
+
+    def checkpoint(self, dag_msg: tuple, wait: bool = False) -> None:
+        """Queue a DAG node to keep until :meth:`forget` is called for it.
+
+        :param dag_msg: DAG node of the form (activity_id, node_data)
+        :type dag_msg: tuple
+        :param wait: Write the node before returning instead of behind, e.g.
+            before acknowledging the message that carried it.
+        :type wait: bool
+        :raises SQLAlchemyError: If ``wait`` and the node could not be written.
+        """
+        key = (dag_msg[1]["campaign_id"], dag_msg[0])
+        node = wire_format.encode_node(dag_msg)
+        if not wait:
+            self._queue(("checkpoint", key, node))
+            return
+        with self._engine.begin() as conn:
+            conn.execute(
+                _CHECKPOINT_STMT,
+                [{"campaign_id": key[0], "node_id": key[1], "node": node}],
+            )
+
+    def forget(self, campaign_id: str, node_id: str) -> None:
+        """Queue the removal of a checkpointed DAG node."""
+        self._queue(("checkpoint", (campaign_id, node_id), None))
+
+    def recover(self) -> tuple:
+        """Checkpointed DAG nodes and the final statuses of their campaigns.
+
+        :return: The DAG nodes, and a ``{(campaign_id, activity_id): status}``
+            dict of the activities of those campaigns that SUCCEEDED or FAILED.
+        :rtype: tuple[list, dict]
+        """
+        with self._engine.connect() as conn:
+            nodes = [
+                wire_format.decode_node(row.node)
+                for row in conn.execute(text("SELECT node FROM checkpoint"))
+            ]
+            campaign_ids = sorted({node[1]["campaign_id"] for node in nodes})
+            statuses = {}
+            if campaign_ids:
+                result = conn.execute(
+                    _FINAL_STATUSES_STMT, {"campaign_ids": campaign_ids}
+                )
+                statuses = {
+                    (row.campaign_id, row.activity_uuid): row.status for row in result
+                }
+        return nodes, statuses
+
+    def _queue(self, item: tuple) -> None:
+        with self._cond:
+            self._pending.append(item)
+            if len(self._pending) == 1 or len(self._pending) >= self._batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued event has been written.
+
+        :return: False if the timeout expired first.
+        :rtype: bool
+        """
+        with self._cond:
+            # Cuts the linger of the current batch short.
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(
+                    lambda: not self._pending and not self._writing, timeout
+                )
+            finally:
+                self._flushing -= 1
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Write outstanding events and join."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self.join(timeout)
+
+    def query(
+        self, campaign_id: Optional[str] = None, status: Optional[str] = None
+    ) -> list:
+        """Rows of the recorded activities, optionally filtered.
+
+        Only events that have been written are visible; call :meth:`flush`
+        first to include the queued ones.
+
+        :rtype: list[dict]
+        """
+        clauses = ["activity_uuid IS NOT NULL"]
+        if campaign_id is not None:
+            clauses.append("campaign_id = :campaign_id")
+        if status is not None:
+            clauses.append("status = :status")
+        stmt = text(
+            "SELECT activity_uuid, agent_id, campaign_id, status, created_at, "
+            "queued_at, started_at, ended_at FROM activity WHERE "
+            + " AND ".join(clauses)
+        )
+        with self._engine.connect() as conn:
+            result = conn.execute(stmt, {"campaign_id": campaign_id, "status": status})
+            return [dict(row._mapping) for row in result]
+
+    @property
+    def stats(self) -> dict:
+        """Counters describing the store."""
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "written": self._written,
+                "batches": self._batches,
+                "errors": self._errors,
+            }
+
+    # ------------------------------------------------------------------ #
+    # Store thread
+    # ------------------------------------------------------------------ #
+    def run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stopped)
+                if not self._pending:
+                    return
+                # Give the batch a chance to fill up.
+                self._cond.wait_for(
+                    lambda: (
+                        len(self._pending) >= self._batch_size
+                        or self._stopped
+                        or self._flushing
+                    ),
+                    self._linger,
+                )
+                count = min(self._batch_size, len(self._pending))
+                batch = [self._pending.popleft() for _ in range(count)]
+                self._writing = count
+
+            written = self._write(batch)
+
+            with self._cond:
+                if written:
+                    self._written += count
+                    self._batches += 1
+                else:
+                    self._errors += 1
+                self._writing = 0
+                self._cond.notify_all()
+
+    def _write(self, batch: list) -> bool:
+        # Later events of an activity override the fields they set, and the
+        # last checkpoint or forget of a node wins.
+        rows = {}
+        checkpoints = {}
+        created_at = now_ms()
+        for item in batch:
+            if item[0] == "checkpoint":
+                checkpoints[item[1]] = item[2]
+                continue
+            event = item[1]
+            row = rows.setdefault(
+                event["activity_uuid"],
+                {
+                    "agent_id": self.agent_id,
+                    "created_at": created_at,
+                    "campaign_id": None,
+                    "status": None,
+                    "queued_at": None,
+                    "started_at": None,
+                    "ended_at": None,
+                },
+            )
+            row.update({k: v for k, v in event.items() if v is not None})
+
+        saved = [
+            {"campaign_id": key[0], "node_id": key[1], "node": node}
+            for key, node in checkpoints.items()
+            if node is not None
+        ]
+        forgotten = [
+            {"campaign_id": key[0], "node_id": key[1]}
+            for key, node in checkpoints.items()
+            if node is None
+        ]
+        try:
+            with self._engine.begin() as conn:
+                if rows:
+                    conn.execute(_UPSERT_STMT, list(rows.values()))
+                if saved:
+                    conn.execute(_CHECKPOINT_STMT, saved)
+                if forgotten:
+                    conn.execute(_FORGET_STMT, forgotten)
+        except SQLAlchemyError as e:
+            self._logger.error(
+                f"[store] Unable to record {len(batch)} activity events: {e}"
+            )
+            return False
+        return True
+
+
+_shared_stores = {}
+_shared_stores_lock = threading.Lock()
+
+
+def get_activity_store(
+    settings, agent_id: Optional[str] = None, logger: Optional[logging.Logger] = None
+) -> ActivityStore:
+    """Return the process-wide, started ActivityStore of the local database."""
+    config = settings.settings.get("activity_store", {})
+    with _shared_stores_lock:
+        store = _shared_stores.get(LOCAL_DB_FILE)
+        if store is None:
+            store = ActivityStore(
+                agent_id=agent_id,
+                logger=logger,
+                batch_size=config.get("batch_size", 256),
+                linger=config.get("linger_ms", 50) / 1000,
+            )
+            store.start()
+            _shared_stores[LOCAL_DB_FILE] = store
+        return store
@@ -14,7 +14,7 @@ class ActivityDAO(AbstractDAO):
         self._logger.debug(f"\t Values: {values}")
 
         try:
-            with self._engine.connect() as conn:
+            with self._engine.begin() as conn:
                 conn.execute(text(insert_stmt), values)
         except SQLAlchemyError as e:
             msg = f"Insert error with the local db. Exception was {e}"
@@ -29,7 +29,7 @@ class ActivityDAO(AbstractDAO):
         self._logger.debug(f"\t Values: {values}")
 
         try:
-            with self._engine.connect() as conn:
+            with self._engine.begin() as conn:
                 result = conn.execute(text(insert_stmt), values)
                 _id = result.lastrowid
         except SQLAlchemyError as e:
@@ -44,7 +44,7 @@ class ActivityDAO(AbstractDAO):
         update_stmt = get_update_stmt(entity)
 
         try:
-            with self._engine.connect() as conn:
+            with self._engine.begin() as conn:
                 conn.execute(text(update_stmt), values)
         except SQLAlchemyError as e:
             msg = f"Update error with the local db. Exception was {e}"
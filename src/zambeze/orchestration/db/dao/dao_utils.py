@@ -1,29 +1,78 @@
+import threading
+
 from textwrap import dedent
-from sqlalchemy import text, create_engine
+from sqlalchemy import event, text, create_engine
 from sqlalchemy.exc import SQLAlchemyError
 
 from zambeze.config import LOCAL_DB_SCHEMA, LOCAL_DB_FILE
 from zambeze.orchestration.db.model.abstract_entity import AbstractEntity
 
+# Columns added to the activity table after its first release, created on
+# databases that predate them.
+ACTIVITY_MIGRATIONS = {
+    "campaign_id": "TEXT",
+    "activity_uuid": "TEXT",
+    "status": "TEXT",
+    "queued_at": "INTEGER",
+}
 
-def create_local_db() -> None:
-    eng = get_db_engine()
-
-    with open(LOCAL_DB_SCHEMA) as f:
-        ff = f.read()
+_engines = {}
+_engines_lock = threading.Lock()
 
-    with eng.connect() as conn:
-        conn.execute(text(ff))
 
+def create_local_db(db_file: str = LOCAL_DB_FILE) -> None:
+    eng = get_db_engine(db_file)
 
-def get_db_engine():
-    db_uri = f"sqlite:///{LOCAL_DB_FILE}"
+    with open(LOCAL_DB_SCHEMA) as f:
+        ff = f.read()
 
-    try:
-        engine = create_engine(db_uri)
-    except SQLAlchemyError:
-        print(f"Could not create db engine with uri: {db_uri}")
-        raise
+    statements = [stmt.strip() for stmt in ff.split(";") if stmt.strip()]
+    tables = [stmt for stmt in statements if "CREATE TABLE" in stmt]
+    others = [stmt for stmt in statements if "CREATE TABLE" not in stmt]
+
+    with eng.begin() as conn:
+        for stmt in tables:
+            conn.execute(text(stmt))
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(activity)"))}
+        for name, column_type in ACTIVITY_MIGRATIONS.items():
+            if name not in columns:
+                conn.execute(
+                    text(f"ALTER TABLE activity ADD COLUMN {name} {column_type}")
+                )
+        # Indexes come last, they may be on the migrated columns.
+        for stmt in others:
+            conn.execute(text(stmt))
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # WAL lets readers run while the activity store writes, and NORMAL
+    # sync is durable across application crashes in WAL mode.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def get_db_engine(db_file: str = LOCAL_DB_FILE):
+    """Return the engine of a local database, shared by the whole process.
+
+    Engines hold the connection pool, so they are created once per database
+    file instead of once per DAO.
+    """
+    db_uri = f"sqlite:///{db_file}"
+
+    with _engines_lock:
+        engine = _engines.get(db_uri)
+        if engine is not None:
+            return engine
+        try:
+            engine = create_engine(db_uri)
+        except SQLAlchemyError:
+            print(f"Could not create db engine with uri: {db_uri}")
+            raise
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+        _engines[db_uri] = engine
 
     return engine
 
@@ -4,7 +4,10 @@ from typing import Dict
 
 class ActivityModel(AbstractEntity):
     ID_FIELD_NAME = "activity_id"
-    FIELD_NAMES = "activity_id, agent_id, created_at, started_at, ended_at, params"
+    FIELD_NAMES = (
+        "activity_id, agent_id, created_at, started_at, ended_at, params, "
+        "campaign_id, activity_uuid, status, queued_at"
+    )
     ENTITY_NAME = "Activity"
 
     def __init__(
@@ -15,6 +18,10 @@ class ActivityModel(AbstractEntity):
         started_at=None,
         ended_at=None,
         params=None,
+        campaign_id=None,
+        activity_uuid=None,
+        status=None,
+        queued_at=None,
     ):
         self.activity_id = activity_id
         self.agent_id = agent_id
@@ -22,6 +29,10 @@ class ActivityModel(AbstractEntity):
         self.started_at = started_at
         self.ended_at = ended_at
         self.params = params
+        self.campaign_id = campaign_id
+        self.activity_uuid = activity_uuid
+        self.status = status
+        self.queued_at = queued_at
 
     def get_all_values(self) -> Dict:
         vals = {
@@ -31,6 +42,10 @@ class ActivityModel(AbstractEntity):
             "started_at": self.started_at,
             "ended_at": self.ended_at,
             "params": self.params,
+            "campaign_id": self.campaign_id,
+            "activity_uuid": self.activity_uuid,
+            "status": self.status,
+            "queued_at": self.queued_at,
         }
         return vals
 
@@ -41,5 +56,9 @@ class ActivityModel(AbstractEntity):
             "started_at": self.started_at,
             "ended_at": self.ended_at,
             "params": self.params,
+            "campaign_id": self.campaign_id,
+            "activity_uuid": self.activity_uuid,
+            "status": self.status,
+            "queued_at": self.queued_at,
         }
         return vals
@@ -0,0 +1,145 @@
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+import logging
+import threading
+
+from collections import defaultdict
+from typing import Callable, Optional
+
+
+class DependencyTracker:
+    """Track predecessor completion for the DAG nodes held by an executor.
+
+    Every waiting activity keeps an indegree count of the predecessors it is
+    still waiting on. Control messages are fed in through :meth:`update` as
+    they arrive, and an activity is handed to ``on_ready`` as soon as its last
+    predecessor succeeds. If a predecessor fails, the activity is handed to
+    ``on_failed`` instead so the failure can propagate down the DAG.
+
+    Activities are keyed by ``(campaign_id, activity_id)`` because the
+    ``MONITOR`` and ``TERMINATOR`` node ids are shared by every campaign. A
+    ``MONITOR`` predecessor is met once a ``MONITORING`` heartbeat has been
+    seen for the campaign.
+
+    :param on_ready: Called with the DAG node once all predecessors succeeded.
+    :type on_ready: Callable[[tuple], None]
+    :param on_failed: Called with the DAG node and the failed predecessor id.
+    :type on_failed: Callable[[tuple, str], None]
+    :param logger: The logger where to log information/warning or errors.
+    :type logger: Optional[logging.Logger]
+    """
+
+    def __init__(
+        self,
+        on_ready: Callable[[tuple], None],
+        on_failed: Callable[[tuple, str], None],
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._logger: logging.Logger = (
+            logging.getLogger(__name__) if logger is None else logger
+        )
+        self._on_ready = on_ready
+        self._on_failed = on_failed
+        self._lock = threading.Lock()
+
+        # Last status seen for every (campaign_id, activity_id).
+        self._statuses = {}
+        # (campaign_id, activity_id) -> [indegree, dag_msg] for waiting nodes.
+        self._waiting = {}
+        # (campaign_id, predecessor_id) -> keys of the nodes waiting on it.
+        self._dependents = defaultdict(list)
+
+    @staticmethod
+    def _is_satisfied(activity_id: str, status: Optional[str]) -> bool:
+        if activity_id == "MONITOR":
+            return status in ("MONITORING", "SUCCEEDED")
+        return status == "SUCCEEDED"
+
+    @property
+    def waiting(self) -> int:
+        """Number of activities still waiting on predecessors."""
+        with self._lock:
+            return len(self._waiting)
+
+    def status(self, campaign_id: str, activity_id: str) -> Optional[str]:
+        """Last status seen for an activity, or None if nothing was received."""
+        with self._lock:
+            return self._statuses.get((campaign_id, activity_id))
+
+    def add(self, dag_msg: tuple) -> None:
+        """Register a DAG node and release it if its predecessors are met.
+
+        :param dag_msg: DAG node of the form (activity_id, node_data)
+        :type dag_msg: tuple
+        """
+        activity_id, node_data = dag_msg
+        campaign_id = node_data["campaign_id"]
+        key = (campaign_id, activity_id)
+
+        failed_pred = None
+        with self._lock:
+            pending = []
+            for pred_id in node_data["predecessors"]:
+                status = self._statuses.get((campaign_id, pred_id))
+                if self._is_satisfied(pred_id, status):
+                    continue
+                if status == "FAILED":
+                    failed_pred = pred_id
+                    break
+                pending.append(pred_id)
+
+            if failed_pred is None and pending:
+                self._waiting[key] = [len(pending), dag_msg]
+                for pred_id in pending:
+                    self._dependents[(campaign_id, pred_id)].append(key)
+                self._logger.debug(
+                    "[tracker] %s waiting on %d predecessors", activity_id, len(pending)
+                )
+                return
+
+        if failed_pred is not None:
+            self._on_failed(dag_msg, failed_pred)
+        else:
+            self._on_ready(dag_msg)
+
+    def update(self, control_msg: dict) -> None:
+        """Record a status/control message and release any unblocked nodes.
+
+        :param control_msg: Control message with at least ``activity_id``,
+            ``status`` and ``campaign_id`` keys.
+        :type control_msg: dict
+        """
+        campaign_id = control_msg.get("campaign_id")
+        activity_id = control_msg["activity_id"]
+        status = control_msg["status"]
+        key = (campaign_id, activity_id)
+
+        ready = []
+        failed = []
+        with self._lock:
+            # Never let a late heartbeat or duplicate downgrade a final state.
+            if self._statuses.get(key) not in ("SUCCEEDED", "FAILED"):
+                self._statuses[key] = status
+
+            if self._is_satisfied(activity_id, status):
+                for dependent in self._dependents.pop(key, []):
+                    entry = self._waiting.get(dependent)
+                    if entry is None:
+                        continue
+                    entry[0] -= 1
+                    if entry[0] == 0:
+                        del self._waiting[dependent]
+                        ready.append(entry[1])
+            elif status == "FAILED":
+                for dependent in self._dependents.pop(key, []):
+                    entry = self._waiting.pop(dependent, None)
+                    if entry is not None:
+                        failed.append(entry[1])
+
+        for dag_msg in ready:
+            self._on_ready(dag_msg)
+        for dag_msg in failed:
+            self._on_failed(dag_msg, activity_id)
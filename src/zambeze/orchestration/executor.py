@@ -5,17 +5,21 @@
 
 import logging
 import os
-import requests
 import threading
-import time
 
-from queue import Queue, Empty
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Queue
 from typing import Optional
 
+from zambeze.orchestration.dependency_tracker import DependencyTracker
 from zambeze.orchestration.monitor import Monitor
 from zambeze.settings import ZambezeSettings
 from zambeze.orchestration.message.message_factory import MessageFactory
+from zambeze.orchestration.data.result_cache import ResultCache, get_result_cache
+from zambeze.orchestration.data.staging_cache import get_staging_cache
 from zambeze.orchestration.data.transfer_hippo import TransferHippo
+from zambeze.orchestration.db.activity_store import get_activity_store, now_ms
+from zambeze.utils.structured_log import event
 
 
 class Executor(threading.Thread):
@@ -44,13 +48,16 @@ class Executor(threading.Thread):
         self.to_status_q = Queue()
         self.to_new_activity_q = Queue()
 
-        # add incoming control queue for making predecessor decisions.
-        self.incoming_control_q = Queue()
-
         self._logger.info("[EXECUTOR] Creating executor...")
         self._agent_id = agent_id
 
-        self.control_dict = dict()
+        # Releases activities as soon as their predecessors finish; fed with
+        # control messages by the agent's control receiver thread.
+        self.dependency_tracker = DependencyTracker(
+            on_ready=self._submit_activity,
+            on_failed=self._fail_activity,
+            logger=self._logger,
+        )
 
         try:
             self._msg_factory = MessageFactory(logger=self._logger)
@@ -60,14 +67,39 @@ class Executor(threading.Thread):
         except Exception as e:
             self._logger.error(str(e))
 
-        # Initially we don't have a monitor. This can become a Monitor Thread object.
-        # It can revert to None.
-        self.monitor = None
+        # Activities whose predecessors are met run concurrently on this pool.
+        max_workers = self._settings.settings["executor"]["max_workers"]
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ExecutorWorker"
+        )
+        self._logger.info(f"[executor] Worker pool size: {max_workers}")
+
+        # Lifecycle of every activity run here, written behind to the local db.
+        self._store = get_activity_store(
+            self._settings, agent_id=self._agent_id, logger=self._logger
+        )
+
+        # One monitor service per agent tracks every campaign whose MONITOR
+        # node lands here; its heartbeats go straight out on to_status_q.
+        self.monitor = Monitor(
+            to_status_q=self.to_status_q,
+            logger=self._logger,
+            on_completed=lambda campaign_id: self._store.forget(campaign_id, "MONITOR"),
+        )
+
+        # (campaign_id, activity_id) of the activities accepted by this
+        # executor, and the final status of those that finished, including
+        # before a restart, so redelivered nodes are not run again.
+        self._accepted = set()
+        self._finished = {}
+        # When the activities running here started, in epoch milliseconds.
+        self._start_times = {}
         self._logger.info("[executor] Successfully initialized Executor!")
 
     def run(self):
         """Override the Thread 'run' method to instead run our
         process when Thread.start() is called!"""
+        self.monitor.start()
         # Create persisent "__process()"
         self.__process()
 
@@ -76,22 +108,17 @@ class Executor(threading.Thread):
         Evaluate and process messages if requested activity is supported.
         """
 
-        self._logger.info("[executor] In __process! ")
-
-        self._logger.info("eins")
-
         # Change to the agent's desired working directory.
         default_working_dir = self._settings.settings["plugins"]["All"][
             "default_working_directory"
         ]
         self._logger.info(
-            f"[executor] Moving to working directory {default_working_dir}"
+            "[executor] Moving to working directory %s", default_working_dir
         )
 
         try:
             # First try to switch into working directory if it exists.
             os.chdir(default_working_dir)
-            self._logger.info("zwei")
         except FileNotFoundError:
             self._logger.error(
                 "[exec] Working directory not found... attempting to create!"
@@ -99,31 +126,29 @@ class Executor(threading.Thread):
             os.makedirs(default_working_dir)
             self._logger.error("[exec] Working directory successfully created!")
         except Exception as e2:
-            self._logger.error(f"[exec]CAUGHT: {type(e2).__name__}")
-            self._logger.error(f"[exec] CAUGHT: {e2}")
+            self._logger.error("[exec] CAUGHT: %s: %s", type(e2).__name__, e2)
+        # TODO -- bring the plugin checks back in next version.
+        self._logger.warning("[exec] Plugin checks are skipped before running.")
 
         monitor_launched = False
         terminator_stopped = False
 
         while True:
-            self._logger.info("[exec] Retrieving a message! ")
-            self._logger.info(f" SIZE OF QUEUE: {self.to_process_q.qsize()}")
             dag_msg = self.to_process_q.get()
+            self._logger.debug(
+                "[exec] Retrieved message %s",
+                dag_msg[0],
+                extra=event("retrieved", dag_msg[1]["campaign_id"], dag_msg[0]),
+            )
 
-            self._logger.debug(f"[exec] Retrieved message! {dag_msg}...")
-
-            # Check 1. If MONITOR, then we want to STICK the process
+            # Check 1. If MONITOR, register the campaign with the monitor.
             if dag_msg[0] == "MONITOR":
-                self._logger.info("[executor] (E117) ENTERING MONITOR TASK THREAD!")
-                monitor_thread = Monitor(dag_msg, self._logger)
-                monitor_thread.start()
-
-                self._logger.info("[executor] (E121) Creating MONITOR reader thread!")
-                monitor_reader = threading.Thread(target=self.monitor_check, args=())
-                monitor_reader.start()
-
-                # Save the monitor thread so we can scan it.
-                self.monitor = monitor_thread
+                self._logger.info(
+                    "[executor] Monitoring campaign %s",
+                    dag_msg[1]["campaign_id"],
+                    extra=event("monitor", dag_msg[1]["campaign_id"]),
+                )
+                self.monitor.add_campaign(dag_msg)
                 monitor_launched = True
 
             elif dag_msg[0] == "TERMINATOR":
@@ -131,6 +156,7 @@ class Executor(threading.Thread):
                 status_msg = {
                     "status": "SUCCEEDED",
                     "activity_id": dag_msg[0],
+                    "campaign_id": dag_msg[1]["campaign_id"],
                     "msg": "TERMINATION CONDITION ACTIVATED.",
                 }
 
@@ -140,193 +166,381 @@ class Executor(threading.Thread):
                 self.to_status_q.put(status_msg)
                 terminator_stopped = True
 
-            s = f"[exec] Monitor launched {monitor_launched}"
-            s2 = f", Terminator stopped: {terminator_stopped}"
-            self._logger.info(s + s2)
-
             # If we were just launching monitor, go to top of loop; start over.
             if monitor_launched or terminator_stopped:
                 monitor_launched = False
                 terminator_stopped = False
                 continue
 
-            activity_msg = dag_msg[1]["activity"]
-            predecessors = dag_msg[1]["predecessors"]
+            # Predecessors are resolved by the dependency tracker; the node is
+            # submitted to the worker pool once they have all succeeded.
+            # Nodes were checkpointed by the message handler before being
+            # acknowledged, or recovered from their checkpoint.
+            if not self._accept(dag_msg):
+                continue
+            self._store.record(
+                dag_msg[0],
+                dag_msg[1]["campaign_id"],
+                "QUEUED",
+                queued_at=now_ms(),
+            )
+            self._logger.debug(
+                "[exec] Activity %s has predecessors: %s",
+                dag_msg[0],
+                dag_msg[1]["predecessors"],
+                extra=event("queued", dag_msg[1]["campaign_id"], dag_msg[0]),
+            )
+            self.dependency_tracker.add(dag_msg)
+
+    def _accept(self, dag_msg) -> bool:
+        """Whether an activity node should be run, i.e. is not a duplicate."""
+        key = (dag_msg[1]["campaign_id"], dag_msg[0])
+        status = self._finished.get(key)
+        if status is not None:
+            # Finished already, e.g. before a restart; tell the campaign again.
+            self._logger.info(f"[exec] Activity {dag_msg[0]} already {status}.")
+            # Checkpointed again when redelivered.
+            self._store.forget(*key)
+            self.to_status_q.put(
+                {
+                    "status": status,
+                    "activity_id": dag_msg[0],
+                    "campaign_id": key[0],
+                    "msg": "ACTIVITY ALREADY COMPLETED.",
+                }
+            )
+            return False
+        if key in self._accepted:
+            self._logger.info(f"[exec] Ignoring duplicate activity {dag_msg[0]}.")
+            return False
+        self._accepted.add(key)
+        return True
+
+    def recover(self) -> int:
+        """Resume the campaigns checkpointed before the agent stopped.
+
+        Monitored campaigns are registered again and caught up with the
+        final statuses recorded for them. Activities that had not finished
+        are queued for processing again; the SUCCEEDED and FAILED statuses
+        release or fail their successors as usual, so finished work is not
+        repeated. Must be called before the executor is started.
+
+        :return: Number of activities queued again.
+        :rtype: int
+        """
+        nodes, statuses = self._store.recover()
+        self._finished.update(statuses)
+
+        monitors = [node for node in nodes if node[0] == "MONITOR"]
+        activities = [node for node in nodes if node[0] != "MONITOR"]
+        for dag_msg in monitors:
+            self.monitor.add_campaign(dag_msg)
+        for (campaign_id, activity_id), status in statuses.items():
+            status_msg = {
+                "status": status,
+                "activity_id": activity_id,
+                "campaign_id": campaign_id,
+            }
+            self.monitor.to_monitor_q.put(status_msg)
+            self.dependency_tracker.update(status_msg)
+        for dag_msg in activities:
+            self.to_process_q.put(dag_msg)
+
+        if nodes:
+            self._logger.info(
+                f"[exec] Recovered {len(monitors)} campaigns and "
+                f"{len(activities)} unfinished activities "
+                f"({len(statuses)} finished)."
+            )
+        return len(activities)
+
+    def update_status(self, control_msg: dict) -> None:
+        """Feed a status/control message to the dependency tracker, and
+        record final statuses so they survive a restart."""
+        self.dependency_tracker.update(control_msg)
+        activity_id = control_msg["activity_id"]
+        if activity_id in ("MONITOR", "TERMINATOR"):
+            return
+        if control_msg.get("status") in ("SUCCEEDED", "FAILED"):
+            self._store.record(
+                activity_id,
+                control_msg.get("campaign_id"),
+                control_msg["status"],
+            )
+
+    def _submit_activity(self, dag_msg) -> None:
+        """Hand an activity whose predecessors succeeded to the worker pool."""
+        self._logger.debug(
+            "[exec] Submitting activity %s to worker pool.",
+            dag_msg[0],
+            extra=event("submitted", dag_msg[1]["campaign_id"], dag_msg[0]),
+        )
+        self._pool.submit(self._guarded, self._run_activity, dag_msg)
 
-            # transfer_params = dag_msg[1]["transfer_params"]
-            transfer_tokens = dag_msg[1]["transfer_tokens"]
+    def _guarded(self, task, dag_msg, *args) -> None:
+        """Run ``task`` on a worker, reporting the activity FAILED if it raises.
 
-            self._logger.info(f"JTRANSFER TOKENS: {transfer_tokens}")
+        Nothing waits on the futures of the pool, so an exception escaping
+        ``task`` would otherwise be dropped and leave its campaign waiting.
+        """
+        try:
+            task(dag_msg, *args)
+        except Exception as e:
+            self._logger.exception(
+                "[exec] Activity %s raised an exception.",
+                dag_msg[0],
+                extra=event("failed", dag_msg[1]["campaign_id"], dag_msg[0]),
+            )
+            if (dag_msg[1]["campaign_id"], dag_msg[0]) in self._finished:
+                # Raised after its status was sent.
+                return
+            status_msg = {
+                "status": "FAILED",
+                "activity_id": dag_msg[0],
+                "campaign_id": dag_msg[1]["campaign_id"],
+                "msg": "ACTIVITY RAISED AN EXCEPTION.",
+                "details": e,
+            }
+            self._report_status(status_msg)
+
+    def _report_status(self, status_msg: dict) -> None:
+        """Send the final status of an activity and record when it ended."""
+        key = (status_msg["campaign_id"], status_msg["activity_id"])
+        self._finished[key] = status_msg["status"]
+        self.to_status_q.put(status_msg)
+        ended_at = now_ms()
+        self._store.record(
+            status_msg["activity_id"],
+            status_msg["campaign_id"],
+            status_msg["status"],
+            ended_at=ended_at,
+        )
+        self._store.forget(status_msg["campaign_id"], status_msg["activity_id"])
 
-            # *** HERE WE DO PREDECESSOR CHECKING (to unlock actual activity task) ***
-            self._logger.info(f"[exec] Activity has predecessors: {predecessors}")
+        started_at = self._start_times.pop(key, None)
+        self._logger.info(
+            "[exec] Activity %s %s: %s",
+            status_msg["activity_id"],
+            status_msg["status"],
+            status_msg["msg"],
+            extra=event(
+                "finished",
+                status_msg["campaign_id"],
+                status_msg["activity_id"],
+                latency_ms=None if started_at is None else ended_at - started_at,
+            ),
+        )
 
-            self._logger.info(f"Foo the bar: {activity_msg}")
-            # STEP 1. Confirm the monitor is MONITORING.
-            campaign_id = activity_msg.campaign_id
+    def _fail_activity(self, dag_msg, failed_pred_id: str) -> None:
+        """Report an activity as FAILED because one of its predecessors failed."""
+        self._logger.error(
+            f"[exec] Skipping {dag_msg[0]}: predecessor {failed_pred_id} failed."
+        )
+        status_msg = {
+            "status": "FAILED",
+            "activity_id": dag_msg[0],
+            "campaign_id": dag_msg[1]["campaign_id"],
+            "msg": "PREDECESSOR FAILED.",
+            "details": failed_pred_id,
+        }
+        self._report_status(status_msg)
+
+    def _run_activity(self, dag_msg) -> None:
+        """
+        Run a single ready activity on a worker thread and report its status
+        through ``to_status_q``.
 
-            if (
-                "MONITOR" in predecessors
-            ):  # TODO: allow MONITOR *AND OTHER* predecessors.
-                self._logger.info(
-                    f"[exec] Checking monitor message for campaign ID: {campaign_id}"
+        Files that have to be transferred are handed to the shared transfer
+        tracker; the activity then continues on the pool once they arrived,
+        so the worker is free for other activities in the meantime.
+
+        :param dag_msg: DAG node of the form (activity_id, node_data)
+        :type dag_msg: tuple
+        """
+        activity_msg = dag_msg[1]["activity"]
+        transfer_tokens = dag_msg[1]["transfer_tokens"]
+        started_at = now_ms()
+        self._start_times[(dag_msg[1]["campaign_id"], dag_msg[0])] = started_at
+        self._store.record(
+            dag_msg[0], dag_msg[1]["campaign_id"], "RUNNING", started_at=started_at
+        )
+
+        # Determine if the shell activity has files that
+        # Need to be moved to be executed
+        if (
+            activity_msg.type.upper() == "SHELL" and activity_msg.files
+        ):  # TODO: I think this always exists and defaults to empty.
+            try:
+                future = start_staging(
+                    activity_msg.files,
+                    self._agent_id,
+                    self._settings,
+                    self._logger,
+                    transfer_tokens,
                 )
+            except Exception as e:
+                self._files_failed(dag_msg, e)
+                return
 
-                # Wait until we receive a monitoring heartbeat.
-                while True:
-                    status_msg = self.incoming_control_q.get()
-                    if (
-                        status_msg["campaign_id"] == campaign_id
-                        and status_msg["status"] == "MONITORING"
-                    ):
-                        self._logger.debug(
-                            "[exec] Eligible MONITOR heartbeat. Continuing!"
-                        )
-                        break
-            # Step 2. If not waiting on monitor... make sure all other predecessors are met.
-            else:
-                self._logger.debug("[exec] Entering predecessor waiting loop...")
-                pred_track_dict = {key: None for key in predecessors}
-
-                # while loop ascertains that we 'keep trying the status scan' until it is
-                # successful (/failed).
-                while True:
-                    success_count = 0
-                    failure_count = 0
-
-                    # for loop means we check every possible predecessor for an activity.
-                    for pred_activity_id in pred_track_dict:
-                        self._logger.debug(
-                            "[exec] Fetching predecessor status message..."
-                        )
-
-                        # A: See if activity in pred_track_dict. If not... continue...
-                        if pred_activity_id not in self.control_dict:
-                            self._logger.info(
-                                f"Predecessor ID: {pred_activity_id} not received. Continuing..."
-                            )
-                            time.sleep(5)  # TODO: remove.
-                            break
-
-                        # B: Check the status of the activity ID.
-                        pred_activity_status = self.control_dict[pred_activity_id][
-                            "status"
-                        ]
-
-                        if pred_activity_status == "SUCCEEDED":
-                            success_count += 1
-                        elif pred_activity_status == "FAILED":
-                            failure_count += 1
-
-                    total_completed = success_count + failure_count
-
-                    self._logger.info(
-                        f"[exec] PREDECESSOR COMPLETED COUNT: {total_completed}"
-                    )
-                    if total_completed == len(pred_track_dict):
-                        break
-
-            if activity_msg.type.upper() == "SHELL":
-                self._logger.info("[exec] SHELL message received:")
-
-                # self._logger.info(activity_msg.data.body)
-
-                # Determine if the shell activity has files that
-                # Need to be moved to be executed
-                if (
-                    activity_msg.files
-                ):  # TODO: I think this always exists and defaults to empty.
-                    self._logger.info("elf")
-                    if len(activity_msg.files) > 0:
-                        self._logger.info("zwolf")
-                        try:
-                            self.__process_files(
-                                activity_msg.files,
-                                activity_msg.campaign_id,
-                                activity_msg.activity_id,
-                                transfer_tokens,
-                            )
-                        except Exception as e:
-                            status_msg = {
-                                "status": "FAILED",
-                                "activity_id": dag_msg[0],
-                                "msg": "UNABLE TO ACQUIRE FILES.",
-                                "details": e,
-                            }
-                            self.to_status_q.put(status_msg)
-                            self._logger.error(
-                                f"[exec] Unable to acquire files. Caught {e}"
-                            )
-                            self._logger.exception("ERROR-123")
-                            continue
-
-                # Running Checks
-                # Returned results should be double nested dict with a tuple of
-                # the form
-                #
-                # "plugin": { "action": (bool, message) }
-                #
-                # The bool is a true or false which indicates if the action
-                # for the plugin is a problem, the message is an error message
-                # or a success statement
-
-                # TODO -- bring these back in next version.
-                # self._logger.info("[EXECUTOR] Command to be executed.")
-                # self._logger.info(json.dumps(data["cmd"], indent=4))
-                self._logger.warning("[exec] SKIPPING FAULTY CHECK...")
-
-                # checked_result = self._settings.plugins.check(activity_msg.data.body)
-                # self._logger.debug(f"[EXECUTOR] Checked result: {checked_result}")
-
-                # TODO: handle failures from the SHELL activity.
-                try:
-                    self._settings.plugins.run(activity_msg)
-                except Exception as e:
-                    self._logger.error(f"[vierzehn] caught: {e}")
-
-                # if checked_result.error_detected() is False:
-                #     self._settings.plugins.run(activity_msg)
-                # else:
-                #     self._logger.debug(
-                #         "Skipping run - error detected when running " "plugin check"
-                #     )
-            elif activity_msg.data.body.type == "TRANSFER":
-                source_file = activity_msg.data
-
-                transfer_hippo = TransferHippo(
-                    agent_id=self._agent_id,
-                    settings=self._settings,
-                    logger=self._logger,
-                    tokens=transfer_tokens,
+            if future is not None:
+                future.add_done_callback(
+                    lambda f: self._pool.submit(self._guarded, self._staged, dag_msg, f)
                 )
+                return
+
+        self._execute_activity(dag_msg)
+
+    def _staged(self, dag_msg, future) -> None:
+        """Continue an activity once its file transfers have finished."""
+        error = future.exception()
+        if error is not None:
+            self._files_failed(dag_msg, error)
+            return
+        self._logger.debug(
+            "[exec] Files of activity %s staged.",
+            dag_msg[0],
+            extra=event("staged", dag_msg[1]["campaign_id"], dag_msg[0]),
+        )
+        self._execute_activity(dag_msg)
+
+    def _files_failed(self, dag_msg, e) -> None:
+        status_msg = {
+            "status": "FAILED",
+            "activity_id": dag_msg[0],
+            "campaign_id": dag_msg[1]["campaign_id"],
+            "msg": "UNABLE TO ACQUIRE FILES.",
+            "details": e,
+        }
+        self._report_status(status_msg)
+        self._logger.error(f"[exec] Unable to acquire files. Caught {e}")
+
+    def _execute_activity(self, dag_msg) -> None:
+        """Run an activity whose files are available locally."""
+        activity_msg = dag_msg[1]["activity"]
+        transfer_tokens = dag_msg[1]["transfer_tokens"]
+        results_cache, result_key = None, None
+
+        if activity_msg.type.upper() == "SHELL":
+            self._logger.debug(
+                "[exec] Running SHELL activity %s",
+                dag_msg[0],
+                extra=event("running", dag_msg[1]["campaign_id"], dag_msg[0]),
+            )
 
-                # Load all files into the TransferHippo.
-                self._logger.info("[exec] Loading files into TransferHippo.")
-                transfer_hippo.load(source_file)
-                # Validate that all files are accessible.
-                self._logger.info("[exec] Validating file accessibility.")
-                transfer_hippo.validate()
-                # Ensure that all authentication is achieved.
-                self._logger.info("[exec] Checking user auth.")
-                transfer_hippo.check_auth()
-                # Submit the transfer
-                self._logger.info("[exec] Submit the transfer.")
-                transfer_hippo.start_transfer()
-                # BLOCK: wait for transfer to finish
-                self._logger.info("[exec] Wait for transfer...")
-                transfer_hippo.transfer_wait()
-                self._logger.info("[exec] File transfer finished!")
-
-            # If we get here, it should be because nothing failed
-            status_msg = {
-                "status": "SUCCEEDED",
-                "activity_id": dag_msg[0],
-                "msg": "SUCCESSFULLY COMPLETED TASK.",
-                "result": None,
-            }
-            self.to_status_q.put(status_msg)
+            if getattr(activity_msg, "memoize", False):
+                results_cache = get_result_cache(self._settings, self._logger)
+            if results_cache is not None:
+                result_key = ResultCache.key(activity_msg)
+            if result_key is not None and results_cache.restore(result_key):
+                status_msg = {
+                    "status": "SUCCEEDED",
+                    "activity_id": dag_msg[0],
+                    "campaign_id": dag_msg[1]["campaign_id"],
+                    "msg": "RESTORED FROM RESULT CACHE.",
+                    "result": None,
+                    "cache_hit": True,
+                }
+                self._report_status(status_msg)
+                return
+
+            # Running Checks
+            # Returned results should be double nested dict with a tuple of
+            # the form
+            #
+            # "plugin": { "action": (bool, message) }
+            #
+            # The bool is a true or false which indicates if the action
+            # for the plugin is a problem, the message is an error message
+            # or a success statement
+
+            # TODO -- bring these back in next version.
+            # self._logger.info("[EXECUTOR] Command to be executed.")
+            # self._logger.info(json.dumps(data["cmd"], indent=4))
+
+            # checked_result = self._settings.plugins.check(activity_msg.data.body)
+            # self._logger.debug(f"[EXECUTOR] Checked result: {checked_result}")
 
-            self._logger.info("[exec] Waiting for messages")
+            try:
+                results = self._settings.plugins.run(activity_msg)
+            except Exception as e:
+                self._logger.error(f"[exec] Activity {dag_msg[0]} failed: {e}")
+                status_msg = {
+                    "status": "FAILED",
+                    "activity_id": dag_msg[0],
+                    "campaign_id": dag_msg[1]["campaign_id"],
+                    "msg": "ACTIVITY RAISED AN EXCEPTION.",
+                    "details": e,
+                }
+                self._report_status(status_msg)
+                return
+
+            failed = [r for r in (results or {}).get("bash", []) if not r.succeeded]
+            if failed:
+                self._logger.error(
+                    f"[exec] Activity {dag_msg[0]} failed: {failed[0].command}"
+                )
+                status_msg = {
+                    "status": "FAILED",
+                    "activity_id": dag_msg[0],
+                    "campaign_id": dag_msg[1]["campaign_id"],
+                    "msg": (
+                        "SHELL COMMAND TIMED OUT."
+                        if failed[0].timed_out
+                        else "SHELL COMMAND EXITED WITH NONZERO STATUS."
+                    ),
+                    "details": {
+                        "returncode": failed[0].returncode,
+                        "stderr": failed[0].stderr,
+                        "rusage": failed[0].rusage,
+                    },
+                }
+                self._report_status(status_msg)
+                return
+
+            if result_key is not None:
+                try:
+                    results_cache.store(result_key, activity_msg.outputs or [])
+                except OSError as e:
+                    self._logger.warning(
+                        f"[exec] Unable to record result of {dag_msg[0]}: {e}"
+                    )
+
+            # if checked_result.error_detected() is False:
+            #     self._settings.plugins.run(activity_msg)
+            # else:
+            #     self._logger.debug(
+            #         "Skipping run - error detected when running " "plugin check"
+            #     )
+        elif activity_msg.data.body.type == "TRANSFER":
+            try:
+                self.__process_files(
+                    activity_msg.data,
+                    activity_msg.campaign_id,
+                    activity_msg.activity_id,
+                    transfer_tokens,
+                )
+            except Exception as e:
+                status_msg = {
+                    "status": "FAILED",
+                    "activity_id": dag_msg[0],
+                    "campaign_id": dag_msg[1]["campaign_id"],
+                    "msg": "UNABLE TO TRANSFER FILES.",
+                    "details": e,
+                }
+                self._report_status(status_msg)
+                self._logger.error(f"[exec] Unable to transfer files. Caught {e}")
+                return
+
+        # If we get here, it should be because nothing failed
+        status_msg = {
+            "status": "SUCCEEDED",
+            "activity_id": dag_msg[0],
+            "campaign_id": dag_msg[1]["campaign_id"],
+            "msg": "SUCCESSFULLY COMPLETED TASK.",
+            "result": None,
+            "cache_hit": False,
+        }
+        self._report_status(status_msg)
 
     def __process_files(
         self, files: list[str], campaign_id: str, activity_id: str, tokens=None
@@ -339,61 +553,66 @@ class Executor(threading.Thread):
         :type files: list[str]
         """
 
-        self._logger.info(f"ex TRANSFER TOKENS??? {tokens}")
-
-        transfer_hippo = TransferHippo(
-            agent_id=self._agent_id,
-            settings=self._settings,
-            logger=self._logger,
-            tokens=tokens,
-        )
-
-        # Load all files into the TransferHippo.
-        self._logger.info("[exec] Loading files into TransferHippo.")
-        transfer_hippo.load(files)
-        # Validate that all files are accessible.
-        self._logger.info("[exec] Validating file accessibility.")
-        transfer_hippo.validate()
-        # Ensure that all authentication is achieved.
-        self._logger.info("[exec] Checking user auth.")
-        transfer_hippo.check_auth()
-        # Submit the transfer
-        self._logger.info("[exec] Submit the transfer.")
-        transfer_hippo.start_transfer()
-        # BLOCK: wait for transfer to finish
-        self._logger.info("[exec] Wait for transfer...")
-        transfer_hippo.transfer_wait()
-        self._logger.info("[exec] File transfer finished!")
+        stage_files(files, self._agent_id, self._settings, self._logger, tokens)
 
-    def monitor_check(self):
-        # TODO: whenever we want to query status, get info from MONITOR here.
-        self._logger.info("[exec] Monitor check initializing...")
 
-        while True:
-            self._logger.info(f"[exec] Monitor completed?: {self.monitor.completed}")
+def start_staging(
+    files: list[str],
+    agent_id: str,
+    settings: ZambezeSettings,
+    logger: logging.Logger,
+    tokens=None,
+) -> Optional[Future]:
+    """
+    Start making the files of an activity available locally with a
+    TransferHippo, without waiting for the transfers.
+
+    :param files: List of file URIs
+    :type files: list[str]
+    :return: Future completed by the transfer tracker once every transfer
+        succeeded, or None if nothing had to be transferred.
+    :rtype: Optional[Future]
+    """
+    transfer_hippo = TransferHippo(
+        agent_id=agent_id,
+        settings=settings,
+        logger=logger,
+        tokens=tokens,
+        cache=get_staging_cache(settings, logger),
+    )
+
+    # Load all files into the TransferHippo.
+    logger.info("[exec] Loading files into TransferHippo.")
+    transfer_hippo.load(files)
+    # Validate that all files are accessible.
+    logger.info("[exec] Validating file accessibility.")
+    transfer_hippo.validate()
+    # Ensure that all authentication is achieved.
+    logger.info("[exec] Checking user auth.")
+    transfer_hippo.check_auth()
+    # Submit the transfer
+    logger.info("[exec] Submit the transfer.")
+    transfer_hippo.start_transfer()
+    return transfer_hippo.track()
+
+
+def stage_files(
+    files: list[str],
+    agent_id: str,
+    settings: ZambezeSettings,
+    logger: logging.Logger,
+    tokens=None,
+) -> None:
+    """
+    Make the files of an activity available locally with a TransferHippo,
+    blocking until every transfer has finished.
 
-            # Move messages from monitor status queue (e.g., heartbeats/completion) to here.
-            try:
-                # Wait 5 seconds to see if we have any status messages.
-                status_item = self.monitor.to_status_q.get(timeout=5)
-                self.to_status_q.put(status_item)
-            except Empty:
-                if self.monitor.completed:
-                    self.monitor.to_monitor_q.put("KILL")
-                    self.monitor = None  # reset to None for now.
-                    self._logger.info("[exec] MONITOR check sending kill signal...")
-                    break
-                else:
-                    self._logger.debug("MONITOR NOT COMPLETED YET!")
-                    time.sleep(2)
-
-
-def download_https_file(url, save_path):
-    response = requests.get(url, stream=True)
-    if response.status_code == 200:
-        with open(save_path, "wb") as file:
-            for chunk in response.iter_content(chunk_size=8192):
-                file.write(chunk)
-        print(f"File downloaded and saved as {save_path}")
-    else:
-        print(f"Failed to download file. Status code: {response.status_code}")
+    :param files: List of file URIs
+    :type files: list[str]
+    """
+    future = start_staging(files, agent_id, settings, logger, tokens)
+    if future is not None:
+        # BLOCK: wait for transfer to finish
+        logger.info("[exec] Wait for transfer...")
+        future.result()
+    logger.info("[exec] File transfer finished!")
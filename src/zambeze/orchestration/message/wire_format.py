@@ -0,0 +1,164 @@
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+"""Versioned binary wire format for campaign DAGs, DAG nodes and control messages.
+
+Every frame starts with two bytes, the wire format version and the frame kind,
+followed by a msgpack body. Activities are packed as a msgpack extension type
+holding the fields from :meth:`Activity.to_dict`, so decoding a frame never
+runs arbitrary code the way unpickling does. Values msgpack cannot represent
+(for example an exception attached to a FAILED status) are sent as strings.
+"""
+
+from enum import IntEnum
+
+import msgpack
+
+from zambeze.campaign.activities.abstract_activity import Activity
+from zambeze.campaign.activities.shell import ShellActivity
+from zambeze.campaign.activities.transfer import TransferActivity
+
+WIRE_VERSION = 1
+
+# msgpack extension type code used for Activity objects.
+_ACTIVITY_EXT = 1
+
+_ACTIVITY_CLASSES = {cls.__name__: cls for cls in (ShellActivity, TransferActivity)}
+
+
+class WireFormatError(ValueError):
+    """Raised when a frame cannot be decoded."""
+
+
+class FrameKind(IntEnum):
+    DAG = 1
+    NODE = 2
+    CONTROL = 3
+
+
+def _default(obj):
+    if isinstance(obj, Activity):
+        payload = [type(obj).__name__, obj.to_dict()]
+        return msgpack.ExtType(_ACTIVITY_EXT, _pack(payload))
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def _ext_hook(code, data):
+    if code != _ACTIVITY_EXT:
+        raise WireFormatError(f"Unknown msgpack extension type: {code}")
+    class_name, fields = _unpack(data)
+    try:
+        activity_cls = _ACTIVITY_CLASSES[class_name]
+    except KeyError:
+        raise WireFormatError(f"Unknown activity class: {class_name}")
+    return activity_cls.from_dict(fields)
+
+
+def _pack(obj) -> bytes:
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+def _unpack(data: bytes):
+    return msgpack.unpackb(data, ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+
+def _frame(kind: FrameKind, body) -> bytes:
+    return bytes((WIRE_VERSION, kind)) + _pack(body)
+
+
+def _unframe(data: bytes, expected: FrameKind = None):
+    if len(data) < 2:
+        raise WireFormatError("Frame is too short to hold a header.")
+    version, kind = data[0], data[1]
+    if version != WIRE_VERSION:
+        raise WireFormatError(
+            f"Unsupported wire format version {version}, expected {WIRE_VERSION}."
+        )
+    try:
+        kind = FrameKind(kind)
+    except ValueError:
+        raise WireFormatError(f"Unknown frame kind: {kind}")
+    if expected is not None and kind != expected:
+        raise WireFormatError(f"Expected a {expected.name} frame, got {kind.name}.")
+    return kind, _unpack(data[2:])
+
+
+def encode_dag(dag) -> bytes:
+    """Encode a campaign DAG with its node data and edges.
+
+    :param dag: The campaign DAG.
+    :type dag: DAG
+    :return: The encoded frame.
+    :rtype: bytes
+    """
+    body = {
+        "graph": dict(dag.graph),
+        "nodes": [[node_id, data] for node_id, data in dag.nodes(data=True)],
+        "edges": [[u, v] for u, v in dag.edges()],
+    }
+    return _frame(FrameKind.DAG, body)
+
+
+def _dag_from_body(body):
+    # Imported here because dag.py imports this module.
+    from zambeze.campaign.activities.dag import DAG
+
+    dag = DAG(**body["graph"])
+    dag.add_nodes_from((node_id, data) for node_id, data in body["nodes"])
+    dag.add_edges_from(body["edges"])
+    return dag
+
+
+def decode_dag(data: bytes):
+    """Decode a frame produced by :func:`encode_dag`.
+
+    :return: The campaign DAG.
+    :rtype: DAG
+    """
+    return _dag_from_body(_unframe(data, FrameKind.DAG)[1])
+
+
+def encode_node(node: tuple) -> bytes:
+    """Encode a DAG node of the form (activity_id, node_data)."""
+    return _frame(FrameKind.NODE, [node[0], node[1]])
+
+
+def decode_node(data: bytes) -> tuple:
+    """Decode a frame produced by :func:`encode_node`."""
+    node_id, node_data = _unframe(data, FrameKind.NODE)[1]
+    return node_id, node_data
+
+
+def encode_control(msg: dict) -> bytes:
+    """Encode a control/status message."""
+    return _frame(FrameKind.CONTROL, msg)
+
+
+def decode_control(data: bytes) -> dict:
+    """Decode a frame produced by :func:`encode_control`."""
+    return _unframe(data, FrameKind.CONTROL)[1]
+
+
+def dumps(obj) -> bytes:
+    """Encode a DAG, a DAG node tuple or a control message dict."""
+    if isinstance(obj, tuple):
+        return encode_node(obj)
+    if isinstance(obj, dict):
+        return encode_control(obj)
+    if hasattr(obj, "nodes") and hasattr(obj, "edges"):
+        return encode_dag(obj)
+    raise WireFormatError(f"Cannot encode object of type {type(obj).__name__}.")
+
+
+def loads(data: bytes):
+    """Decode any frame, returning a DAG, a node tuple or a control dict."""
+    kind, body = _unframe(data)
+    if kind == FrameKind.DAG:
+        return _dag_from_body(body)
+    if kind == FrameKind.NODE:
+        return body[0], body[1]
+    return body
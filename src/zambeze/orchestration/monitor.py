@@ -3,140 +3,212 @@
 # This program is free software: you can redistribute it and/or modify
 # it under the terms of the MIT License.
 
+import logging
 import threading
-from time import time, sleep
-from queue import Queue
+from collections import Counter
+from time import monotonic
+from queue import Empty, Queue
+from typing import Callable, Optional
 
+from zambeze.utils.structured_log import event
 
-class Monitor(threading.Thread):
+
+class CampaignMonitor:
     """
-    Monitor thread that enables an agent to track
-    task state across Zambeze.
+    Status bookkeeping for the activities of one campaign.
+
+    Counts of activities in each status are updated as status messages
+    arrive, so recording a message and checking for completion are O(1)
+    regardless of campaign size.
 
     Attributes:
-        dag_msg (dict): A dictionary message holding the task graph.
-        _logger (logging.Logger): Logger object (local log).
-        monitor_hb_s (int): Seconds between heartbeat messages.
-        to_monitor_q (queue.Queue): Queue to receive messages to monitor.
-        to_status_q (queue.Queue): Queue to send status messages.
+        campaign_id (str): The campaign being monitored.
         dag_dict (dict): Dictionary to keep track of the tasks status.
-        completed (bool): Flag to indicate if monitoring is completed.
+        status_counts (collections.Counter): Number of tasks in each status.
     """
 
-    def __init__(self, dag_msg, logger):
-        super().__init__()
-
-        self.dag_msg = dag_msg
-        self._logger = logger
-        self.monitor_hb_s = 5  # seconds between heartbeats
-
-        self.to_monitor_q = Queue()
-        self.to_status_q = Queue()
-
+    def __init__(self, dag_msg):
+        self.campaign_id = dag_msg[1]["campaign_id"]
         self.dag_dict = {
             activity_id: "PROCESSING"
             for activity_id in dag_msg[1]["all_activity_ids"]
             if activity_id != "MONITOR"
         }
+        self.status_counts = Counter({"PROCESSING": len(self.dag_dict)})
 
-        self._logger.info(
-            f"[monitor] Monitoring initialized for activities: {self.dag_dict.keys()}"
-        )
-        self.completed = False
-        self.last_logged_proc_count = None
+    @property
+    def completed(self) -> bool:
+        """True once no activity is still PROCESSING."""
+        return self.status_counts["PROCESSING"] == 0
 
-    def run(self):
-        """
-        Runs the monitor process when the thread starts. It checks for
-        task completion, processes incoming messages, and sends heartbeat
-        messages at regular intervals.
+    def update(self, status_msg: dict) -> bool:
+        """Record a status message for one of the campaign's activities.
+
+        :return: True if the message was for an activity of this campaign.
+        :rtype: bool
         """
-        last_hb_time = time()
-        last_proc_log_time = time()  # Variable to track the last proc count log time
-        while not self.completed:
-            self._check_activities()
-            self._process_messages()
+        activity_id = status_msg["activity_id"]
+        old_status = self.dag_dict.get(activity_id)
+        if old_status is None:
+            return False
+        new_status = status_msg["status"]
+        self.dag_dict[activity_id] = new_status
+        self.status_counts[old_status] -= 1
+        self.status_counts[new_status] += 1
+        return True
+
+    def heartbeat(self) -> dict:
+        """The MONITORING heartbeat message for this campaign."""
+        return {
+            "status": "MONITORING",
+            "activity_id": "MONITOR",
+            "campaign_id": self.campaign_id,
+            "msg": "simple heartbeat notification.",
+        }
 
-            # Log the process count only every 10 seconds
-            current_time = time()
-            if current_time - last_proc_log_time >= 10:
-                self._log_proc_count()
-                last_proc_log_time = current_time  # Update the last proc count log time
 
-            last_hb_time = self._send_heartbeat(last_hb_time)
-            sleep(0.1)
+class Monitor(threading.Thread):
+    """
+    Monitor service that tracks the state of every campaign whose MONITOR
+    node an agent picked up.
 
-        self._logger.info("[monitor] Monitoring completed.")
+    Campaigns are registered with :meth:`add_campaign` and kept in a
+    registry keyed by campaign_id; control messages put on ``to_monitor_q``
+    are routed straight to their campaign. A single thread serves all
+    campaigns: it blocks on ``to_monitor_q`` until a message arrives or the
+    next heartbeat is due, drains every queued message at once, and sends
+    one heartbeat per active campaign on ``to_status_q``.
 
-    def _log_proc_count(self):
-        """
-        Log the current process count, if it has changed since last log.
-        """
-        proc_count = sum(status == "PROCESSING" for status in self.dag_dict.values())
-        if proc_count != self.last_logged_proc_count:
-            self._logger.debug(
-                f"[monitor] Current proc count: {proc_count}, Status dict: {self.dag_dict}"
-            )
-            self.last_logged_proc_count = proc_count
+    Attributes:
+        _logger (logging.Logger): Logger object (local log).
+        monitor_hb_s (int): Seconds between heartbeat messages.
+        to_monitor_q (queue.Queue): Queue to receive messages to monitor.
+        to_status_q (queue.Queue): Queue to send status messages.
+        campaigns (dict): campaign_id -> CampaignMonitor for active campaigns.
+    """
 
-    def _check_activities(self):
-        """
-        Check the status of all activities and update the monitoring status
-        if all activities are completed.
-        """
-        # self._logger.info("IN CHECK ACTIVITIES")
+    # Upper bound on the messages handled before checking the heartbeat timer.
+    max_batch = 1000
 
-        proc_count = sum(status == "PROCESSING" for status in self.dag_dict.values())
+    def __init__(
+        self,
+        to_status_q: Optional[Queue] = None,
+        logger: Optional[logging.Logger] = None,
+        on_completed: Optional[Callable[[str], None]] = None,
+    ):
+        super().__init__(name="MonitorThread", daemon=True)
 
-        if proc_count == 0:
-            self.completed = True
-            self._logger.info(f"[monitor] Final campaign status dict: {self.dag_dict}")
+        self._logger = logging.getLogger(__name__) if logger is None else logger
+        self.monitor_hb_s = 5  # seconds between heartbeats
 
-    def _process_messages(self):
-        """
-        Process messages from the to_monitor_q and update the status of activities.
-        """
-        # self._logger.info("IN PROCESS MESSAGES")
-        if not self.to_monitor_q.empty():
-            status_msg = self.to_monitor_q.get()
+        self.to_monitor_q = Queue()
+        self.to_status_q = Queue() if to_status_q is None else to_status_q
 
-            self._logger.info(f"[monitor] Received control message: {status_msg}")
+        self.campaigns = {}
+        self._stopped = False
+        # Called with the campaign_id of every campaign that completed.
+        self._on_completed = on_completed
 
-            if status_msg == "KILL":
-                self._logger.info(
-                    "[monitor] Healthy KILL signal received. Tearing down..."
-                )
-                self.completed = True
-                return
+    def add_campaign(self, dag_msg):
+        """Start monitoring the campaign of a MONITOR DAG node."""
+        self.to_monitor_q.put(("CAMPAIGN", dag_msg))
 
-            activity_id = status_msg["activity_id"]
-            if activity_id in self.dag_dict:
-                self.dag_dict[activity_id] = status_msg["status"]
+    def stop(self):
+        """Stop the monitor thread."""
+        self.to_monitor_q.put("KILL")
 
-    def _send_heartbeat(self, last_hb_time):
+    def run(self):
+        """
+        Serve all campaigns until stopped: process incoming messages in
+        batches and send heartbeat messages at regular intervals.
         """
-        Send a heartbeat message if the time since the last heartbeat exceeds
-        the threshold. Updates and returns the last heartbeat time.
+        next_hb_time = monotonic() + self.monitor_hb_s
+        while not self._stopped:
+            now = monotonic()
+            if now >= next_hb_time:
+                for campaign in self.campaigns.values():
+                    self._send_heartbeat(campaign)
+                next_hb_time = now + self.monitor_hb_s
 
-        Args:
-            last_hb_time (float): The last recorded time a heartbeat was sent.
+            self._process_messages(timeout=max(0.0, next_hb_time - monotonic()))
 
-        Returns:
-            float: The updated last heartbeat time.
+        self._logger.info("[monitor] Monitoring stopped.")
+
+    def _process_messages(self, timeout=None):
+        """
+        Wait up to ``timeout`` seconds for a message on to_monitor_q, then
+        process it together with every other message already queued.
         """
-        current_time = time()
-        if current_time - last_hb_time > self.monitor_hb_s:
-            hb_monitor_msg = {
-                "status": "MONITORING",
-                "activity_id": "MONITOR",
-                "campaign_id": self.dag_msg[1]["campaign_id"],
-                "msg": "simple heartbeat notification.",
-            }
-
-            self.to_status_q.put(hb_monitor_msg)
+        try:
+            batch = [self.to_monitor_q.get(timeout=timeout)]
+        except Empty:
+            return
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.to_monitor_q.get_nowait())
+            except Empty:
+                break
+
+        for msg in batch:
+            if msg == "KILL":
+                self._logger.info(
+                    "[monitor] Healthy KILL signal received. Tearing down..."
+                )
+                self._stopped = True
+                return
+            if isinstance(msg, tuple):
+                self._register(msg[1])
+            else:
+                self._update_status(msg)
+
+    def _register(self, dag_msg):
+        campaign = CampaignMonitor(dag_msg)
+        if campaign.campaign_id in self.campaigns:
+            self._logger.warning(
+                "[monitor] Campaign %s already monitored.", campaign.campaign_id
+            )
+            return
+        self.campaigns[campaign.campaign_id] = campaign
+        self._logger.info(
+            "[monitor] Monitoring campaign %s with %d activities "
+            "(%d campaigns active).",
+            campaign.campaign_id,
+            len(campaign.dag_dict),
+            len(self.campaigns),
+            extra=event("monitor", campaign.campaign_id),
+        )
+        # Send the first heartbeat right away so activities waiting on the
+        # MONITOR node are released without waiting a full heartbeat period.
+        self._send_heartbeat(campaign)
+        self._check_completed(campaign)
+
+    def _update_status(self, status_msg):
+        """Route a status message to its campaign."""
+        campaign = self.campaigns.get(status_msg.get("campaign_id"))
+        if campaign is None or not campaign.update(status_msg):
+            return
+        self._check_completed(campaign)
+
+    def _check_completed(self, campaign):
+        if campaign.completed:
+            del self.campaigns[campaign.campaign_id]
+            self._logger.info(
+                "[monitor] Campaign %s completed: %s",
+                campaign.campaign_id,
+                dict(campaign.status_counts),
+                extra=event("completed", campaign.campaign_id),
+            )
             self._logger.debug(
-                f"[monitor] Enqueued monitor hb message! | Queue size: {self.to_status_q.qsize()}"
+                "[monitor] Final campaign status dict: %s", campaign.dag_dict
             )
-            return current_time  # return the updated time
+            if self._on_completed is not None:
+                self._on_completed(campaign.campaign_id)
 
-        return last_hb_time  # return the original time if no heartbeat was sent
+    def _send_heartbeat(self, campaign):
+        """
+        Put a MONITORING heartbeat message for a campaign on to_status_q.
+        """
+        self.to_status_q.put(campaign.heartbeat())
+        self._logger.debug(
+            "[monitor] Enqueued monitor hb message for %s!", campaign.campaign_id
+        )
@@ -1,33 +1,103 @@
 # Standard imports
+from functools import lru_cache
+from importlib import import_module
+from inspect import isclass
 from pathlib import Path
 from typing import Optional
 
 import logging
 import pkgutil
 
+_NON_PLUGIN_MODULES = frozenset(
+    [
+        "abstract_plugin",
+        "__init__",
+        "abstract_plugin_message_validator",
+        "common_dataclasses",
+        "common_plugin_functions",
+        "abstract_plugin_template_generator",
+        "abstract_uri_separator",
+        "file_uri_separator",
+    ]
+)
+
+
+@lru_cache(maxsize=None)
+def _scanPlugins() -> tuple:
+    # The plugin tree only changes with the installed package, so it is
+    # scanned once per process. iter_modules lists the entries of the
+    # folder without importing any of them.
+    plugin_path = [str(Path(__file__).resolve().parent)]
+    return tuple(
+        module_name
+        for _, module_name, _ in pkgutil.iter_modules(path=plugin_path)
+        if module_name not in _NON_PLUGIN_MODULES
+    )
+
 
 def registerPlugins(logger: Optional[logging.Logger] = None) -> list:
     """Will register all the plugins provided in the plugin_modules folder
 
+    The folder is only scanned the first time this is called.
+
     :return: the names of all the plugins
     :rtype: a list of strings
     """
-
-    module_names = []
-    # plugin_path = [str(Path(__file__).resolve().parent) + "/plugin_modules"]
-    plugin_path = [str(Path(__file__).resolve().parent)]
-    for importer, module_name, ispkg in pkgutil.walk_packages(path=plugin_path):
-        if (
-            module_name != "abstract_plugin"
-            and module_name != "__init__"
-            and module_name != "abstract_plugin_message_validator"
-            and module_name != "common_dataclasses"
-            and module_name != "common_plugin_functions"
-            and module_name != "abstract_plugin_template_generator"
-            and module_name != "abstract_uri_separator"
-            and module_name != "file_uri_separator"
-        ):
-            module_names.append(module_name)
+    module_names = list(_scanPlugins())
     if logger:
         logger.debug(f"Registered Plugins: {', '.join(module_names)}")
     return module_names
+
+
+@lru_cache(maxsize=None)
+def findPluginClass(module_path: str, base: type) -> Optional[type]:
+    """Import a plugin module and find its subclass of ``base``
+
+    Imports and lookups are cached, so each module is only searched once.
+
+    :param module_path: Dotted path of the module to search.
+    :type module_path: str
+    :param base: The class the plugin class derives from.
+    :type base: type
+    :return: The first subclass of ``base`` found in the module, if any.
+    :rtype: Optional[type]
+    """
+    module = import_module(module_path)
+    for attribute_name in dir(module):
+        candidate = getattr(module, attribute_name)
+        if isclass(candidate) and issubclass(candidate, base) and candidate is not base:
+            return candidate
+    return None
+
+
+def validateConfigOptions(module_name: str, config: dict) -> None:
+    """Check a plugin configuration against the options the plugin supports
+
+    Only the ``<plugin>_common`` module of the plugin is imported, so an
+    unsupported option is reported when the configuration is given instead
+    of when the plugin is first used. Plugins that do not list their
+    ``SUPPORTED_CONFIG_OPTIONS`` accept any option.
+
+    :param module_name: Name of the plugin.
+    :type module_name: str
+    :param config: Configuration options of the plugin.
+    :type config: dict
+    :raises Exception: If an option is not supported by the plugin.
+    """
+    common_path = (
+        f"zambeze.orchestration.plugin_modules.{module_name}.{module_name}_common"
+    )
+    try:
+        common = import_module(common_path)
+    except ModuleNotFoundError as e:
+        if e.name != common_path:
+            raise
+        return
+    supported = getattr(common, "SUPPORTED_CONFIG_OPTIONS", None)
+    if supported is None:
+        return
+    for option in config:
+        if option not in supported:
+            raise Exception(
+                f"Unsupported {module_name} config option encountered: {option}"
+            )
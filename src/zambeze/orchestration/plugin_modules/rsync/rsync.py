@@ -10,15 +10,22 @@
 from ..abstract_plugin import Plugin
 from .rsync_common import (
     buildRemotePath,
+    DEFAULT_MAX_PARALLEL_TRANSFERS,
+    DEFAULT_SSH_CONTROL_DIR,
+    DEFAULT_SSH_CONTROL_PERSIST,
+    DEFAULT_SSH_HEALTH_CHECK_INTERVAL,
     isTheHostTheSourceOrDestination,
+    parseRsyncStats,
     PLUGIN_NAME,
     requiredSourceAndDestinationValuesValid,
     SUPPORTED_ACTIONS,
 )
 from .rsync_message_validator import RsyncMessageValidator
+from .ssh_multiplexer import SSHMultiplexer
 from ...system_utils import isExecutable
 
 # Standard imports
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import logging
@@ -40,6 +47,8 @@ class Rsync(Plugin):
         self._hostname = socket.gethostname()
         self._local_ip = socket.gethostbyname(self._hostname)
         self._ssh_key = pathlib.Path.home().joinpath(".ssh/id_rsa")
+        self._max_parallel_transfers = DEFAULT_MAX_PARALLEL_TRANSFERS
+        self._ssh_multiplexer = None
         self._message_validator = RsyncMessageValidator(logger)
 
     def messageTemplate(self, args=None) -> dict:
@@ -71,10 +80,23 @@ class Rsync(Plugin):
         :Example:
 
         >>> config = {
-        >>>     "private_ssh_key": "path to ssh key"
+        >>>     "private_ssh_key": "path to ssh key",
+        >>>     "max_parallel_transfers": 4,
+        >>>     "ssh_multiplexing": True,
+        >>>     "ssh_control_persist": 600,
+        >>>     "ssh_health_check_interval": 30
         >>> }
         >>> instance = Rsync()
         >>> instance.configure(config)
+
+        ``max_parallel_transfers`` bounds the number of rsync processes that
+        run at once when an action holds several items.
+
+        Unless ``ssh_multiplexing`` is False, transfers to a remote host share
+        a multiplexed ssh master connection. It exits after being idle for
+        ``ssh_control_persist`` seconds and is health checked at most every
+        ``ssh_health_check_interval`` seconds. Control sockets are kept in
+        ``ssh_control_dir``.
         """
         self._logger.debug(f"Configuring {self._name} plugin")
 
@@ -92,8 +114,37 @@ class Rsync(Plugin):
                     raise Exception(error_msg)
             self._logger.debug(f"  Private key: {self._ssh_key}")
 
+        if "max_parallel_transfers" in config:
+            max_parallel = config["max_parallel_transfers"]
+            if not isinstance(max_parallel, int) or max_parallel < 1:
+                raise Exception(
+                    f"max_parallel_transfers must be a positive integer: {max_parallel}"
+                )
+            self._max_parallel_transfers = max_parallel
+
+        if self._ssh_multiplexer is not None:
+            self._ssh_multiplexer.closeAll()
+            self._ssh_multiplexer = None
+        if config.get("ssh_multiplexing", True):
+            self._ssh_multiplexer = SSHMultiplexer(
+                self._ssh_key,
+                config.get("ssh_control_dir", DEFAULT_SSH_CONTROL_DIR),
+                persist=config.get("ssh_control_persist", DEFAULT_SSH_CONTROL_PERSIST),
+                health_check_interval=config.get(
+                    "ssh_health_check_interval", DEFAULT_SSH_HEALTH_CHECK_INTERVAL
+                ),
+                logger=self._logger,
+            )
+
         for config_argument in config.keys():
-            if config_argument == "private_ssh_key":
+            if config_argument in [
+                "private_ssh_key",
+                "max_parallel_transfers",
+                "ssh_multiplexing",
+                "ssh_control_dir",
+                "ssh_control_persist",
+                "ssh_health_check_interval",
+            ]:
                 pass
             else:
                 raise Exception(
@@ -130,6 +181,8 @@ class Rsync(Plugin):
             "hostname": self._hostname,
             "local_ip": self._local_ip,
             "ssh_key": self._ssh_key,
+            "max_parallel_transfers": self._max_parallel_transfers,
+            "ssh_multiplexing": self._ssh_multiplexer is not None,
         }
 
     def check(self, arguments: list[dict]) -> list[dict]:
@@ -187,16 +240,21 @@ class Rsync(Plugin):
                         continue
 
                 if action == "transfer":
-                    match_host = isTheHostTheSourceOrDestination(
-                        arguments[index][action]["items"][0], self._local_ip
-                    )
+                    # Every item is transferred, so every item is checked.
+                    check = (True, "")
+                    for item in arguments[index][action]["items"]:
+                        match_host = isTheHostTheSourceOrDestination(
+                            item, self._local_ip
+                        )
 
-                    # Now that we know the fields exist ensure that they are valid
-                    # Ensure that at either the source or destination ip addresses
-                    # are associated with the local machine
-                    check = requiredSourceAndDestinationValuesValid(
-                        arguments[index][action]["items"][0], match_host
-                    )
+                        # Now that we know the fields exist ensure that they are
+                        # valid. Ensure that at either the source or destination
+                        # ip addresses are associated with the local machine
+                        check = requiredSourceAndDestinationValuesValid(
+                            item, match_host
+                        )
+                        if not check[0]:
+                            break
                     if not check[0]:
                         checks.append(
                             {
@@ -252,29 +310,73 @@ class Rsync(Plugin):
                 "plugin must first be configured."
             )
 
+        commands = []
         for action in arguments:
             if "transfer" in action:
                 action_inst = action["transfer"]
+                extra_arguments = action_inst.get("arguments", [])
+                for item in action_inst["items"]:
+                    commands.append((item, self._buildCommand(extra_arguments, item)))
+
+        workers = min(len(commands), self._max_parallel_transfers) or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda c: self._transferItem(*c), commands))
 
-                command_list = ["rsync"]
-                ssh_commands = ["-e", "ssh -i " + self._ssh_key]
-                for argument in ssh_commands:
-                    command_list.append(argument)
+        failed = [result for result in results if result["returncode"] != 0]
+        if failed:
+            raise Exception(
+                f"{len(failed)} of {len(results)} rsync transfers failed: "
+                + "; ".join(
+                    f"{r['source']} -> {r['destination']} "
+                    f"(exit {r['returncode']}): {r['stderr']}"
+                    for r in failed
+                )
+            )
+        return {"transfer": results}
 
-                if "arguments" in action_inst:
-                    for argument in action_inst["arguments"]:
-                        command_list.append(argument)
+    def _buildCommand(self, extra_arguments: list, item: dict) -> list[str]:
+        """Build the rsync command line that transfers a single item
 
-                for item in action_inst["items"]:
-                    if item["source"]["ip"] == self._local_ip:
-                        command_list.append(item["source"]["path"])
-                        command_list.append(buildRemotePath(item["destination"]))
-
-                    elif item["destination"]["ip"] == self._local_ip:
-                        command_list.append(buildRemotePath(item["source"]))
-                        command_list.append(item["destination"]["path"])
-                    # only support one item
-                    break
-
-                subprocess.call(command_list)
-        return {}
+        Items whose source and destination are both this machine are copied
+        locally, without going through ssh.
+        """
+        command_list = ["rsync", "--stats"]
+        source_is_local = item["source"]["ip"] == self._local_ip
+        destination_is_local = item["destination"]["ip"] == self._local_ip
+        if not (source_is_local and destination_is_local):
+            if self._ssh_multiplexer is not None:
+                command_list.extend(["-e", self._ssh_multiplexer.sshCommand()])
+            else:
+                command_list.extend(["-e", f"ssh -i {self._ssh_key}"])
+        command_list.extend(extra_arguments)
+
+        if source_is_local:
+            command_list.append(item["source"]["path"])
+        else:
+            command_list.append(buildRemotePath(item["source"]))
+        if destination_is_local:
+            command_list.append(item["destination"]["path"])
+        else:
+            command_list.append(buildRemotePath(item["destination"]))
+        return command_list
+
+    def _transferItem(self, item: dict, command_list: list[str]) -> dict:
+        """Run one rsync process and report its exit status and counters"""
+        if self._ssh_multiplexer is not None:
+            for end in ["source", "destination"]:
+                if item[end]["ip"] != self._local_ip:
+                    self._ssh_multiplexer.ensure(item[end]["user"], item[end]["ip"])
+        self._logger.debug(f"Running: {' '.join(command_list)}")
+        completed = subprocess.run(command_list, capture_output=True, text=True)
+        result = {
+            "source": item["source"]["path"],
+            "destination": item["destination"]["path"],
+            "returncode": completed.returncode,
+            "stderr": completed.stderr.strip()[-2000:],
+        }
+        result.update(parseRsyncStats(completed.stdout))
+        self._logger.info(
+            f"rsync {result['source']} -> {result['destination']}: "
+            f"exit {result['returncode']}, {result['bytes_transferred']} bytes"
+        )
+        return result
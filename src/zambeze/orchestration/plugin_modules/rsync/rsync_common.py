@@ -13,9 +13,16 @@ from ...network import isAddressValid
 # Standard imports
 from dataclasses import asdict
 import pathlib
+import re
 
 SUPPORTED_ACTIONS = {"transfer": False}
 PLUGIN_NAME = "rsync"
+# Number of rsync processes run at once unless configured otherwise.
+DEFAULT_MAX_PARALLEL_TRANSFERS = 4
+# Defaults for the multiplexed ssh master connections.
+DEFAULT_SSH_CONTROL_DIR = str(pathlib.Path.home().joinpath(".zambeze", "ssh"))
+DEFAULT_SSH_CONTROL_PERSIST = 600
+DEFAULT_SSH_HEALTH_CHECK_INTERVAL = 30
 #############################################################
 # Assistant Functions
 #############################################################
@@ -154,3 +161,28 @@ def buildRemotePath(action_endpoint: dict) -> str:
     path = action_endpoint["user"]
     path = path + "@" + action_endpoint["ip"]
     return path + ":" + action_endpoint["path"]
+
+
+def parseRsyncStats(output: str) -> dict:
+    """Extract transfer counters from the output of ``rsync --stats``
+
+    :Example:
+
+    >>> stats = parseRsyncStats(
+    >>>     "Number of regular files transferred: 2\n"
+    >>>     "Total transferred file size: 1,048,576 bytes\n"
+    >>> )
+    >>> assert stats == {"files_transferred": 2, "bytes_transferred": 1048576}
+
+    Counters missing from the output are reported as 0.
+    """
+    stats = {"files_transferred": 0, "bytes_transferred": 0}
+    patterns = {
+        "files_transferred": r"Number of (?:regular )?files transferred: ([\d,.]+)",
+        "bytes_transferred": r"Total transferred file size: ([\d,.]+)",
+    }
+    for key, pattern in patterns.items():
+        match = re.search(pattern, output)
+        if match:
+            stats[key] = int(re.sub(r"[,.]", "", match.group(1)))
+    return stats
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+# Standard imports
+from typing import Optional
+
+import logging
+import os
+import pathlib
+import subprocess
+import threading
+import time
+
+
+class SSHMultiplexer:
+    """Manage one multiplexed SSH master connection per remote host
+
+    rsync is pointed at the master through ``ControlPath``, so every transfer
+    after the first one to a host reuses its authenticated connection instead
+    of paying a full SSH handshake. Masters are started ahead of the
+    transfers that need them, one host at a time, so concurrent rsync
+    processes to the same host do not all race to become the master.
+
+    A master exits by itself once it has been idle for ``persist``
+    seconds (``ControlPersist``). Before a host is used its master is
+    health checked with ``ssh -O check``, at most once every
+    ``health_check_interval`` seconds, and restarted if it is gone.
+
+    :param ssh_key: Private key used to authenticate.
+    :type ssh_key: str
+    :param control_dir: Directory holding the control sockets.
+    :type control_dir: str
+    :param persist: Idle seconds after which a master exits.
+    :type persist: int
+    :param health_check_interval: Seconds a successful check stays valid.
+    :type health_check_interval: float
+    :param logger: The logger where to log information/warning or errors.
+    :type logger: Optional[logging.Logger]
+    """
+
+    def __init__(
+        self,
+        ssh_key,
+        control_dir,
+        persist: int = 600,
+        health_check_interval: float = 30,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._logger: logging.Logger = (
+            logging.getLogger(__name__) if logger is None else logger
+        )
+        self._ssh_key = str(ssh_key)
+        self._control_dir = pathlib.Path(control_dir).expanduser()
+        self._persist = persist
+        self._health_check_interval = health_check_interval
+
+        self._lock = threading.Lock()
+        # "user@host" -> lock serializing checks and starts for that host
+        self._host_locks = {}
+        # "user@host" -> monotonic time of the last successful check
+        self._checked = {}
+
+    def _options(self) -> list[str]:
+        # %C is a hash of the connection parameters, which keeps the socket
+        # path short enough for the unix socket length limit.
+        return [
+            "-i",
+            self._ssh_key,
+            "-o",
+            f"ControlPath={self._control_dir.joinpath('%C')}",
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            f"ControlPersist={self._persist}",
+        ]
+
+    def sshCommand(self) -> str:
+        """ssh command for rsync's ``-e`` option"""
+        return " ".join(["ssh"] + self._options())
+
+    def ensure(self, user: str, host: str) -> bool:
+        """Make sure a healthy master connection to ``user@host`` exists
+
+        :return: True if a master is running; False if it could not be
+            started, in which case ssh falls back to a direct connection.
+        :rtype: bool
+        """
+        destination = f"{user}@{host}"
+        with self._lock:
+            host_lock = self._host_locks.setdefault(destination, threading.Lock())
+
+        with host_lock:
+            checked = self._checked.get(destination)
+            if (
+                checked is not None
+                and time.monotonic() - checked < self._health_check_interval
+            ):
+                return True
+
+            if self._run("-O", "check", destination):
+                self._checked[destination] = time.monotonic()
+                return True
+
+            self._logger.debug(f"Starting ssh master connection to {destination}")
+            os.makedirs(self._control_dir, mode=0o700, exist_ok=True)
+            # With ControlMaster=auto and no master running, this becomes one.
+            if self._run("-o", "BatchMode=yes", "-N", "-f", destination):
+                self._checked[destination] = time.monotonic()
+                return True
+
+            self._checked.pop(destination, None)
+            self._logger.warning(
+                f"Unable to start ssh master connection to {destination}"
+            )
+            return False
+
+    def close(self, user: str, host: str) -> None:
+        """Ask the master connection to ``user@host`` to exit"""
+        destination = f"{user}@{host}"
+        self._run("-O", "exit", destination)
+        self._checked.pop(destination, None)
+
+    def closeAll(self) -> None:
+        for destination in list(self._checked):
+            self._run("-O", "exit", destination)
+        self._checked.clear()
+
+    def _run(self, *args) -> bool:
+        try:
+            completed = subprocess.run(
+                ["ssh"] + self._options() + list(args),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=60,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            self._logger.debug(f"ssh {' '.join(args)} failed: {e}")
+            return False
+        return completed.returncode == 0
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+# Standard imports
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+import logging
+import os
+import pathlib
+import signal
+import subprocess
+import threading
+import time
+
+# Seconds between SIGTERM and SIGKILL when a command times out.
+KILL_GRACE_PERIOD = 5
+# Bytes of stdout/stderr kept per command when not writing to files.
+DEFAULT_OUTPUT_LIMIT = 64 * 1024
+
+
+@dataclass
+class ProcessResult:
+    """Outcome of one command run by the ProcessRunner."""
+
+    command: str
+    returncode: int
+    timed_out: bool = False
+    wall_time: float = 0.0
+    # Tail of the output, or the path of the file it was written to.
+    stdout: str = ""
+    stderr: str = ""
+    # user_time and system_time in seconds, max_rss in KiB.
+    rusage: dict = field(default_factory=dict)
+
+    @property
+    def succeeded(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+
+class _RingBuffer:
+    """Keeps the last ``limit`` bytes written to it."""
+
+    def __init__(self, limit: int) -> None:
+        self._limit = limit
+        self._chunks = deque()
+        self._size = 0
+
+    def write(self, data: bytes) -> None:
+        self._chunks.append(data)
+        self._size += len(data)
+        while self._size - len(self._chunks[0]) >= self._limit:
+            self._size -= len(self._chunks.popleft())
+
+    def getvalue(self) -> str:
+        data = b"".join(self._chunks)[-self._limit :]
+        return data.decode(errors="replace")
+
+
+class ProcessRunner:
+    """Run shell commands concurrently with timeouts and resource limits
+
+    At most ``max_concurrent`` commands of one :meth:`run_all` call, i.e. of
+    one activity, run at once; by default all of them do. The runner is
+    shared by every activity on the agent, whose concurrency is bounded by
+    the executor's worker pool instead. Each command runs in its own process group; when it
+    exceeds ``timeout`` seconds the whole group gets SIGTERM, then SIGKILL
+    after a grace period. ``cpu_seconds`` and ``memory_bytes`` are applied
+    with ``ulimit`` in the command's shell, so they also bound its children.
+
+    Output is kept in ring buffers holding the last ``output_limit`` bytes
+    of each stream, or written to ``<output_dir>/<n>.stdout|.stderr`` when
+    an output directory is given. The exit code and resource usage of every
+    command is returned as a :class:`ProcessResult`.
+
+    :param max_concurrent: Number of commands of one call running at once.
+    :type max_concurrent: Optional[int]
+    :param timeout: Wall clock seconds before a command is killed.
+    :type timeout: Optional[float]
+    :param cpu_seconds: CPU time limit per command.
+    :type cpu_seconds: Optional[int]
+    :param memory_bytes: Virtual memory limit per command.
+    :type memory_bytes: Optional[int]
+    :param output_limit: Bytes of each output stream kept in memory.
+    :type output_limit: int
+    :param output_dir: Directory where to write the output instead.
+    :type output_dir: Optional[str]
+    :param logger: The logger where to log information/warning or errors.
+    :type logger: Optional[logging.Logger]
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cpu_seconds: Optional[int] = None,
+        memory_bytes: Optional[int] = None,
+        output_limit: int = DEFAULT_OUTPUT_LIMIT,
+        output_dir: Optional[str] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._logger: logging.Logger = (
+            logging.getLogger(__name__) if logger is None else logger
+        )
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.output_limit = output_limit
+        self.output_dir = output_dir
+
+        self._count_lock = threading.Lock()
+        self._count = 0
+
+    def run_all(self, commands: list) -> list:
+        """Run ``(command, env)`` pairs concurrently.
+
+        :return: One ProcessResult per command, in order.
+        :rtype: list[ProcessResult]
+        """
+        if len(commands) == 1:
+            return [self.run(*commands[0])]
+        workers = min(len(commands), self.max_concurrent or len(commands)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda c: self.run(*c), commands))
+
+    def run(self, command: str, env: Optional[dict] = None) -> ProcessResult:
+        """Run a single shell command."""
+        return self._run(command, env)
+
+    def _limited(self, command: str) -> str:
+        limits = []
+        if self.cpu_seconds:
+            limits.append(f"ulimit -t {int(self.cpu_seconds)}")
+        if self.memory_bytes:
+            limits.append(f"ulimit -v {int(self.memory_bytes) // 1024}")
+        if not limits:
+            return command
+        return " && ".join(limits) + f" && {command}"
+
+    def _outputs(self):
+        if self.output_dir is None:
+            return _RingBuffer(self.output_limit), _RingBuffer(self.output_limit)
+        with self._count_lock:
+            self._count += 1
+            count = self._count
+        directory = pathlib.Path(self.output_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        return (
+            directory.joinpath(f"{os.getpid()}-{count}.stdout"),
+            directory.joinpath(f"{os.getpid()}-{count}.stderr"),
+        )
+
+    def _run(self, command: str, env: Optional[dict]) -> ProcessResult:
+        stdout, stderr = self._outputs()
+        files = []
+        if isinstance(stdout, pathlib.Path):
+            files = [open(stdout, "wb"), open(stderr, "wb")]
+            pipes = {"stdout": files[0], "stderr": files[1]}
+        else:
+            pipes = {"stdout": subprocess.PIPE, "stderr": subprocess.PIPE}
+
+        start = time.monotonic()
+        try:
+            proc = subprocess.Popen(
+                self._limited(command),
+                shell=True,
+                env=env,
+                stdin=subprocess.DEVNULL,
+                start_new_session=True,
+                **pipes,
+            )
+        finally:
+            for f in files:
+                f.close()
+
+        readers = []
+        if not files:
+            for stream, buffer in ((proc.stdout, stdout), (proc.stderr, stderr)):
+                reader = threading.Thread(
+                    target=self._drain, args=(stream, buffer), daemon=True
+                )
+                reader.start()
+                readers.append(reader)
+
+        timed_out = threading.Event()
+        timer = None
+        if self.timeout is not None:
+            timer = threading.Timer(self.timeout, self._kill, (proc, timed_out))
+            timer.daemon = True
+            timer.start()
+
+        # wait4 reaps the process and reports its resource usage.
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        wall_time = time.monotonic() - start
+        if timer is not None:
+            timer.cancel()
+        for reader in readers:
+            reader.join()
+
+        result = ProcessResult(
+            command=command,
+            returncode=proc.returncode,
+            timed_out=timed_out.is_set(),
+            wall_time=wall_time,
+            stdout=str(stdout) if files else stdout.getvalue(),
+            stderr=str(stderr) if files else stderr.getvalue(),
+            rusage={
+                "user_time": usage.ru_utime,
+                "system_time": usage.ru_stime,
+                "max_rss": usage.ru_maxrss,
+            },
+        )
+        if not result.succeeded:
+            reason = "timed out" if result.timed_out else f"exited {proc.returncode}"
+            self._logger.warning(f"[runner] Command {reason}: {command}")
+        return result
+
+    @staticmethod
+    def _drain(stream, buffer: _RingBuffer) -> None:
+        with stream:
+            for chunk in iter(lambda: stream.read1(64 * 1024), b""):
+                buffer.write(chunk)
+
+    def _kill(self, proc: subprocess.Popen, timed_out: threading.Event) -> None:
+        timed_out.set()
+        self._logger.warning(
+            f"[runner] Command exceeded {self.timeout}s, terminating pid {proc.pid}"
+        )
+        for sig, grace in ((signal.SIGTERM, KILL_GRACE_PERIOD), (signal.SIGKILL, 0)):
+            try:
+                os.killpg(proc.pid, sig)
+            except ProcessLookupError:
+                return
+            deadline = time.monotonic() + grace
+            while proc.returncode is None and time.monotonic() < deadline:
+                time.sleep(0.1)
+            if proc.returncode is not None:
+                return
@@ -8,8 +8,9 @@
 
 # Local imports
 from ..abstract_plugin import Plugin
+from .process_runner import ProcessRunner
 from .shell_message_validator import ShellMessageValidator
-from .shell_common import PLUGIN_NAME, SUPPORTED_ACTIONS
+from .shell_common import PLUGIN_NAME, SUPPORTED_ACTIONS, SUPPORTED_CONFIG_OPTIONS
 from ...system_utils import isExecutable
 
 # Standard imports
@@ -17,7 +18,6 @@ from typing import Optional
 
 import logging
 import os
-import subprocess
 
 
 def check_inputs(variable, left_pattern, right_pattern):
@@ -113,10 +113,29 @@ class Shell(Plugin):
         self._configured = False
         self._supported_actions = SUPPORTED_ACTIONS
         self._message_validator = ShellMessageValidator(logger)
+        self._runner = ProcessRunner(logger=self._logger)
 
     def configure(self, config: dict) -> None:
-        """Configure shell."""
+        """Configure shell.
+
+        :param config: configuration options
+        :type config: dict
+
+        All options are optional:
+
+        * ``max_concurrent``: commands of one activity run at once.
+        * ``timeout``: wall clock seconds before a command is killed.
+        * ``cpu_seconds``/``memory_bytes``: per command resource limits.
+        * ``output_limit``: bytes of stdout/stderr kept per command.
+        * ``output_dir``: write stdout/stderr to files there instead.
+        """
         self._logger.debug(f"Configuring {self._name} plugin")
+        for option in config:
+            if option not in SUPPORTED_CONFIG_OPTIONS:
+                raise Exception(
+                    f"Unsupported shell config option encountered: {option}"
+                )
+        self._runner = ProcessRunner(logger=self._logger, **config)
         for action in self._supported_actions.keys():
             if isExecutable(action):
                 self._supported_actions[action] = True
@@ -209,16 +228,17 @@ class Shell(Plugin):
         instance.configure(config)
         if instance.check(arguments):
             instance.process(arguments)
+
+        The commands run concurrently; a ProcessResult with the exit code,
+        output and resource usage of each is returned under "bash".
         """
         if not self._configured:
             raise Exception("Cannot run shell plugin, must first be configured.")
 
-        self._logger.info("[1111] Arguments passed to shell process are")
-        self._logger.info(f"[2222] {arguments}")
+        commands = []
         for data in arguments:
-            cmd = data["bash"]["args"]
-            cmd.insert(0, data["bash"]["command"])
-            self._logger.info(f"[3333] CMD: {cmd}")
+            cmd = [data["bash"]["command"]] + list(data["bash"]["args"])
+            self._logger.debug("[shell] CMD: %s", cmd)
 
             # Take an image of the parent environment
             # -- then add the environment variables to it.
@@ -245,6 +265,6 @@ class Shell(Plugin):
             #   (dev note 2: shell=False can lead to shell injection attacks
             #       if cmd coming from untrusted source. See:
             # https://stackoverflow.com/questions/21009416/python-subprocess-security)
-            # shell_exec = subprocess.Popen(shell_cmd, shell=True, env=parent_env)
-            shell_exec = subprocess.Popen(shell_cmd, shell=True, env=merged_env)
-            shell_exec.wait()
+            commands.append((shell_cmd, merged_env))
+
+        return {"bash": self._runner.run_all(commands)}
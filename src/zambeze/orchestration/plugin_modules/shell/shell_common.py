@@ -1,2 +1,11 @@
 SUPPORTED_ACTIONS = {"bash": False}
 PLUGIN_NAME = "shell"
+# Options accepted by Shell.configure, passed on to the ProcessRunner.
+SUPPORTED_CONFIG_OPTIONS = (
+    "max_concurrent",
+    "timeout",
+    "cpu_seconds",
+    "memory_bytes",
+    "output_limit",
+    "output_dir",
+)
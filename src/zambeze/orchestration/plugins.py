@@ -7,17 +7,20 @@ from __future__ import annotations
 
 from .message.abstract_message import AbstractMessage
 from .plugin_modules.abstract_plugin import Plugin
-from .plugin_modules.common_plugin_functions import registerPlugins
+from .plugin_modules.common_plugin_functions import (
+    findPluginClass,
+    registerPlugins,
+    validateConfigOptions,
+)
 from zambeze.campaign.activities.shell import ShellActivity
 from zambeze.campaign.activities.abstract_activity import Activity
 
 from copy import deepcopy
 from dataclasses import asdict
-from importlib import import_module
-from inspect import isclass
 from typing import Optional, overload
 
 import logging
+import threading
 
 
 class PluginChecks(dict):
@@ -56,6 +59,9 @@ class Plugins:
         )
         self.__module_names = registerPlugins()
         self._plugins = {}
+        # Configurations received but not yet applied, see configure.
+        self._pending = {}
+        self._lock = threading.Lock()
 
     @property
     def registered(self) -> list[str]:
@@ -76,20 +82,25 @@ class Plugins:
             plugins.append(deepcopy(module_name))
         return plugins
 
-    def configure(self, config: dict):
+    def configure(self, config: dict, eager: bool = False):
         """
         Configuration options for each plugin
 
         This method is responsible for initializing all the plugins that are
         supported in the plugin_modules folder. It should be called before
         the plugins can be run, all plugins should be configured before they
-        can be run.
+        can be run. The options are validated and recorded here; unless
+        ``eager``, each plugin is imported and configured the first time it
+        is checked or run.
 
         Parameters
         ----------
         config : dict
             This contains relevant configuration information for each plugin,
             if provided will only configure the plugins listed
+        eager : bool
+            Configure the plugins now, as agents do so that a bad
+            configuration stops them at startup.
 
         Example
         -------
@@ -112,31 +123,47 @@ class Plugins:
         >>> plugins.configure(config, ['shell'])
 
         This will just configure the "shell" plugin.
+
+        Raises
+        ------
+        Exception
+            If a plugin is given an option it does not support, or fails to
+            configure when ``eager``.
         """
         for module_name in self.__module_names:
-            # Registering plugins
-            if module_name in config.keys() and module_name in self.__module_names:
-                module = import_module(
-                    f"zambeze.orchestration.plugin_modules.{module_name}.{module_name}"
+            if module_name in config.keys():
+                validateConfigOptions(module_name, config[module_name])
+                self._plugins.pop(module_name, None)
+                self._pending[module_name] = config[module_name]
+        if eager:
+            for module_name in list(self._pending):
+                self._plugin(module_name)
+
+    def _plugin(self, name: str) -> Optional[Plugin]:
+        """Return the plugin ``name``, configuring it on first use.
+
+        Configuring a plugin imports its module, so it is deferred until
+        the plugin is needed instead of being done in configure. A plugin
+        that fails to configure stays pending, so every use raises again.
+        """
+        with self._lock:
+            if name in self._pending:
+                plugin_class = findPluginClass(
+                    f"zambeze.orchestration.plugin_modules.{name}.{name}", Plugin
                 )
-                for attribute_name in dir(module):
-                    potential_plugin = getattr(module, attribute_name)
-                    if isclass(potential_plugin):
-                        if (
-                            issubclass(potential_plugin, Plugin)
-                            and attribute_name != "Plugin"
-                        ):
-                            self._plugins[attribute_name.lower()] = potential_plugin(
-                                logger=self.__logger
-                            )
-
-                obj = self._plugins.get(module_name)
-                obj.configure(config[module_name])
+                plugin = plugin_class(logger=self.__logger)
+                plugin.configure(self._pending[name])
+                del self._pending[name]
+                self._plugins[name] = plugin
+            return self._plugins.get(name)
 
     @property
     def configured(self) -> list[str]:
         """Will return a list of all the plugins that have been configured.
 
+        Plugins whose configuration is still pending are configured first;
+        those failing to configure are logged and left out.
+
         Returns
         -------
         list of str
@@ -162,8 +189,12 @@ class Plugins:
         >>> assert "globus" in plugins.configured
         """
         configured_plugins: list[str] = []
-        for key in self._plugins:
-            obj = self._plugins.get(key)
+        for key in list(self._pending) + list(self._plugins):
+            try:
+                obj = self._plugin(key)
+            except Exception as e:
+                self.__logger.error(f"Unable to configure plugin {key}: {e}")
+                continue
             if obj.configured:
                 configured_plugins.append(obj.name)
 
@@ -197,11 +228,9 @@ class Plugins:
         """
         info = {}
         if "all" in plugins:
-            for plugin_inst in self._plugins.keys():
-                info[plugin_inst] = self._plugins[plugin_inst].info
-        else:
-            for plugin_inst in plugins:
-                info[plugin_inst] = self._plugins[plugin_inst].info
+            plugins = list(self._pending) + list(self._plugins)
+        for plugin_inst in plugins:
+            info[plugin_inst] = self._plugin(plugin_inst).info
         return info
 
     def check(self, msg: Activity, arguments: list = []) -> PluginChecks:
@@ -255,7 +284,8 @@ class Plugins:
 
         check_results = {}
 
-        if plugin_name not in self._plugins.keys():
+        plugin = self._plugin(plugin_name)
+        if plugin is None:
             check_results[plugin_name] = [
                 {"configured": (False, f"{plugin_name} is not configured.")}
             ]
@@ -271,18 +301,18 @@ class Plugins:
                     }
                 )
         else:
-            check_results[plugin_name] = self._plugins[plugin_name].check(arguments)
+            check_results[plugin_name] = plugin.check(arguments)
         return PluginChecks(check_results)
 
     @overload
-    def run(self, msg: AbstractMessage, arguments: Optional[dict] = None) -> None:
+    def run(self, msg: AbstractMessage, arguments: Optional[dict] = None) -> dict:
         pass
 
     @overload
-    def run(self, msg: str, arguments: dict = {}) -> None:
+    def run(self, msg: str, arguments: dict = {}) -> dict:
         pass
 
-    def run(self, msg, arguments=None) -> None:
+    def run(self, msg, arguments=None) -> dict:
         """Run a specific plugins.
 
         Parameters
@@ -291,6 +321,12 @@ class Plugins:
             Plugin name.
         arguments : dict
             Plugin arguments.
+
+        Returns
+        -------
+        dict
+            What the plugin's process method returned, e.g. the exit codes
+            of shell commands.
         """
         if isinstance(msg, AbstractMessage):
             if msg.type == "PLUGIN":
@@ -300,7 +336,6 @@ class Plugins:
             if msg.type == "SHELL":
                 arguments = {msg.plugin_args["shell"]: msg.plugin_args["parameters"]}
                 plugin_name = msg.type
-                self.__logger.info("GOODLY")
             else:
                 raise Exception(
                     "plugin check only currently supports PLUGIN and SHELL activities"
@@ -313,7 +348,5 @@ class Plugins:
         if not isinstance(arguments, dict):
             raise ValueError("Unsupported arguments type detected in check.")
 
-        self.__logger.info("GOODLY-2")
-        self.__logger.info(plugin_name)
-        self._plugins[plugin_name.lower()].process([arguments])
-        self.__logger.info("GOODLY-3")
+        self.__logger.debug("[plugins] Running the %s plugin", plugin_name)
+        return self._plugin(plugin_name.lower()).process([arguments])
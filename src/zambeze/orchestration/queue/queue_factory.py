@@ -1,6 +1,5 @@
 import logging
 
-# from .queue_nats import QueueNATS
 from .queue_rmq import QueueRMQ
 
 # TODO: this enforces queue factory to be of type AbstractQueue. Needs to
@@ -49,8 +48,11 @@ class QueueFactory:
         for client in queue_clients:
           await client.connect()
         """
-        # if queue_type == QueueType.NATS:
-        #    return QueueNATS(args, logger=self._logger)
+        if queue_type == QueueType.NATS:
+            # Imported here so nats-py is only needed by agents that use it.
+            from .queue_nats import QueueNATS
+
+            return QueueNATS(args, logger=self._logger)
         if queue_type == QueueType.RABBITMQ:
             return QueueRMQ(args, logger=self._logger)
         else:
@@ -3,9 +3,9 @@ import nats
 
 # from .abstract_queue import AbstractQueue
 from .queue_exceptions import QueueTimeoutException
+from ..message import wire_format
 from ..zambeze_types import ChannelType, QueueType
-from typing import Optional
-import dill
+from typing import Optional, Union
 
 
 # class QueueNATS(AbstractQueue):
@@ -105,12 +105,25 @@ class QueueNATS:
                 active_subscriptions.append(subscription)
         return active_subscriptions
 
-    async def subscribe(self, channel: ChannelType):
+    @staticmethod
+    def _subject(channel: Union[ChannelType, str]) -> str:
+        return channel.value if isinstance(channel, ChannelType) else channel
+
+    async def subscribe(self, channel: Union[ChannelType, str], queue: str = ""):
+        """Subscribe to a channel (or raw NATS subject).
+
+        :param queue: Optional NATS queue group. Subscribers sharing a queue
+            group split the messages between them instead of each receiving
+            a copy.
+        :type queue: str
+        """
         if self._nc is None:
             raise Exception(
                 "Cannot subscribe to topic, client is not " "connected to a NATS queue"
             )
-        self._sub[channel] = await self._nc.subscribe(channel.value)
+        self._sub[channel] = await self._nc.subscribe(
+            self._subject(channel), queue=queue
+        )
 
     async def unsubscribe(self, channel: ChannelType):
         if not self._sub:
@@ -122,7 +135,7 @@ class QueueNATS:
         await self._sub[channel].unsubscribe()
         self._sub[channel] = None
 
-    async def next_msg(self, channel: ChannelType):
+    async def next_msg(self, channel: Union[ChannelType, str], timeout: float = 1):
         if not self._sub:
             raise Exception(
                 "Cannot get next message client is not subscribed \
@@ -131,15 +144,12 @@ class QueueNATS:
         if channel not in self._sub:
             raise Exception(
                 f"Cannot get next message client is not subscribed \
-                        to any NATS topic: {channel.value}"
+                        to any NATS topic: {self._subject(channel)}"
             )
 
         try:
-            msg = await self._sub[channel].next_msg(timeout=1)
-            print("Received data")
-            data = dill.loads(msg.data)
-            print("After dill loads")
-            print(data)
+            msg = await self._sub[channel].next_msg(timeout=timeout)
+            data = wire_format.loads(msg.data)
 
         except nats.errors.TimeoutError:
             raise QueueTimeoutException("nextMsg call - checking NATS")
@@ -156,15 +166,13 @@ class QueueNATS:
             if channel in self._sub:
                 await self._sub[channel].nack()
 
-    async def send(self, channel: ChannelType, body):
+    async def send(self, channel: Union[ChannelType, str], body):
         if self._nc is None:
             raise Exception(
                 "Cannot send message to NATS, client is "
                 "not connected to a NATS queue"
             )
-        print("Queue is sending")
-        print(body)
-        await self._nc.publish(channel.value, dill.dumps(body))
+        await self._nc.publish(self._subject(channel), wire_format.dumps(body))
 
     async def close(self):
         if self._sub:
@@ -0,0 +1,343 @@
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+import logging
+import threading
+import time
+
+from collections import deque
+from typing import Optional
+
+import pika
+
+from ..message import wire_format
+from .queue_rmq import ACTIVITIES_QUEUE, CONTROL_EXCHANGE, activity_queue
+
+
+class RMQPublisher(threading.Thread):
+    """Long-lived, batching RabbitMQ publisher with asynchronous confirms.
+
+    Messages handed to :meth:`publish` are encoded in the caller's thread and
+    queued. The publisher thread runs a ``pika.SelectConnection`` io loop and
+    flushes the queue once ``batch_size`` messages are waiting or ``linger``
+    seconds after the first message of a batch arrived, whichever comes first.
+    A whole batch is written in a single io loop pass, so pika coalesces it
+    into a handful of socket writes instead of one round trip per message.
+
+    Publisher confirms are handled asynchronously: every published message is
+    kept until the broker acks it (acks with ``multiple`` set release all
+    earlier delivery tags at once). Nacked messages, and messages that were in
+    flight when the connection dropped, are published again once the
+    publisher has reconnected.
+
+    :param queue_config: Broker address, with ``ip`` and ``port`` keys, and
+        optionally the ``plugins`` whose activity queues should be declared.
+    :type queue_config: dict
+    :param logger: The logger where to log information/warning or errors.
+    :type logger: Optional[logging.Logger]
+    :param batch_size: Number of queued messages that triggers a flush.
+    :type batch_size: int
+    :param linger: Seconds to wait for a batch to fill before flushing.
+    :type linger: float
+    :param max_in_flight: Maximum number of unconfirmed messages.
+    :type max_in_flight: int
+    :param reconnect_delay: Seconds to wait before reconnecting.
+    :type reconnect_delay: float
+    :param rate_window: Window, in seconds, over which ``send_rate`` is computed.
+    :type rate_window: float
+    """
+
+    def __init__(
+        self,
+        queue_config: dict,
+        logger: Optional[logging.Logger] = None,
+        batch_size: int = 256,
+        linger: float = 0.005,
+        max_in_flight: int = 10000,
+        reconnect_delay: float = 1.0,
+        rate_window: float = 5.0,
+    ) -> None:
+        threading.Thread.__init__(self, name="RMQPublisher", daemon=True)
+        self._logger: logging.Logger = (
+            logging.getLogger(__name__) if logger is None else logger
+        )
+        self._parameters = pika.ConnectionParameters(
+            host=queue_config["ip"], port=queue_config["port"]
+        )
+        self._queues = [ACTIVITIES_QUEUE] + [
+            activity_queue(plugin) for plugin in queue_config.get("plugins", [])
+        ]
+        self._batch_size = batch_size
+        self._linger = linger
+        self._max_in_flight = max_in_flight
+        self._reconnect_delay = reconnect_delay
+        self._rate_window = rate_window
+
+        self._connection = None
+        self._channel = None
+        self._ready = False
+        self._stopping = False
+
+        # Guards the pending queue and the wakeup flags; _settled is notified
+        # whenever messages are confirmed so flush() can wait on it.
+        self._lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)
+        self._pending = deque()
+        self._window_open = False
+        self._drain_scheduled = False
+        # Set when a drain stopped at max_in_flight; confirms resume it.
+        self._blocked = False
+
+        # Delivery tag -> message for everything the broker has not confirmed.
+        self._delivery_tag = 0
+        self._unconfirmed = {}
+
+        self._confirmed = 0
+        self._nacked = 0
+        self._republished = 0
+        self._confirm_times = deque()
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+    def publish(self, channel: str, body, exchange: str = "") -> None:
+        """Queue a message for publishing.
+
+        :param channel: Routing key (queue name on the default exchange).
+        :type channel: str
+        :param body: DAG, DAG node or control message to encode and send.
+        :param exchange: Exchange to publish to.
+        :type exchange: str
+        """
+        message = (exchange, channel, wire_format.dumps(body))
+        with self._lock:
+            self._pending.append(message)
+            if self._drain_scheduled:
+                return
+            if len(self._pending) >= self._batch_size:
+                self._drain_scheduled = True
+                callback = self._drain
+            elif not self._window_open:
+                self._window_open = True
+                callback = self._open_window
+            else:
+                return
+        self._call_threadsafe(callback)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued message has been confirmed.
+
+        :return: False if the timeout expired first.
+        :rtype: bool
+        """
+        with self._settled:
+            return self._settled.wait_for(
+                lambda: not self._pending and not self._unconfirmed, timeout
+            )
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Flush outstanding messages, close the connection and join."""
+        self.flush(timeout)
+        self._stopping = True
+        self._call_threadsafe(self._close)
+        self.join(timeout)
+
+    @property
+    def ready(self) -> bool:
+        """Whether the channel is open with publisher confirms enabled."""
+        return self._ready
+
+    @property
+    def send_rate(self) -> float:
+        """Confirmed messages per second over the last ``rate_window``."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim_rate_window(now)
+            return sum(n for _, n in self._confirm_times) / self._rate_window
+
+    @property
+    def stats(self) -> dict:
+        """Counters describing the publisher state."""
+        rate = self.send_rate
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "in_flight": len(self._unconfirmed),
+                "confirmed": self._confirmed,
+                "nacked": self._nacked,
+                "republished": self._republished,
+                "send_rate": rate,
+            }
+
+    # ------------------------------------------------------------------ #
+    # Connection lifecycle (io loop thread)
+    # ------------------------------------------------------------------ #
+    def run(self) -> None:
+        while not self._stopping:
+            self._logger.info(
+                f"[publisher] Connecting to RabbitMQ at "
+                f"{self._parameters.host}:{self._parameters.port}"
+            )
+            self._connection = pika.SelectConnection(
+                self._parameters,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_error,
+                on_close_callback=self._on_connection_closed,
+            )
+            self._connection.ioloop.start()
+        self._logger.info("[publisher] Stopped.")
+
+    def _call_threadsafe(self, callback) -> None:
+        connection = self._connection
+        if connection is None or not self._ready:
+            # Picked up by _on_ready once the channel is (re)opened.
+            return
+        try:
+            connection.ioloop.add_callback_threadsafe(callback)
+        except Exception as e:
+            self._logger.debug(f"[publisher] Could not wake io loop: {e}")
+
+    def _on_connection_open(self, connection) -> None:
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection, error) -> None:
+        self._logger.error(f"[publisher] Unable to connect to RabbitMQ: {error}")
+        self._schedule_reconnect(connection)
+
+    def _on_connection_closed(self, connection, reason) -> None:
+        self._ready = False
+        self._channel = None
+        self._requeue_unconfirmed()
+        if self._stopping:
+            connection.ioloop.stop()
+        else:
+            self._logger.warning(f"[publisher] Connection closed: {reason}")
+            self._schedule_reconnect(connection)
+
+    def _schedule_reconnect(self, connection) -> None:
+        # Stopping the io loop returns control to run(), which reconnects.
+        connection.ioloop.call_later(self._reconnect_delay, connection.ioloop.stop)
+
+    def _on_channel_open(self, channel) -> None:
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.exchange_declare(
+            exchange=CONTROL_EXCHANGE,
+            exchange_type="fanout",
+            callback=lambda _frame: self._declare_queues(list(self._queues)),
+        )
+
+    def _declare_queues(self, names: list) -> None:
+        # Declared one after the other, then confirms are switched on.
+        if not names:
+            self._channel.confirm_delivery(
+                ack_nack_callback=self._on_delivery_confirmation,
+                callback=self._on_ready,
+            )
+            return
+        self._channel.queue_declare(
+            queue=names[0], callback=lambda _frame: self._declare_queues(names[1:])
+        )
+
+    def _on_channel_closed(self, channel, reason) -> None:
+        self._logger.warning(f"[publisher] Channel closed: {reason}")
+        self._ready = False
+        self._channel = None
+        if self._connection is not None and self._connection.is_open:
+            self._connection.close()
+
+    def _on_ready(self, _frame=None) -> None:
+        self._logger.info("[publisher] Channel open with publisher confirms.")
+        self._ready = True
+        with self._lock:
+            self._window_open = False
+            self._drain_scheduled = False
+        self._drain()
+
+    def _close(self) -> None:
+        if self._connection is not None and self._connection.is_open:
+            self._connection.close()
+
+    # ------------------------------------------------------------------ #
+    # Batching and confirms (io loop thread)
+    # ------------------------------------------------------------------ #
+    def _open_window(self) -> None:
+        self._connection.ioloop.call_later(self._linger, self._drain)
+
+    def _drain(self) -> None:
+        if not self._ready or self._channel is None:
+            return
+        with self._lock:
+            self._window_open = False
+            self._drain_scheduled = False
+            room = self._max_in_flight - len(self._unconfirmed)
+            count = min(self._batch_size, room, len(self._pending))
+            batch = [self._pending.popleft() for _ in range(count)]
+            # Track the batch before publishing so flush() never sees it as
+            # neither pending nor in flight.
+            for message in batch:
+                self._delivery_tag += 1
+                self._unconfirmed[self._delivery_tag] = message
+            more = bool(self._pending) and room > count
+            if more:
+                self._drain_scheduled = True
+            self._blocked = bool(self._pending) and room <= count
+
+        for exchange, routing_key, body in batch:
+            self._channel.basic_publish(
+                exchange=exchange, routing_key=routing_key, body=body
+            )
+
+        if more:
+            # Yield to the io loop so confirms are processed between batches.
+            self._connection.ioloop.call_later(0, self._drain)
+
+    def _on_delivery_confirmation(self, method_frame) -> None:
+        method = method_frame.method
+        acked = isinstance(method, pika.spec.Basic.Ack)
+
+        with self._lock:
+            if method.multiple:
+                tags = [t for t in self._unconfirmed if t <= method.delivery_tag]
+            else:
+                tags = [method.delivery_tag]
+            messages = [self._unconfirmed.pop(tag, None) for tag in tags]
+            messages = [m for m in messages if m is not None]
+            if acked:
+                self._confirmed += len(messages)
+                now = time.monotonic()
+                self._confirm_times.append((now, len(messages)))
+                self._trim_rate_window(now)
+            else:
+                self._nacked += len(messages)
+                self._republished += len(messages)
+                self._pending.extendleft(reversed(messages))
+            self._settled.notify_all()
+
+        if not acked:
+            self._logger.warning(
+                f"[publisher] Broker nacked {len(messages)} messages; republishing."
+            )
+        if (self._blocked or not acked) and not self._drain_scheduled:
+            self._drain()
+
+    def _requeue_unconfirmed(self) -> None:
+        with self._lock:
+            messages = [self._unconfirmed[tag] for tag in sorted(self._unconfirmed)]
+            self._unconfirmed.clear()
+            self._delivery_tag = 0
+            self._republished += len(messages)
+            self._pending.extendleft(reversed(messages))
+        if messages:
+            self._logger.info(
+                f"[publisher] Republishing {len(messages)} unconfirmed messages "
+                "after reconnect."
+            )
+
+    def _trim_rate_window(self, now: float) -> None:
+        while (
+            self._confirm_times and now - self._confirm_times[0][0] > self._rate_window
+        ):
+            self._confirm_times.popleft()
@@ -1,10 +1,28 @@
 import logging
 from .abstract_queue import AbstractQueue
 from .queue_exceptions import QueueTimeoutException
+from ..message import wire_format
 from ..zambeze_types import ChannelType, QueueType
-import dill
 import pika
 
+# Activities that any agent can run (MONITOR, TERMINATOR, activities without a
+# known plugin) go to ACTIVITIES_QUEUE; everything else goes to the queue of
+# the plugin that runs it, see activity_queue().
+ACTIVITIES_QUEUE = "ACTIVITIES"
+
+# Control messages are fanned out so that every agent sees every status.
+CONTROL_EXCHANGE = "zambeze.control"
+
+# Activities that no consumer could take are parked here before being routed
+# back to the queue they came from (see QueueRMQ.delay_requeue).
+DELAY_EXCHANGE = "zambeze.delay"
+DELAY_QUEUE = "ZAMBEZE_DELAY"
+
+
+def activity_queue(plugin_name: str) -> str:
+    """Name of the queue holding activities run by ``plugin_name``."""
+    return f"{ACTIVITIES_QUEUE}.{plugin_name.lower()}"
+
 
 class QueueRMQ(AbstractQueue):
     def __init__(self, queue_config: dict, logger: logging.Logger) -> None:
@@ -12,6 +30,8 @@ class QueueRMQ(AbstractQueue):
         self._logger = logger
         self._ip = queue_config["ip"]
         self._port = queue_config["port"]
+        # Plugins whose activity queues are declared on connect.
+        self._plugins = queue_config.get("plugins", [])
         self._rmq = None
         self._rmq_channel = None
         self._sub = {}
@@ -57,10 +77,29 @@ class QueueRMQ(AbstractQueue):
             self._rmq_channel = self._rmq.channel()
             self._logger.info("[Queue RMQ] Creating RabbitMQ channels...")
 
-            # These are the two queues we listen on.
+            # Activity queues: the shared one plus one per plugin, declared
+            # up front so nothing published for a plugin without a running
+            # agent is dropped by the broker.
             # Note: these are *not subscriptions*; subscribing to filters not yet supported.
-            self._rmq_channel.queue_declare(queue="ACTIVITIES")
-            self._rmq_channel.queue_declare(queue="CONTROL")
+            self._rmq_channel.queue_declare(queue=ACTIVITIES_QUEUE)
+            for plugin_name in self._plugins:
+                self._rmq_channel.queue_declare(queue=activity_queue(plugin_name))
+            self._rmq_channel.exchange_declare(
+                exchange=CONTROL_EXCHANGE, exchange_type="fanout"
+            )
+
+            # Delay topology: messages published to the fanout delay exchange
+            # wait in the delay queue until their per-message TTL expires and
+            # are then dead-lettered through the default exchange. No
+            # dead-letter routing key is set, so they keep the routing key
+            # they were published with, i.e. the queue they came from.
+            self._rmq_channel.exchange_declare(
+                exchange=DELAY_EXCHANGE, exchange_type="fanout"
+            )
+            self._rmq_channel.queue_declare(
+                queue=DELAY_QUEUE, arguments={"x-dead-letter-exchange": ""}
+            )
+            self._rmq_channel.queue_bind(queue=DELAY_QUEUE, exchange=DELAY_EXCHANGE)
 
         except Exception as e:
             if self._logger:
@@ -93,22 +132,51 @@ class QueueRMQ(AbstractQueue):
                     return True
         return False
 
-    def listen_and_do_callback(self, callback_func, channel_to_listen, should_auto_ack):
+    def listen_and_do_callback(
+        self, callback_func, channel_to_listen, should_auto_ack, prefetch_count=None
+    ):
         """Listen for messages on a persistent websocket connection;
-        --> do action in callback function on receipt."""
+        --> do action in callback function on receipt.
+
+        :param channel_to_listen: Queue, or list of queues, to consume from.
+        :type channel_to_listen: Union[str, list[str]]
+        :param prefetch_count: Maximum number of unacknowledged messages the
+            broker delivers to this consumer at once. None means unlimited.
+        :type prefetch_count: Optional[int]
+        """
 
         listen_on_channel = self._rmq_channel
 
+        if prefetch_count:
+            listen_on_channel.basic_qos(prefetch_count=prefetch_count)
+
         s = f"[message_handler] Waiting with listener on RabbitMQ channel {channel_to_listen}"
         self._logger.debug(s)
 
-        listen_on_channel.basic_consume(
-            queue=channel_to_listen,
-            on_message_callback=callback_func,
-            auto_ack=should_auto_ack,
-        )
+        if isinstance(channel_to_listen, str):
+            channel_to_listen = [channel_to_listen]
+        for queue_name in channel_to_listen:
+            listen_on_channel.basic_consume(
+                queue=queue_name,
+                on_message_callback=callback_func,
+                auto_ack=should_auto_ack,
+            )
         listen_on_channel.start_consuming()
 
+    def bind_exclusive_queue(self, exchange: str) -> str:
+        """Declare a private, auto-deleted queue bound to ``exchange``.
+
+        Used to receive every message of a fanout exchange, for instance
+        CONTROL_EXCHANGE, on this connection only.
+
+        :return: The broker generated queue name.
+        :rtype: str
+        """
+        result = self._rmq_channel.queue_declare(queue="", exclusive=True)
+        queue_name = result.method.queue
+        self._rmq_channel.queue_bind(queue=queue_name, exchange=exchange)
+        return queue_name
+
     @property
     def subscriptions(self) -> list[ChannelType]:
         active_subscriptions = []
@@ -148,7 +216,7 @@ class QueueRMQ(AbstractQueue):
 
         try:
             msg = self._sub[channel].next_msg(timeout=1)
-            data = dill.loads(msg.data)
+            data = wire_format.loads(msg.data)
         except Exception as e:
             error_msg = "next_msg call - checking RabbitMQ"
             error_msg += f" error: {e}"
@@ -174,8 +242,30 @@ class QueueRMQ(AbstractQueue):
             )
 
         self._rmq_channel.basic_publish(
-            exchange=exchange, routing_key=channel, body=dill.dumps(body)
+            exchange=exchange, routing_key=channel, body=wire_format.dumps(body)
+        )
+
+    def delay_requeue(self, ch, method, body, delay_ms: int):
+        """Hand a delivered message back to its queue after ``delay_ms``.
+
+        The message is republished to the delay exchange with its original
+        routing key and an expiration, then acknowledged, so the consumer
+        thread does not block while the message waits to be redelivered.
+
+        :param ch: Channel the message was delivered on.
+        :param method: Delivery method frame of the message.
+        :param body: Raw message body.
+        :type body: bytes
+        :param delay_ms: Milliseconds before the message is routed back.
+        :type delay_ms: int
+        """
+        ch.basic_publish(
+            exchange=DELAY_EXCHANGE,
+            routing_key=method.routing_key,
+            body=body,
+            properties=pika.BasicProperties(expiration=str(int(delay_ms))),
         )
+        ch.basic_ack(delivery_tag=method.delivery_tag, multiple=False)
 
     def close(self):
         if self._sub:
@@ -9,12 +9,61 @@
 import logging
 import os
 import pathlib
+import threading
 import yaml
-from typing import Optional, Union
+from types import MappingProxyType
+from typing import Mapping, Optional, Union
 
-from .config import HOST, RABBIT_HOST, RABBIT_PORT
-from .orchestration.plugins import Plugins
-from .orchestration.db.dao.dao_utils import create_local_db
+from .config import HOST, NATS_HOST, NATS_PORT, RABBIT_HOST, RABBIT_PORT
+
+_client_settings_lock = threading.Lock()
+# conf file path -> (mtime_ns, size, settings)
+_client_settings_cache = {}
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def get_client_settings(conf_file: Optional[pathlib.Path] = None) -> Mapping:
+    """
+    Read-only view of the agent settings for clients.
+
+    Unlike :class:`ZambezeSettings`, this neither writes the configuration
+    file, creates the local database nor configures plugins. The file is
+    parsed once and parsed again only when its modification time or size
+    changes, e.g. after an agent restart picked a new ZMQ port.
+
+    :param conf_file: Path to configuration file
+    :type conf_file: Optional[pathlib.Path]
+    :return: The settings, with the ZMQ host defaulted.
+    :rtype: Mapping
+    """
+    path = pathlib.Path(conf_file or ZambezeSettings._conf_file)
+    try:
+        stat = path.stat()
+        version = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        version = None
+
+    with _client_settings_lock:
+        cached = _client_settings_cache.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        settings = {}
+        if version is not None:
+            with open(path, "r") as cf:
+                settings = yaml.safe_load(cf) or {}
+        settings.setdefault("zmq", {}).setdefault("host", HOST)
+
+        frozen = _freeze(settings)
+        _client_settings_cache[path] = (version, frozen)
+        return frozen
 
 
 class ZambezeSettings:
@@ -41,6 +90,10 @@ class ZambezeSettings:
             logging.getLogger(__name__) if logger is None else logger
         )
 
+        # Imported here so that clients reading get_client_settings do not
+        # load the plugins or sqlalchemy.
+        from .orchestration.plugins import Plugins
+
         # set default values
         self.settings = {"zmq": {}, "plugins": {}, "rmq": {}}
         self.plugins = Plugins(logger=self._logger)
@@ -90,6 +143,14 @@ class ZambezeSettings:
         self.__set_default("host", HOST, self.settings["zmq"])
         self.__set_default("host", RABBIT_HOST, self.settings["rmq"])
         self.__set_default("port", RABBIT_PORT, self.settings["rmq"])
+        self.__set_default("publish_batch_size", 256, self.settings["rmq"])
+        self.__set_default("publish_linger_ms", 5, self.settings["rmq"])
+        self.__set_default("prefetch", 10, self.settings["rmq"])
+        self.__set_default("activity_consumers", 2, self.settings["rmq"])
+        self.__set_default("requeue_delay_ms", 1000, self.settings["rmq"])
+        self.__set_default("nats", {}, self.settings)
+        self.__set_default("host", NATS_HOST, self.settings["nats"])
+        self.__set_default("port", NATS_PORT, self.settings["nats"])
         self.__set_default("plugins", {"All": {}}, self.settings)
         self.__set_default("All", {}, self.settings["plugins"])
         self.__set_default(
@@ -97,8 +158,33 @@ class ZambezeSettings:
             os.path.expanduser("~"),
             self.settings["plugins"]["All"],
         )
+        self.__set_default("executor", {}, self.settings)
+        self.__set_default(
+            "max_workers", os.cpu_count() or 1, self.settings["executor"]
+        )
+        self.__set_default("staging_cache", {}, self.settings)
+        self.__set_default(
+            "directory",
+            str(pathlib.Path.home().joinpath(".zambeze", "staging_cache")),
+            self.settings["staging_cache"],
+        )
+        # 0 disables the cache.
+        self.__set_default("max_bytes", 10 * 1024**3, self.settings["staging_cache"])
+        self.__set_default("result_cache", {}, self.settings)
+        self.__set_default(
+            "directory",
+            str(pathlib.Path.home().joinpath(".zambeze", "result_cache")),
+            self.settings["result_cache"],
+        )
+        # 0 disables memoization of shell activities.
+        self.__set_default("max_entries", 10000, self.settings["result_cache"])
+        self.__set_default("activity_store", {}, self.settings)
+        self.__set_default("batch_size", 256, self.settings["activity_store"])
+        self.__set_default("linger_ms", 50, self.settings["activity_store"])
         self.__save()
 
+        from .orchestration.db.dao.dao_utils import create_local_db
+
         create_local_db()
 
         self.__configure_plugins()
@@ -106,6 +192,9 @@ class ZambezeSettings:
     def __configure_plugins(self) -> None:
         """
         Load and configure Zambeze plugins.
+
+        Only agents build settings, so the plugins are configured right away
+        and a bad configuration fails the agent at startup.
         """
         config = {}
 
@@ -114,7 +203,7 @@ class ZambezeSettings:
                 self._logger.info(f"Configuring Plugin: {plugin_name}")
                 config[plugin_name] = self.settings["plugins"][plugin_name]["config"]
 
-        self.plugins.configure(config=config)
+        self.plugins.configure(config=config, eager=True)
 
     def get_zmq_connection_uri(self) -> str:
         """
@@ -0,0 +1,414 @@
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import pathlib
+import re
+import select
+import shutil
+import struct
+import time
+
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+# Bytes read at once when scanning, and granularity of the sidecar index.
+BLOCK_SIZE = 64 * 1024
+# Bytes of the log start hashed to notice a log replaced at the same path.
+_HEAD_BYTES = 4096
+INDEX_VERSION = 1
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+# The level of JSON records, or of "%(asctime)s - %(name)s - %(levelname)s -
+# %(message)s" text records; see zambeze.utils.structured_log.
+_LEVEL_RE = re.compile(
+    rb'(?:^\{"time": "[^"]*", "level": "| - )('
+    + b"|".join(lvl.encode() for lvl in LEVELS)
+    + rb')(?:"| - )'
+)
+_UUID_RE = re.compile(rb"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+@dataclass
+class LogFilter:
+    """Which agent log records to show.
+
+    ``campaign_id`` and ``activity_id`` select the records mentioning those
+    IDs; ``level`` is the lowest level shown. Records without a level, such
+    as traceback lines, are dropped once a level is given.
+    """
+
+    campaign_id: Optional[str] = None
+    activity_id: Optional[str] = None
+    level: Optional[str] = None
+
+    @property
+    def ids(self) -> list:
+        return [i for i in (self.campaign_id, self.activity_id) if i]
+
+    def __bool__(self) -> bool:
+        return bool(self.ids or self.level)
+
+    def matches(self, line: bytes) -> bool:
+        for token in self.ids:
+            if token.encode() not in line:
+                return False
+        if self.level:
+            found = _LEVEL_RE.search(line)
+            if found is None:
+                return False
+            level = found.group(1).decode()
+            if LEVELS.index(level) < LEVELS.index(self.level.upper()):
+                return False
+        return True
+
+
+def reverse_lines(f, block_size: Optional[int] = None) -> Iterator[bytes]:
+    """Lines of a binary file, last first, without their newline.
+
+    The file is read backwards ``block_size`` bytes at a time.
+    """
+    block_size = block_size or BLOCK_SIZE
+    pos = f.seek(0, os.SEEK_END)
+    if pos == 0:
+        return
+    remainder = b""
+    first = True
+    while pos > 0:
+        size = min(block_size, pos)
+        pos -= size
+        f.seek(pos)
+        lines = (f.read(size) + remainder).split(b"\n")
+        remainder = lines[0]
+        tail = lines[1:]
+        if first and tail and tail[-1] == b"":
+            # The newline ending the file does not start another line.
+            tail.pop()
+        first = False
+        yield from reversed(tail)
+    yield remainder
+
+
+class LogIndex:
+    """Sidecar index of the blocks of a log in which each ID appears.
+
+    Every UUID found in the log (campaign, activity and message IDs) is
+    mapped to the ``BLOCK_SIZE`` blocks holding the start of a line that
+    mentions it, so a query for one ID only reads those blocks. The index
+    is kept next to the log in the ``<log>.idx`` directory, sharded on the
+    first two characters of the IDs so a lookup only loads one shard, and
+    is extended with the lines appended since it was last updated. It is
+    rebuilt from scratch when the log was truncated or replaced.
+
+    :param log_path: Path of the log.
+    :type log_path: str
+    """
+
+    def __init__(self, log_path) -> None:
+        self.log_path = pathlib.Path(log_path)
+        self.index_path = self.log_path.with_name(self.log_path.name + ".idx")
+        self._indexed = 0
+        self._head = ""
+        # Shard -> {UUID -> sorted block numbers}, loaded on demand.
+        self._shards = {}
+
+    def update(self) -> None:
+        """Index the complete lines appended to the log since the last update."""
+        self._load()
+        with open(self.log_path, "rb") as f:
+            head = hashlib.sha1(f.read(_HEAD_BYTES)).hexdigest()
+            size = f.seek(0, os.SEEK_END)
+            if size < self._indexed or (self._indexed and head != self._head):
+                self._indexed = 0
+                shutil.rmtree(self.index_path, ignore_errors=True)
+            self._head = head
+            start = self._indexed
+
+            found = {}
+            f.seek(start)
+            pending = b""
+            offset = start
+            while True:
+                chunk = f.read(BLOCK_SIZE * 16)
+                if not chunk:
+                    break
+                data = pending + chunk
+                end = data.rfind(b"\n") + 1
+                self._scan(data[:end], offset, found)
+                offset += end
+                pending = data[end:]
+            self._indexed = offset
+
+        if self._indexed != start or not self.index_path.exists():
+            self._save(found)
+
+    @staticmethod
+    def _scan(data: bytes, offset: int, found: dict) -> None:
+        for match in _UUID_RE.finditer(data):
+            line_start = offset + data.rfind(b"\n", 0, match.start()) + 1
+            block = line_start // BLOCK_SIZE
+            blocks = found.setdefault(match.group().decode(), [])
+            if not blocks or blocks[-1] != block:
+                blocks.append(block)
+
+    def blocks(self, ids: list) -> list:
+        """Sorted blocks holding lines that may mention every ID in ``ids``."""
+        found = None
+        for token in ids:
+            blocks = set(self._shard(token[:2]).get(token, ()))
+            found = blocks if found is None else found & blocks
+        return sorted(found or ())
+
+    @staticmethod
+    def read_block(f, block: int) -> list:
+        """Lines starting in ``block``, without their newline."""
+        start = block * BLOCK_SIZE
+        if start:
+            # Skips the end of the line started in the previous block.
+            f.seek(start - 1)
+            f.readline()
+        else:
+            f.seek(0)
+        lines = []
+        while f.tell() < start + BLOCK_SIZE:
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line.rstrip(b"\n"))
+        return lines
+
+    def _shard(self, prefix: str) -> dict:
+        if prefix not in self._shards:
+            try:
+                with open(self.index_path.joinpath(f"{prefix}.json")) as f:
+                    self._shards[prefix] = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._shards[prefix] = {}
+        return self._shards[prefix]
+
+    def _load(self) -> None:
+        try:
+            with open(self.index_path.joinpath("meta.json")) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, NotADirectoryError, ValueError):
+            return
+        if meta.get("version") != INDEX_VERSION or meta.get("block_size") != BLOCK_SIZE:
+            return
+        self._indexed = meta["indexed"]
+        self._head = meta["head"]
+
+    def _save(self, found: dict) -> None:
+        by_shard = {}
+        for token, blocks in found.items():
+            by_shard.setdefault(token[:2], {})[token] = blocks
+        meta = {
+            "version": INDEX_VERSION,
+            "block_size": BLOCK_SIZE,
+            "indexed": self._indexed,
+            "head": self._head,
+        }
+        try:
+            self.index_path.mkdir(exist_ok=True)
+            for prefix, additions in by_shard.items():
+                shard = self._shard(prefix)
+                for token, blocks in additions.items():
+                    known = shard.setdefault(token, [])
+                    known.extend(b for b in blocks if not known or b > known[-1])
+                self._write(f"{prefix}.json", shard)
+            # Written last: a crash before it only reindexes the same lines.
+            self._write("meta.json", meta)
+        except OSError:
+            # Read-only log directory; the index is rebuilt next time.
+            pass
+
+    def _write(self, name: str, data: dict) -> None:
+        path = self.index_path.joinpath(name)
+        tmp = path.with_name(name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+
+def query(
+    log_path,
+    num_lines: int,
+    mode: str = "tail",
+    log_filter: Optional[LogFilter] = None,
+    use_index: bool = False,
+) -> list:
+    """The first or last ``num_lines`` records of a log matching a filter.
+
+    :param log_path: Path of the log.
+    :type log_path: str
+    :param num_lines: Number of lines to return.
+    :type num_lines: int
+    :param mode: "head" for the first lines, "tail" for the last ones.
+    :type mode: str
+    :param log_filter: Records to keep; every record when None.
+    :type log_filter: Optional[LogFilter]
+    :param use_index: Whether to look IDs up in the sidecar :class:`LogIndex`.
+        Only lowercase UUIDs are indexed; the log is scanned when none of
+        the IDs is one, e.g. for MONITOR.
+    :type use_index: bool
+    :return: The lines, in log order.
+    :rtype: list[str]
+    """
+    log_filter = log_filter or LogFilter()
+    if num_lines <= 0:
+        return []
+
+    # Blocks holding every indexed ID hold every line matching all the IDs.
+    indexed_ids = [i for i in log_filter.ids if _UUID_RE.fullmatch(i.encode())]
+    with open(log_path, "rb") as f:
+        if use_index and indexed_ids:
+            index = LogIndex(log_path)
+            index.update()
+            lines = _indexed_lines(f, index, indexed_ids, mode)
+        elif mode == "tail":
+            lines = reverse_lines(f)
+        else:
+            lines = (line.rstrip(b"\n") for line in f)
+
+        found = []
+        for line in lines:
+            if log_filter.matches(line):
+                found.append(line)
+                if len(found) == num_lines:
+                    break
+
+    if mode == "tail":
+        found.reverse()
+    return [line.decode(errors="replace") for line in found]
+
+
+def _indexed_lines(f, index: LogIndex, ids: list, mode: str):
+    blocks = index.blocks(ids)
+    if mode == "tail":
+        for block in reversed(blocks):
+            yield from reversed(index.read_block(f, block))
+    else:
+        for block in blocks:
+            yield from index.read_block(f, block)
+
+
+# inotify(7) constants.
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_EVENT = struct.Struct("iIII")
+
+
+class FileWatcher:
+    """Wait until one of a set of files changes.
+
+    On Linux the directories of the files are watched with inotify, so
+    :meth:`wait` sleeps until something is written. Elsewhere the files are
+    polled every ``poll_interval`` seconds.
+
+    :param paths: Files to watch.
+    :type paths: list
+    :param poll_interval: Seconds between polls when inotify is unavailable.
+    :type poll_interval: float
+    """
+
+    def __init__(self, paths: list, poll_interval: float = 0.5) -> None:
+        self.poll_interval = poll_interval
+        self._paths = set()
+        self._stats = {}
+        # Watch descriptor -> directory.
+        self._dirs = {}
+        self._fd = self._inotify_init()
+        for path in paths:
+            self.add(path)
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd is not None
+
+    def add(self, path) -> None:
+        path = pathlib.Path(path).absolute()
+        self._paths.add(path)
+        self._stats[path] = self._stat(path)
+        if self._fd is not None and path.parent not in self._dirs.values():
+            mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path.parent), mask)
+            if wd >= 0:
+                self._dirs[wd] = path.parent
+
+    def discard(self, path) -> None:
+        path = pathlib.Path(path).absolute()
+        self._paths.discard(path)
+        self._stats.pop(path, None)
+
+    def wait(self, timeout: Optional[float] = None) -> set:
+        """Block until a watched file changes or ``timeout`` seconds pass.
+
+        :return: The watched paths that changed.
+        :rtype: set[pathlib.Path]
+        """
+        if self._fd is None:
+            return self._poll(timeout)
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        data = os.read(self._fd, 64 * 1024)
+        pos = 0
+        while pos < len(data):
+            wd, _, _, length = _IN_EVENT.unpack_from(data, pos)
+            pos += _IN_EVENT.size
+            name = data[pos : pos + length].rstrip(b"\0")
+            pos += length
+            if wd in self._dirs and name:
+                path = self._dirs[wd].joinpath(os.fsdecode(name))
+                if path in self._paths:
+                    changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _poll(self, timeout: Optional[float]) -> set:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path in self._paths:
+                stat = self._stat(path)
+                if stat != self._stats[path]:
+                    self._stats[path] = stat
+                    changed.add(path)
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return changed
+            delay = self.poll_interval
+            if deadline is not None:
+                delay = min(delay, max(deadline - time.monotonic(), 0))
+            time.sleep(delay)
+
+    @staticmethod
+    def _stat(path: pathlib.Path):
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _inotify_init(self) -> Optional[int]:
+        name = ctypes.util.find_library("c")
+        try:
+            self._libc = ctypes.CDLL(name, use_errno=True)
+            fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        return fd if fd >= 0 else None
@@ -0,0 +1,135 @@
+# Copyright (c) 2022 Oak Ridge National Laboratory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the MIT License.
+
+import atexit
+import copy
+import json
+import logging
+import queue
+
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Per-event fields passed through ``extra=`` and written as JSON keys.
+EVENT_FIELDS = ("campaign_id", "activity_id", "stage", "latency_ms")
+
+
+def event(
+    stage: str,
+    campaign_id: Optional[str] = None,
+    activity_id: Optional[str] = None,
+    latency_ms: Optional[float] = None,
+) -> dict:
+    """The ``extra`` of a log record about one step of an activity.
+
+    :param stage: Step of the activity lifecycle, e.g. "queued" or "finished".
+    :type stage: str
+    :param campaign_id: ID of the campaign of the activity.
+    :type campaign_id: Optional[str]
+    :param activity_id: ID of the activity in its campaign DAG.
+    :type activity_id: Optional[str]
+    :param latency_ms: Milliseconds the step took.
+    :type latency_ms: Optional[float]
+    """
+    return {
+        "stage": stage,
+        "campaign_id": campaign_id,
+        "activity_id": activity_id,
+        "latency_ms": latency_ms,
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as one JSON object per line.
+
+    Every record has ``time``, ``level``, ``logger``, ``thread`` and ``msg``
+    keys, plus the :data:`EVENT_FIELDS` given through ``extra`` and the
+    traceback of logged exceptions under ``exc``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for field in EVENT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class _AsyncHandler(QueueHandler):
+    """Hand records to a :class:`QueueListener` thread.
+
+    Only the message is interpolated in the logging thread, since its
+    arguments may change once the call returns; serializing the record and
+    writing it happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _Listener(QueueListener):
+    def stop(self) -> None:
+        # Also called at exit, possibly after an explicit stop.
+        if self._thread is not None:
+            super().stop()
+
+
+def start_logging(
+    logger: logging.Logger,
+    log_path,
+    level: int = logging.INFO,
+    log_format: str = "json",
+) -> QueueListener:
+    """Log the records of ``logger`` to a file from a background thread.
+
+    ``logger`` only puts its records on a queue; a listener thread formats
+    them and writes them to ``log_path``. The listener is stopped, flushing
+    the queue, when the interpreter exits.
+
+    :param logger: The logger whose records to write.
+    :type logger: logging.Logger
+    :param log_path: Path of the log file.
+    :type log_path: str
+    :param level: Lowest level logged.
+    :type level: int
+    :param log_format: "json" for one JSON object per line, or "text".
+    :type log_format: str
+    :return: The started listener.
+    :rtype: QueueListener
+    """
+    file_handler = logging.FileHandler(log_path)
+    if log_format == "json":
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    records = queue.SimpleQueue()
+    listener = _Listener(records, file_handler)
+    logger.addHandler(_AsyncHandler(records))
+    logger.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
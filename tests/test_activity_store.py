@@ -0,0 +1,140 @@
+import logging
+import sqlite3
+
+from queue import Queue
+from types import SimpleNamespace
+
+from zambeze.campaign.activities.shell import ShellActivity
+from zambeze.orchestration.agent.message_handler import MessageHandler
+from zambeze.orchestration.db.activity_store import ActivityStore
+from zambeze.orchestration.db.dao.dao_utils import create_local_db, get_db_engine
+from zambeze.orchestration.dependency_tracker import DependencyTracker
+from zambeze.orchestration.executor import Executor
+from zambeze.orchestration.message.wire_format import encode_node
+from zambeze.orchestration.monitor import Monitor
+
+import pytest
+
+
+class RecoveringChannel:
+    """Channel recording what the store would recover when a message is acked."""
+
+    def __init__(self, store):
+        self.store = store
+        self.recovered = None
+
+    def basic_ack(self, **kwargs):
+        self.recovered = self.store.recover()[0]
+
+
+@pytest.mark.unit
+def test_lifecycle_events_are_merged_and_written_in_batches(tmp_path):
+    db_file = str(tmp_path.joinpath("zambeze.db"))
+    store = ActivityStore(agent_id="agent-1", batch_size=100, db_file=db_file)
+    store.start()
+
+    for i in range(10):
+        store.record(f"a{i}", "campaign-1", "QUEUED", queued_at=1)
+        store.record(f"a{i}", status="RUNNING", started_at=2)
+    store.record("a0", status="SUCCEEDED", ended_at=3)
+    store.record("b0", "campaign-2", "FAILED", ended_at=4)
+    assert store.flush(timeout=5)
+
+    rows = {row["activity_uuid"]: row for row in store.query(campaign_id="campaign-1")}
+    assert len(rows) == 10
+    assert rows["a0"]["status"] == "SUCCEEDED"
+    assert (rows["a0"]["queued_at"], rows["a0"]["started_at"]) == (1, 2)
+    assert rows["a0"]["ended_at"] == 3
+    assert rows["a1"]["status"] == "RUNNING"
+    assert rows["a1"]["agent_id"] == "agent-1"
+    assert [r["activity_uuid"] for r in store.query(status="FAILED")] == ["b0"]
+    assert store.stats["written"] == 22
+    assert store.stats["batches"] < 22
+
+    store.stop(timeout=5)
+    assert not store.is_alive()
+    assert get_db_engine(db_file) is get_db_engine(db_file)
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+@pytest.mark.unit
+def test_existing_activity_table_is_migrated(tmp_path):
+    db_file = str(tmp_path.joinpath("old.db"))
+    with sqlite3.connect(db_file) as conn:
+        conn.execute(
+            "CREATE TABLE activity (activity_id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " agent_id TEXT, created_at INTEGER NOT NULL, started_at INTEGER,"
+            " ended_at INTEGER, params TEXT)"
+        )
+
+    create_local_db(db_file)
+
+    with sqlite3.connect(db_file) as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(activity)")}
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(activity)")}
+    assert {"campaign_id", "activity_uuid", "status", "queued_at"} <= columns
+    assert {"activity_campaign_idx", "activity_status_idx"} <= indexes
+
+
+@pytest.mark.unit
+def test_unfinished_campaigns_are_recovered(tmp_path):
+    db_file = str(tmp_path.joinpath("zambeze.db"))
+    store = ActivityStore(db_file=db_file)
+    store.start()
+    monitor = ("MONITOR", {"campaign_id": "c", "all_activity_ids": ["a", "b"]})
+    first = ("a", {"campaign_id": "c", "predecessors": ["MONITOR"]})
+    second = ("b", {"campaign_id": "c", "predecessors": ["a"]})
+    for node in (monitor, first, second):
+        store.checkpoint(node)
+    store.record("a", "c", "SUCCEEDED")
+    store.forget("c", "a")
+    store.stop(timeout=5)
+
+    # A new agent on the same database, as after a crash.
+    executor = Executor.__new__(Executor)
+    executor._logger = logging.getLogger(__name__)
+    executor._store = ActivityStore(db_file=db_file)
+    executor.to_process_q = Queue()
+    executor.to_status_q = Queue()
+    executor.monitor = Monitor(to_status_q=executor.to_status_q)
+    executor.dependency_tracker = DependencyTracker(
+        on_ready=lambda node: None, on_failed=lambda node, pred: None
+    )
+    executor._accepted = set()
+    executor._finished = {}
+
+    assert executor.recover() == 1
+    assert executor.to_process_q.get_nowait() == second
+    assert executor.to_process_q.empty()
+    assert executor.dependency_tracker.status("c", "a") == "SUCCEEDED"
+
+    # A redelivered copy of the finished activity is not run again.
+    assert not executor._accept(first)
+    assert executor.to_status_q.get_nowait()["status"] == "SUCCEEDED"
+    assert executor._accept(second)
+    assert not executor._accept(second)
+
+
+@pytest.mark.unit
+def test_activity_is_checkpointed_before_it_is_acked(tmp_path):
+    db_file = str(tmp_path.joinpath("zambeze.db"))
+    # Events written behind would not be in the database for seconds.
+    store = ActivityStore(db_file=db_file, linger=10)
+    store.start()
+    handler = MessageHandler.__new__(MessageHandler)
+    handler._logger = logging.getLogger(__name__)
+    handler._settings = SimpleNamespace(is_plugin_configured=lambda plugin: True)
+    handler._store = store
+    handler.check_activity_q = Queue()
+    activity = ShellActivity(name="echo", files=[], command="echo", arguments="hi")
+    node = ("a", {"campaign_id": "c", "activity": activity, "predecessors": []})
+    channel = RecoveringChannel(store)
+
+    handler._callback(
+        None, channel, SimpleNamespace(delivery_tag=1), None, encode_node(node)
+    )
+
+    assert [recovered[0] for recovered in channel.recovered] == ["a"]
+    assert handler.check_activity_q.get_nowait()[0] == "a"
+    store.stop(timeout=5)
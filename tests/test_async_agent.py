@@ -0,0 +1,116 @@
+import asyncio
+import logging
+
+from zambeze.campaign.activities.shell import ShellActivity
+from zambeze.orchestration.agent.async_agent import AsyncAgent, activity_subject
+from zambeze.orchestration.dependency_tracker import DependencyTracker
+from zambeze.orchestration.zambeze_types import ChannelType
+
+import pytest
+
+
+class FakeQueue:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, channel, body):
+        self.sent.append((channel, body))
+
+
+class FakeStore:
+    def __init__(self):
+        self.events = []
+
+    def record(self, activity_id, campaign_id=None, status=None, **timestamps):
+        self.events.append((activity_id, status))
+
+
+def _agent():
+    # Skip __init__: no settings file, NATS server or database is needed.
+    agent = AsyncAgent.__new__(AsyncAgent)
+    agent._logger = logging.getLogger("test_async_agent")
+    agent._queue = FakeQueue()
+    agent._store = FakeStore()
+    agent._tracker = DependencyTracker(
+        on_ready=agent._on_ready, on_failed=agent._on_failed, logger=agent._logger
+    )
+    agent._slots = asyncio.Semaphore(2)
+    agent._monitors = {}
+    agent._tasks = set()
+    return agent
+
+
+def _node(command, arguments, predecessors=()):
+    activity = ShellActivity(
+        name=command, files=[], command=command, arguments=arguments
+    )
+    return (
+        activity.activity_id,
+        {
+            "activity": activity,
+            "campaign_id": "campaign-1",
+            "predecessors": list(predecessors),
+        },
+    )
+
+
+async def _settle(agent):
+    while agent._tasks:
+        await asyncio.gather(*list(agent._tasks))
+
+
+@pytest.mark.unit
+def test_activity_subjects():
+    assert activity_subject() == "ACTIVITY"
+    assert activity_subject("SHELL") == "ACTIVITY.shell"
+
+
+@pytest.mark.unit
+def test_shell_activities_run_as_subprocesses_in_dependency_order():
+    async def scenario():
+        agent = _agent()
+        first = _node("true", "")
+        second = _node("false", "", predecessors=[first[0]])
+
+        await agent._handle_activity(second)
+        await agent._handle_activity(first)
+        await _settle(agent)
+        # Statuses come back over STATUS; feed them in like the consumer does.
+        for _, status in list(agent._queue.sent):
+            await agent._handle_control(status)
+        await _settle(agent)
+        return agent
+
+    agent = asyncio.run(scenario())
+    statuses = [(msg["activity_id"], msg["status"]) for _, msg in agent._queue.sent]
+    assert statuses[0][1] == "SUCCEEDED"
+    assert statuses[1][1] == "FAILED"
+    assert statuses[0][0] != statuses[1][0]
+    # Every activity's lifecycle is recorded in the activity store.
+    second_events = [s for a, s in agent._store.events if a == statuses[1][0]]
+    assert second_events == ["QUEUED", "RUNNING", "FAILED"]
+
+
+@pytest.mark.unit
+def test_monitor_heartbeats_until_campaign_completes():
+    async def scenario():
+        agent = _agent()
+        agent.monitor_hb_s = 0.01
+        monitor = (
+            "MONITOR",
+            {"campaign_id": "campaign-1", "all_activity_ids": ["MONITOR", "a"]},
+        )
+        await agent._handle_activity(monitor)
+        await asyncio.sleep(0.05)
+        await agent._handle_control(
+            {"campaign_id": "campaign-1", "activity_id": "a", "status": "SUCCEEDED"}
+        )
+        await _settle(agent)
+        return agent
+
+    agent = asyncio.run(scenario())
+    heartbeats = [msg for channel, msg in agent._queue.sent]
+    assert all(channel == ChannelType.STATUS for channel, _ in agent._queue.sent)
+    assert len(heartbeats) >= 2
+    assert {msg["status"] for msg in heartbeats} == {"MONITORING"}
+    assert agent._monitors == {}
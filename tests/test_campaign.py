@@ -34,3 +34,64 @@ def test_campaign():
     campaign.add_activity(activity)
     assert valid_uuid(campaign.activities[0].campaign_id)
     assert campaign.activities[0].campaign_id == campaign.campaign_id
+
+
+@pytest.mark.unit
+def test_campaign_dag_fans_out_independent_activities():
+    logger = logging.getLogger(__name__)
+    count_a = ShellActivity(
+        name="Count A",
+        files=[],
+        command="python3",
+        arguments="wordcount.py --name a",
+        outputs=["/tmp/zambeze/a.json"],
+        logger=logger,
+    )
+    count_b = ShellActivity(
+        name="Count B",
+        files=[],
+        command="python3",
+        arguments="wordcount.py --name b",
+        outputs=["/tmp/zambeze/b.json"],
+        logger=logger,
+    )
+    merge = ShellActivity(
+        name="Merge",
+        files=["file:///tmp/zambeze/a.json", "/tmp/zambeze/b.json"],
+        command="python3",
+        arguments="merge_counts.py",
+        logger=logger,
+    )
+    report = ShellActivity(
+        name="Report",
+        files=[],
+        command="echo",
+        arguments="done",
+        depends_on=[merge],
+        logger=logger,
+    )
+
+    campaign = Campaign(
+        "Fan out", activities=[count_a, count_b, merge, report], logger=logger
+    )
+    dag = campaign._pack_dag_for_dispatch()
+
+    assert set(dag.successors("MONITOR")) == {count_a.activity_id, count_b.activity_id}
+    assert set(dag.predecessors(merge.activity_id)) == {
+        count_a.activity_id,
+        count_b.activity_id,
+    }
+    assert list(dag.predecessors(report.activity_id)) == [merge.activity_id]
+    assert list(dag.predecessors("TERMINATOR")) == [report.activity_id]
+    assert dag.nodes[count_a.activity_id]["predecessors"] == ["MONITOR"]
+
+
+@pytest.mark.unit
+def test_campaign_dag_rejects_unknown_dependency():
+    activity = ShellActivity(
+        name="Echo", files=[], command="echo", arguments="hi", depends_on=["nope"]
+    )
+    campaign = Campaign("Unknown dependency", activities=[activity])
+
+    with pytest.raises(ValueError):
+        campaign._pack_dag_for_dispatch()
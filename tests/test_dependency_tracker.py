@@ -0,0 +1,93 @@
+from zambeze.orchestration.dependency_tracker import DependencyTracker
+
+import pytest
+
+
+def _node(activity_id, predecessors, campaign_id="campaign-1"):
+    return (
+        activity_id,
+        {"campaign_id": campaign_id, "predecessors": predecessors},
+    )
+
+
+def _tracker():
+    ready = []
+    failed = []
+    tracker = DependencyTracker(
+        on_ready=ready.append,
+        on_failed=lambda node, pred: failed.append((node[0], pred)),
+    )
+    return tracker, ready, failed
+
+
+@pytest.mark.unit
+def test_node_without_predecessors_is_released():
+    tracker, ready, failed = _tracker()
+    tracker.add(_node("a", []))
+
+    assert [node[0] for node in ready] == ["a"]
+    assert failed == []
+    assert tracker.waiting == 0
+
+
+@pytest.mark.unit
+def test_released_when_last_predecessor_succeeds():
+    tracker, ready, failed = _tracker()
+    tracker.add(_node("c", ["a", "b"]))
+    assert ready == []
+    assert tracker.waiting == 1
+
+    tracker.update(
+        {"campaign_id": "campaign-1", "activity_id": "a", "status": "SUCCEEDED"}
+    )
+    assert ready == []
+
+    tracker.update(
+        {"campaign_id": "campaign-1", "activity_id": "b", "status": "SUCCEEDED"}
+    )
+    assert [node[0] for node in ready] == ["c"]
+    assert tracker.waiting == 0
+
+
+@pytest.mark.unit
+def test_statuses_received_before_the_node():
+    tracker, ready, _ = _tracker()
+    tracker.update(
+        {"campaign_id": "campaign-1", "activity_id": "a", "status": "SUCCEEDED"}
+    )
+    tracker.add(_node("b", ["a"]))
+
+    assert [node[0] for node in ready] == ["b"]
+
+
+@pytest.mark.unit
+def test_monitor_heartbeat_is_scoped_to_campaign():
+    tracker, ready, _ = _tracker()
+    tracker.add(_node("a", ["MONITOR"], campaign_id="campaign-1"))
+
+    tracker.update(
+        {"campaign_id": "campaign-2", "activity_id": "MONITOR", "status": "MONITORING"}
+    )
+    assert ready == []
+
+    tracker.update(
+        {"campaign_id": "campaign-1", "activity_id": "MONITOR", "status": "MONITORING"}
+    )
+    assert [node[0] for node in ready] == ["a"]
+
+
+@pytest.mark.unit
+def test_failed_predecessor_fails_dependents():
+    tracker, ready, failed = _tracker()
+    tracker.add(_node("c", ["a", "b"]))
+    tracker.update(
+        {"campaign_id": "campaign-1", "activity_id": "a", "status": "FAILED"}
+    )
+    assert failed == [("c", "a")]
+
+    # The other predecessor finishing later must not release the failed node.
+    tracker.update(
+        {"campaign_id": "campaign-1", "activity_id": "b", "status": "SUCCEEDED"}
+    )
+    assert ready == []
+    assert tracker.waiting == 0
@@ -0,0 +1,76 @@
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+
+from zambeze.campaign.activities.shell import ShellActivity
+from zambeze.orchestration import executor as executor_module
+from zambeze.orchestration.executor import Executor
+
+import pytest
+
+
+class FlakyStore:
+    """Activity store failing to record the given status."""
+
+    def __init__(self, failing_status=None):
+        self.failing_status = failing_status
+
+    def record(self, activity_id, campaign_id=None, status=None, **times):
+        if status == self.failing_status:
+            raise RuntimeError("database is locked")
+
+    def forget(self, campaign_id, activity_id):
+        pass
+
+
+class BrokenResults:
+    def restore(self, key):
+        raise OSError("No space left on device")
+
+
+def _executor(store):
+    executor = Executor.__new__(Executor)
+    executor._logger = logging.getLogger(__name__)
+    executor._settings = None
+    executor._store = store
+    executor._pool = ThreadPoolExecutor(max_workers=1)
+    executor.to_status_q = Queue()
+    executor._finished = {}
+    executor._start_times = {}
+    return executor
+
+
+def _node(memoize=False):
+    activity = ShellActivity(
+        name="true", files=[], command="true", arguments="", memoize=memoize
+    )
+    return ("a", {"campaign_id": "c", "activity": activity, "transfer_tokens": {}})
+
+
+@pytest.mark.unit
+def test_activity_failing_to_record_its_start_is_reported_failed():
+    executor = _executor(FlakyStore(failing_status="RUNNING"))
+
+    executor._submit_activity(_node())
+
+    status = executor.to_status_q.get(timeout=5)
+    assert (status["activity_id"], status["status"]) == ("a", "FAILED")
+    assert isinstance(status["details"], RuntimeError)
+    executor._pool.shutdown()
+    assert executor.to_status_q.empty()
+
+
+@pytest.mark.unit
+def test_activity_failing_to_restore_its_result_is_reported_failed(monkeypatch):
+    monkeypatch.setattr(
+        executor_module, "get_result_cache", lambda settings, logger: BrokenResults()
+    )
+    executor = _executor(FlakyStore())
+
+    executor._submit_activity(_node(memoize=True))
+
+    status = executor.to_status_q.get(timeout=5)
+    assert (status["activity_id"], status["status"]) == ("a", "FAILED")
+    assert isinstance(status["details"], OSError)
+    executor._pool.shutdown()
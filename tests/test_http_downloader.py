@@ -0,0 +1,202 @@
+import http.server
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from zambeze.orchestration.data.http_downloader import HTTPDownloader
+from zambeze.orchestration.data.staging_cache import StagingCache
+from zambeze.orchestration.data.transfer_hippo import TransferHippo
+
+import pytest
+
+FILES = {f"/file-{i}.dat": os.urandom(1000 + i) for i in range(8)}
+FILES["/big.dat"] = os.urandom(10 * 4096 + 123)
+
+
+def _etag(path):
+    return f'"{hash(FILES[path])}"'
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """Serves FILES with ETag and byte range support, recording requests."""
+
+    protocol_version = "HTTP/1.1"
+    requests_seen = []
+    # Seconds to wait before answering a GET.
+    delay = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _headers(self, status, length, extra=()):
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", _etag(self.path))
+        for key, value in extra:
+            self.send_header(key, value)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.requests_seen.append(("HEAD", self.path, None))
+        self._headers(200, len(FILES[self.path]))
+
+    def do_GET(self):
+        body = FILES[self.path]
+        byte_range = self.headers.get("Range")
+        self.requests_seen.append(("GET", self.path, byte_range))
+        time.sleep(self.delay)
+        # If-Range with a stale validator asks for the whole file.
+        stale = self.headers.get("If-Range", _etag(self.path)) != _etag(self.path)
+        if byte_range is None or stale:
+            self._headers(200, len(body))
+            self.wfile.write(body)
+            return
+        first, last = re.match(r"bytes=(\d+)-(\d*)", byte_range).groups()
+        first = int(first)
+        if first >= len(body):
+            self._headers(416, 0, [("Content-Range", f"bytes */{len(body)}")])
+            return
+        last = int(last) if last else len(body) - 1
+        extra = [("Content-Range", f"bytes {first}-{last}/{len(body)}")]
+        self._headers(206, last - first + 1, extra)
+        self.wfile.write(body[first : last + 1])
+
+
+@pytest.fixture
+def server():
+    RangeHandler.requests_seen = []
+    RangeHandler.delay = 0
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.unit
+def test_files_are_downloaded_concurrently(server, tmp_path):
+    downloader = HTTPDownloader(max_workers=4)
+    items = [
+        (server + name, str(tmp_path.joinpath(name[1:])))
+        for name in FILES
+        if name != "/big.dat"
+    ]
+
+    sizes = downloader.download_all(items).result(10)
+
+    for url, dest in items:
+        assert open(dest, "rb").read() == FILES[url[len(server) :]]
+        assert sizes[dest] == len(FILES[url[len(server) :]])
+    assert not list(tmp_path.glob("*.part"))
+
+
+@pytest.mark.unit
+def test_large_file_is_fetched_in_ranged_parts(server, tmp_path):
+    downloader = HTTPDownloader(part_size=4096)
+    dest = tmp_path.joinpath("big.dat")
+
+    downloader.download(server + "/big.dat", dest)
+
+    assert dest.read_bytes() == FILES["/big.dat"]
+    ranges = [r for method, _, r in RangeHandler.requests_seen if method == "GET"]
+    assert len(ranges) == 11
+    assert all(r is not None for r in ranges)
+
+
+@pytest.mark.unit
+def test_partial_download_is_resumed(server, tmp_path):
+    downloader = HTTPDownloader()
+    dest = tmp_path.joinpath("file-3.dat")
+    tmp_path.joinpath("file-3.dat.part").write_bytes(FILES["/file-3.dat"][:600])
+    tmp_path.joinpath("file-3.dat.part.json").write_text(
+        json.dumps({"validator": _etag("/file-3.dat")})
+    )
+
+    downloader.download(server + "/file-3.dat", dest)
+
+    assert dest.read_bytes() == FILES["/file-3.dat"]
+    assert ("GET", "/file-3.dat", "bytes=600-") in RangeHandler.requests_seen
+    assert not tmp_path.joinpath("file-3.dat.part.json").exists()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "part, validator",
+    [
+        # Same size as the file, but of another version.
+        (os.urandom(1004), '"old"'),
+        # Of no known version.
+        (os.urandom(1004), None),
+        # Longer than the file, the server answers 416 to its range.
+        (os.urandom(1500), _etag("/file-4.dat")),
+    ],
+)
+def test_stale_partial_download_is_restarted(server, tmp_path, part, validator):
+    downloader = HTTPDownloader()
+    dest = tmp_path.joinpath("file-4.dat")
+    tmp_path.joinpath("file-4.dat.part").write_bytes(part)
+    if validator is not None:
+        tmp_path.joinpath("file-4.dat.part.json").write_text(
+            json.dumps({"validator": validator})
+        )
+
+    downloader.download(server + "/file-4.dat", dest)
+
+    assert dest.read_bytes() == FILES["/file-4.dat"]
+    assert ("GET", "/file-4.dat", None) in RangeHandler.requests_seen
+    assert not tmp_path.joinpath("file-4.dat.part.json").exists()
+
+
+def _stage(cache, files):
+    hippo = TransferHippo(
+        agent_id="agent",
+        settings=SimpleNamespace(settings={"plugins": {}}),
+        logger=logging.getLogger("test_http_downloader"),
+        cache=cache,
+    )
+    hippo.load(files)
+    assert hippo.validate()
+    hippo.start_transfer()
+    future = hippo.track()
+    if future is not None:
+        future.result(10)
+
+
+@pytest.mark.unit
+def test_transfer_hippo_stages_http_files_through_cache(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = StagingCache(tmp_path.joinpath("cache"), max_bytes=1 << 20)
+    files = [f"{server}/file-{i}.dat" for i in range(3)]
+
+    _stage(cache, files)
+    _stage(cache, files)
+
+    gets = [path for method, path, _ in RangeHandler.requests_seen if method == "GET"]
+    assert len(gets) == 3
+    assert cache.stats["hits"] == 3
+    assert tmp_path.joinpath("file-1.dat").read_bytes() == FILES["/file-1.dat"]
+
+
+@pytest.mark.unit
+def test_concurrent_activities_fetch_a_file_once(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    RangeHandler.delay = 0.3
+    cache = StagingCache(tmp_path.joinpath("cache"), max_bytes=1 << 20)
+    files = [f"{server}/file-{i}.dat" for i in range(3)]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for staged in [pool.submit(_stage, cache, files) for _ in range(4)]:
+            staged.result()
+
+    gets = [path for method, path, _ in RangeHandler.requests_seen if method == "GET"]
+    assert sorted(gets) == ["/file-0.dat", "/file-1.dat", "/file-2.dat"]
+    assert tmp_path.joinpath("file-2.dat").read_bytes() == FILES["/file-2.dat"]
+    assert not list(tmp_path.joinpath("cache", "incoming").iterdir())
@@ -0,0 +1,86 @@
+import threading
+import time
+import uuid
+
+from zambeze.utils import log_query
+from zambeze.utils.log_query import FileWatcher, LogFilter, LogIndex, query
+
+import pytest
+
+
+def _write_log(path, lines):
+    with open(path, "a") as f:
+        for level, message in lines:
+            f.write(f"2024-01-01 00:00:00,000 - zambeze - {level} - {message}\n")
+
+
+@pytest.mark.unit
+def test_tail_and_head_scan_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_query, "BLOCK_SIZE", 64)
+    log = tmp_path.joinpath("zambeze.log")
+    _write_log(log, [("INFO", f"line {i}") for i in range(100)])
+
+    tail = query(log, 3)
+    assert [line.split(" - ")[-1] for line in tail] == ["line 97", "line 98", "line 99"]
+    head = query(log, 2, mode="head")
+    assert [line.split(" - ")[-1] for line in head] == ["line 0", "line 1"]
+    assert len(query(log, 1000)) == 100
+
+
+@pytest.mark.unit
+def test_filters_with_and_without_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_query, "BLOCK_SIZE", 256)
+    log = tmp_path.joinpath("zambeze.log")
+    campaign, other = str(uuid.uuid4()), str(uuid.uuid4())
+    for i in range(50):
+        _write_log(
+            log,
+            [
+                ("INFO", f"[exec] Running {other} step {i}"),
+                ("ERROR" if i % 10 == 0 else "INFO", f"[exec] {campaign} step {i}"),
+            ],
+        )
+
+    for use_index in (False, True):
+        found = query(log, 3, log_filter=LogFilter(campaign), use_index=use_index)
+        assert [line.split()[-1] for line in found] == ["47", "48", "49"]
+        assert all(campaign in line for line in found)
+
+        errors = query(
+            log, 10, log_filter=LogFilter(campaign, level="error"), use_index=use_index
+        )
+        assert [line.split()[-1] for line in errors] == ["0", "10", "20", "30", "40"]
+
+    # IDs that are not lowercase UUIDs are not indexed, the log is scanned.
+    _write_log(log, [("INFO", f"[exec] Monitoring {campaign} as MONITOR")])
+    upper = str(uuid.uuid4()).upper()
+    _write_log(log, [("INFO", f"[exec] {upper} step 50")])
+    for use_index in (False, True):
+        for log_filter in (
+            LogFilter(activity_id="MONITOR"),
+            LogFilter(campaign, "MONITOR"),
+        ):
+            found = query(log, 5, log_filter=log_filter, use_index=use_index)
+            assert [line.split()[-1] for line in found] == ["MONITOR"]
+        found = query(log, 5, log_filter=LogFilter(upper), use_index=use_index)
+        assert [line.split()[-1] for line in found] == ["50"]
+
+    # Appended lines are indexed on the next query.
+    _write_log(log, [("INFO", f"{campaign} appended")])
+    found = query(log, 1, log_filter=LogFilter(campaign), use_index=True)
+    assert found[0].endswith("appended")
+    assert LogIndex(log).index_path.joinpath("meta.json").exists()
+
+
+@pytest.mark.unit
+def test_watcher_wakes_up_on_append(tmp_path):
+    log = tmp_path.joinpath("zambeze.log")
+    log.touch()
+    watcher = FileWatcher([log], poll_interval=0.05)
+    try:
+        threading.Timer(0.2, _write_log, (log, [("INFO", "hello")])).start()
+        start = time.monotonic()
+        assert watcher.wait(timeout=5) == {log}
+        assert time.monotonic() - start < 2
+    finally:
+        watcher.close()
@@ -0,0 +1,57 @@
+import logging
+import time
+
+from zambeze.orchestration.monitor import CampaignMonitor, Monitor
+
+import pytest
+
+
+def _monitor_node(campaign_id, n_activities):
+    activity_ids = ["MONITOR"] + [f"a{i}" for i in range(n_activities)]
+    return ("MONITOR", {"campaign_id": campaign_id, "all_activity_ids": activity_ids})
+
+
+def _status(campaign_id, activity_id, status):
+    return {"campaign_id": campaign_id, "activity_id": activity_id, "status": status}
+
+
+@pytest.mark.unit
+def test_counts_follow_status_updates():
+    campaign = CampaignMonitor(_monitor_node("c1", 3))
+    assert campaign.update(_status("c1", "a0", "SUCCEEDED"))
+    assert campaign.update(_status("c1", "a1", "FAILED"))
+    assert not campaign.update(_status("c1", "unknown", "SUCCEEDED"))
+
+    assert campaign.status_counts["PROCESSING"] == 1
+    assert campaign.status_counts["SUCCEEDED"] == 1
+    assert campaign.status_counts["FAILED"] == 1
+    assert not campaign.completed
+
+    campaign.update(_status("c1", "a2", "SUCCEEDED"))
+    assert campaign.completed
+
+
+@pytest.mark.unit
+def test_one_monitor_serves_concurrent_campaigns():
+    monitor = Monitor(logger=logging.getLogger("test_monitor"))
+    monitor.monitor_hb_s = 60
+    monitor.start()
+    monitor.add_campaign(_monitor_node("c1", 2))
+    monitor.add_campaign(_monitor_node("c2", 1))
+
+    # Each campaign gets its first heartbeat immediately.
+    heartbeats = [monitor.to_status_q.get(timeout=5) for _ in range(2)]
+    assert {hb["campaign_id"] for hb in heartbeats} == {"c1", "c2"}
+    assert {hb["status"] for hb in heartbeats} == {"MONITORING"}
+
+    # Same activity id in both campaigns: only c2 must complete.
+    monitor.to_monitor_q.put(_status("c2", "a0", "SUCCEEDED"))
+    deadline = time.monotonic() + 5
+    while "c2" in monitor.campaigns and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert list(monitor.campaigns) == ["c1"]
+    assert monitor.campaigns["c1"].status_counts["PROCESSING"] == 2
+
+    monitor.stop()
+    monitor.join(timeout=5)
+    assert not monitor.is_alive()
@@ -0,0 +1,103 @@
+import getpass
+import shutil
+
+from types import SimpleNamespace
+
+from zambeze.orchestration.plugin_modules.rsync import ssh_multiplexer
+from zambeze.orchestration.plugin_modules.rsync.rsync import Rsync
+from zambeze.orchestration.plugin_modules.rsync.rsync_common import parseRsyncStats
+
+import pytest
+
+
+def _item(plugin, source_path, dest_path, dest_ip=None):
+    ip = plugin.info["local_ip"]
+    user = getpass.getuser()
+    return {
+        "source": {"ip": ip, "user": user, "path": source_path},
+        "destination": {"ip": dest_ip or ip, "user": user, "path": dest_path},
+    }
+
+
+@pytest.mark.unit
+def test_parse_rsync_stats():
+    output = (
+        "Number of files: 3 (reg: 2, dir: 1)\n"
+        "Number of regular files transferred: 2\n"
+        "Total file size: 2,097,152 bytes\n"
+        "Total transferred file size: 1,048,576 bytes\n"
+    )
+    assert parseRsyncStats(output) == {
+        "files_transferred": 2,
+        "bytes_transferred": 1048576,
+    }
+    assert parseRsyncStats("") == {"files_transferred": 0, "bytes_transferred": 0}
+
+
+@pytest.mark.unit
+def test_local_items_are_copied_without_ssh():
+    plugin = Rsync()
+    local = plugin._buildCommand(["-a"], _item(plugin, "/src/a", "/dest/a"))
+    remote = plugin._buildCommand(
+        ["-a"], _item(plugin, "/src/a", "/dest/a", dest_ip="10.0.0.1")
+    )
+
+    assert local == ["rsync", "--stats", "-a", "/src/a", "/dest/a"]
+    assert remote[:3] == ["rsync", "--stats", "-e"]
+    assert remote[-1] == f"{getpass.getuser()}@10.0.0.1:/dest/a"
+
+
+@pytest.mark.unit
+@pytest.mark.skipif(shutil.which("rsync") is None, reason="rsync is not installed")
+def test_every_item_is_transferred(tmp_path):
+    plugin = Rsync()
+    plugin.configure({"max_parallel_transfers": 3})
+    items = []
+    for i in range(5):
+        source = tmp_path.joinpath(f"in-{i}.txt")
+        source.write_text("x" * (i + 1))
+        items.append(_item(plugin, str(source), str(tmp_path.joinpath(f"out-{i}.txt"))))
+
+    results = plugin.process([{"transfer": {"items": items, "arguments": ["-a"]}}])
+
+    assert [r["returncode"] for r in results["transfer"]] == [0] * 5
+    assert [r["bytes_transferred"] for r in results["transfer"]] == [1, 2, 3, 4, 5]
+    assert tmp_path.joinpath("out-4.txt").read_text() == "xxxxx"
+
+
+@pytest.mark.unit
+def test_ssh_master_is_started_once_and_rechecked_after_interval(tmp_path, monkeypatch):
+    calls = []
+    masters = set()
+
+    def run(command, **kwargs):
+        destination = command[-1]
+        # Drop "ssh" and the options shared by every call.
+        calls.append(command[1 + len(mux._options()) :])
+        if "check" in command:
+            returncode = 0 if destination in masters else 255
+        else:
+            masters.add(destination)
+            returncode = 0
+        return SimpleNamespace(returncode=returncode)
+
+    monkeypatch.setattr(ssh_multiplexer.subprocess, "run", run)
+    mux = ssh_multiplexer.SSHMultiplexer(
+        "/key", tmp_path, persist=60, health_check_interval=30
+    )
+
+    assert "ControlPath=" + str(tmp_path.joinpath("%C")) in mux.sshCommand()
+    assert "ControlPersist=60" in mux.sshCommand()
+
+    for _ in range(5):
+        assert mux.ensure("user", "10.0.0.1")
+    # One failed check, one master start; later calls trust the last check.
+    assert calls == [
+        ["-O", "check", "user@10.0.0.1"],
+        ["-o", "BatchMode=yes", "-N", "-f", "user@10.0.0.1"],
+    ]
+
+    monkeypatch.setattr(mux, "_health_check_interval", 0)
+    assert mux.ensure("user", "10.0.0.1")
+    assert calls[-1] == ["-O", "check", "user@10.0.0.1"]
+    assert len(calls) == 3
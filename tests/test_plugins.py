@@ -1,5 +1,6 @@
 # Local imports
 from zambeze.orchestration.plugins import Plugins
+from zambeze.orchestration.plugin_modules.shell.shell import Shell
 from zambeze.campaign.activities.shell import ShellActivity
 from zambeze.campaign.activities.abstract_activity import Activity
 
@@ -37,6 +38,22 @@ def test_check_configured_plugins():
     assert len(plugins.configured) > 0
 
 
+@pytest.mark.unit
+def test_plugins_are_configured_on_first_use():
+    plugins = Plugins()
+    assert plugins.registered is not Plugins().registered
+    assert plugins.registered == Plugins().registered
+
+    plugins.configure({"shell": {}})
+    assert plugins._plugins == {}
+
+    activity = ShellActivity(
+        name="Simple echo", files=[], command="echo", arguments="hello-zambeze"
+    )
+    plugins.check(msg=activity)
+    assert list(plugins._plugins) == ["shell"]
+
+
 @pytest.mark.unit
 def test_shell_plugin_check():
     plugins = Plugins()
@@ -107,3 +124,44 @@ def test_shell_plugin_run():
     # Fifth, remove it and make sure it stays removed.
     os.remove(file_path)
     assert not os.path.exists(file_path)
+
+
+@pytest.mark.unit
+def test_unsupported_options_are_rejected_when_configured():
+    plugins = Plugins()
+    with pytest.raises(Exception, match="bogus"):
+        plugins.configure({"shell": {"bogus": 1}})
+    assert plugins.configured == []
+
+
+@pytest.mark.unit
+def test_plugin_failing_to_configure_raises_on_every_use(monkeypatch):
+    def broken(self, config):
+        raise RuntimeError("cannot configure shell")
+
+    plugins = Plugins()
+    plugins.configure({"shell": {}})
+    activity = ShellActivity(
+        name="Simple echo", files=[], command="echo", arguments="hello-zambeze"
+    )
+    with monkeypatch.context() as patch:
+        patch.setattr(Shell, "configure", broken)
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                plugins.check(msg=activity)
+
+    plugins.check(msg=activity)
+    assert plugins.configured == ["shell"]
+
+
+@pytest.mark.unit
+def test_plugin_failing_to_configure_is_left_out_of_configured():
+    plugins = Plugins()
+    config = {"shell": {}, "rsync": {"max_parallel_transfers": 0}}
+    plugins.configure(config)
+
+    assert plugins.configured == ["shell"]
+    assert plugins.configured == ["shell"]
+
+    with pytest.raises(Exception, match="max_parallel_transfers"):
+        Plugins().configure(config, eager=True)
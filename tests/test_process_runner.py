@@ -0,0 +1,71 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from zambeze.orchestration.plugin_modules.shell.process_runner import ProcessRunner
+from zambeze.orchestration.plugin_modules.shell.shell import Shell
+
+import pytest
+
+
+@pytest.mark.unit
+def test_exit_codes_output_and_rusage_are_reported():
+    runner = ProcessRunner()
+    ok, failed = runner.run_all([("echo hello; echo oops >&2", None), ("exit 3", None)])
+
+    assert ok.succeeded
+    assert ok.stdout == "hello\n"
+    assert ok.stderr == "oops\n"
+    assert set(ok.rusage) == {"user_time", "system_time", "max_rss"}
+    assert failed.returncode == 3
+    assert not failed.succeeded
+
+
+@pytest.mark.unit
+def test_concurrency_is_capped():
+    runner = ProcessRunner(max_concurrent=2)
+    start = time.monotonic()
+    results = runner.run_all([("sleep 0.3", None)] * 4)
+    elapsed = time.monotonic() - start
+
+    assert all(r.succeeded for r in results)
+    assert 0.6 <= elapsed < 1.2
+
+
+@pytest.mark.unit
+def test_timed_out_command_and_its_children_are_killed():
+    runner = ProcessRunner(timeout=0.3)
+    start = time.monotonic()
+    (result,) = runner.run_all([("sleep 30 & sleep 30; wait", None)])
+
+    assert result.timed_out
+    assert not result.succeeded
+    assert time.monotonic() - start < 5
+
+
+@pytest.mark.unit
+def test_output_is_bounded_or_written_to_files(tmp_path):
+    (tail,) = ProcessRunner(output_limit=1000).run_all(
+        [("head -c 100000 /dev/zero | tr '\\0' x; echo end", None)]
+    )
+    assert len(tail.stdout) == 1000
+    assert tail.stdout.endswith("xend\n")
+
+    (written,) = ProcessRunner(output_dir=str(tmp_path)).run_all([("echo hi", None)])
+    with open(written.stdout) as f:
+        assert f.read() == "hi\n"
+
+
+@pytest.mark.unit
+def test_activities_sharing_the_plugin_run_concurrently():
+    # The plugin, and its runner, is shared by every activity on the agent.
+    plugin = Shell()
+    plugin.configure({"max_concurrent": 1})
+    activity = [{"bash": {"command": "sleep", "args": ["0.3"], "env_vars": {}}}]
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(lambda _: plugin.process(activity), range(2)))
+    elapsed = time.monotonic() - start
+
+    assert all(r["bash"][0].succeeded for r in results)
+    assert elapsed < 0.55
@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pika
+
+from zambeze.orchestration.message import wire_format
+from zambeze.orchestration.queue.queue_publisher import RMQPublisher
+
+import pytest
+
+
+class FakeIOLoop:
+    def __init__(self):
+        self.calls = []
+
+    def call_later(self, delay, callback):
+        self.calls.append((delay, callback))
+
+    def add_callback_threadsafe(self, callback):
+        self.calls.append((None, callback))
+
+    def run_pending(self):
+        calls, self.calls = self.calls, []
+        for _, callback in calls:
+            callback()
+
+
+class FakeChannel:
+    def __init__(self):
+        self.published = []
+
+    def basic_publish(self, exchange, routing_key, body):
+        self.published.append((exchange, routing_key, body))
+
+
+def _publisher(**kwargs):
+    publisher = RMQPublisher({"ip": "localhost", "port": 5672}, **kwargs)
+    publisher._connection = SimpleNamespace(ioloop=FakeIOLoop(), is_open=True)
+    publisher._channel = FakeChannel()
+    publisher._ready = True
+    return publisher
+
+
+def _confirm(method_cls, tag, multiple):
+    return SimpleNamespace(method=method_cls(delivery_tag=tag, multiple=multiple))
+
+
+@pytest.mark.unit
+def test_messages_are_batched_until_the_linger_window_closes():
+    publisher = _publisher(batch_size=10, linger=0.01)
+    for i in range(3):
+        publisher.publish("CONTROL", {"status": "RUNNING", "n": i})
+
+    # Only the first message opens a window, nothing is sent yet.
+    assert len(publisher._connection.ioloop.calls) == 1
+    assert publisher._channel.published == []
+
+    publisher._connection.ioloop.run_pending()  # opens the window
+    publisher._connection.ioloop.run_pending()  # window expires
+    sent = publisher._channel.published
+    assert [wire_format.loads(body)["n"] for _, _, body in sent] == [0, 1, 2]
+    assert publisher.stats["in_flight"] == 3
+
+
+@pytest.mark.unit
+def test_full_batch_is_flushed_without_waiting():
+    publisher = _publisher(batch_size=2, linger=10)
+    publisher.publish("CONTROL", {"n": 0})
+    publisher.publish("CONTROL", {"n": 1})
+
+    drains = [cb for _, cb in publisher._connection.ioloop.calls]
+    assert publisher._drain in drains
+    publisher._drain()
+    assert len(publisher._channel.published) == 2
+
+
+@pytest.mark.unit
+def test_confirms_release_messages_and_nacks_republish():
+    publisher = _publisher(batch_size=10)
+    for i in range(4):
+        publisher.publish("CONTROL", {"n": i})
+    publisher._drain()
+
+    publisher._on_delivery_confirmation(_confirm(pika.spec.Basic.Ack, 2, True))
+    assert publisher.stats["confirmed"] == 2
+    assert sorted(publisher._unconfirmed) == [3, 4]
+    assert publisher.send_rate > 0
+
+    publisher._on_delivery_confirmation(_confirm(pika.spec.Basic.Nack, 3, False))
+    # The nacked message is published again right away with a new tag.
+    assert wire_format.loads(publisher._channel.published[-1][2])["n"] == 2
+    assert sorted(publisher._unconfirmed) == [4, 5]
+
+    publisher._on_delivery_confirmation(_confirm(pika.spec.Basic.Ack, 5, True))
+    assert publisher.flush(timeout=0)
+    assert publisher.stats["nacked"] == 1
+
+
+@pytest.mark.unit
+def test_unconfirmed_messages_are_requeued_in_order_on_disconnect():
+    publisher = _publisher(batch_size=10)
+    for i in range(3):
+        publisher.publish("ACTIVITIES", (f"activity-{i}", {}))
+    publisher._drain()
+    publisher.publish("ACTIVITIES", ("activity-3", {}))
+
+    publisher._requeue_unconfirmed()
+    pending = [wire_format.loads(body)[0] for _, _, body in publisher._pending]
+    assert pending == ["activity-0", "activity-1", "activity-2", "activity-3"]
+    assert publisher._delivery_tag == 0
@@ -0,0 +1,82 @@
+import logging
+
+from types import SimpleNamespace
+
+from zambeze.orchestration.queue.queue_rmq import (
+    DELAY_EXCHANGE,
+    QueueRMQ,
+    activity_queue,
+)
+
+import pytest
+
+
+class FakeChannel:
+    def __init__(self):
+        self.calls = []
+
+    def basic_qos(self, **kwargs):
+        self.calls.append(("basic_qos", kwargs))
+
+    def basic_consume(self, **kwargs):
+        self.calls.append(("basic_consume", kwargs))
+
+    def start_consuming(self):
+        self.calls.append(("start_consuming", {}))
+
+    def basic_publish(self, **kwargs):
+        self.calls.append(("basic_publish", kwargs))
+
+    def basic_ack(self, **kwargs):
+        self.calls.append(("basic_ack", kwargs))
+
+
+def _queue():
+    return QueueRMQ({"ip": "localhost", "port": 5672}, logger=logging.getLogger())
+
+
+@pytest.mark.unit
+def test_prefetch_is_set_before_consuming():
+    queue = _queue()
+    queue._rmq_channel = FakeChannel()
+    queue.listen_and_do_callback(
+        callback_func=print,
+        channel_to_listen="ACTIVITIES",
+        should_auto_ack=False,
+        prefetch_count=4,
+    )
+
+    names = [name for name, _ in queue._rmq_channel.calls]
+    assert names == ["basic_qos", "basic_consume", "start_consuming"]
+    assert queue._rmq_channel.calls[0][1] == {"prefetch_count": 4}
+
+
+@pytest.mark.unit
+def test_delay_requeue_routes_back_to_the_original_queue():
+    channel = FakeChannel()
+    method = SimpleNamespace(routing_key="ACTIVITIES", delivery_tag=7)
+    _queue().delay_requeue(channel, method, b"payload", delay_ms=250)
+
+    (publish, kwargs), (ack, ack_kwargs) = channel.calls
+    assert publish == "basic_publish"
+    assert kwargs["exchange"] == DELAY_EXCHANGE
+    assert kwargs["routing_key"] == "ACTIVITIES"
+    assert kwargs["properties"].expiration == "250"
+    assert ack == "basic_ack"
+    assert ack_kwargs["delivery_tag"] == 7
+
+
+@pytest.mark.unit
+def test_activities_are_routed_to_their_plugin_queue():
+    from zambeze.campaign.activities.shell import ShellActivity
+    from zambeze.orchestration.agent.message_handler import MessageHandler
+
+    shell = ShellActivity(name="echo", files=[], command="echo", arguments="hi")
+
+    assert MessageHandler.route_activity(("MONITOR", {})) == "ACTIVITIES"
+    assert MessageHandler.route_activity(("TERMINATOR", {})) == "ACTIVITIES"
+    assert (
+        MessageHandler.route_activity((shell.activity_id, {"activity": shell}))
+        == activity_queue("shell")
+        == "ACTIVITIES.shell"
+    )
@@ -0,0 +1,63 @@
+from zambeze.campaign.activities.shell import ShellActivity
+from zambeze.orchestration.data.result_cache import ResultCache
+from zambeze.orchestration.data.staging_cache import StagingCache
+
+import pytest
+
+
+def _activity(tmp_path, memoize=True):
+    return ShellActivity(
+        name="sort",
+        files=[f"file://{tmp_path.joinpath('in.txt')}"],
+        command="sort",
+        arguments="in.txt -o out.txt",
+        outputs=[str(tmp_path.joinpath("out.txt"))],
+        memoize=memoize,
+    )
+
+
+@pytest.mark.unit
+def test_outputs_are_restored_until_an_input_changes(tmp_path):
+    files = StagingCache(tmp_path.joinpath("files"), max_bytes=1024)
+    cache = ResultCache(tmp_path.joinpath("results"), max_entries=10, files=files)
+    tmp_path.joinpath("in.txt").write_text("b\na\n")
+    activity = _activity(tmp_path)
+
+    key = ResultCache.key(activity)
+    assert not cache.restore(key)
+    tmp_path.joinpath("out.txt").write_text("a\nb\n")
+    cache.store(key, activity.outputs)
+
+    tmp_path.joinpath("out.txt").unlink()
+    assert cache.restore(ResultCache.key(activity))
+    assert tmp_path.joinpath("out.txt").read_text() == "a\nb\n"
+
+    tmp_path.joinpath("in.txt").write_text("c\n")
+    assert ResultCache.key(activity) != key
+    assert cache.stats["hits"] == 1
+
+    # The index survives a restart.
+    reloaded = ResultCache(tmp_path.joinpath("results"), max_entries=10, files=files)
+    assert reloaded.restore(key)
+
+
+@pytest.mark.unit
+def test_least_recently_used_results_are_evicted(tmp_path):
+    files = StagingCache(tmp_path.joinpath("files"), max_bytes=1024)
+    cache = ResultCache(tmp_path.joinpath("results"), max_entries=2, files=files)
+    tmp_path.joinpath("out.txt").write_text("x")
+
+    for key in ("a", "b", "c"):
+        cache.store(key, [str(tmp_path.joinpath("out.txt"))])
+
+    assert not cache.restore("a")
+    assert cache.restore("b")
+    assert cache.stats["entries"] == 2
+
+
+@pytest.mark.unit
+def test_memoize_flag_round_trips():
+    activity = ShellActivity(
+        name="echo", files=[], command="echo", arguments="", memoize=True
+    )
+    assert ShellActivity.from_dict(activity.to_dict()).memoize
@@ -0,0 +1,37 @@
+# Local imports
+from zambeze.settings import get_client_settings
+
+# Standard imports
+import os
+import pytest
+import yaml
+
+
+@pytest.mark.unit
+def test_client_settings_are_read_only_and_reloaded_on_change(tmp_path):
+    conf_file = tmp_path.joinpath("agent.yaml")
+    with open(conf_file, "w") as f:
+        yaml.dump({"zmq": {"host": "10.0.0.1", "port": 5555}}, f)
+
+    settings = get_client_settings(conf_file)
+    assert settings["zmq"]["port"] == 5555
+    assert get_client_settings(conf_file) is settings
+    with pytest.raises(TypeError):
+        settings["zmq"]["port"] = 1
+
+    with open(conf_file, "w") as f:
+        yaml.dump({"zmq": {"port": 6666}}, f)
+    stat = conf_file.stat()
+    os.utime(conf_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    settings = get_client_settings(conf_file)
+    assert settings["zmq"]["port"] == 6666
+    assert "host" in settings["zmq"]
+    assert not tmp_path.joinpath("zambeze.db").exists()
+
+
+@pytest.mark.unit
+def test_client_settings_without_conf_file(tmp_path):
+    settings = get_client_settings(tmp_path.joinpath("missing.yaml"))
+    assert "port" not in settings["zmq"]
+    assert not tmp_path.joinpath("missing.yaml").exists()
@@ -0,0 +1,71 @@
+import os
+
+from zambeze.orchestration.data.staging_cache import StagingCache
+
+import pytest
+
+
+def _fetch(tmp_path, name, size):
+    path = tmp_path.joinpath(name)
+    path.write_bytes(b"x" * size)
+    return path
+
+
+@pytest.mark.unit
+def test_hit_after_insert_and_miss_on_new_version(tmp_path):
+    cache = StagingCache(tmp_path.joinpath("cache"), max_bytes=1024)
+    metadata = {"size": 10, "last_modified": "2024-01-01 00:00:00"}
+
+    assert cache.lookup("globus://ep/a.dat", metadata) is None
+    cached = cache.insert("globus://ep/a.dat", metadata, _fetch(tmp_path, "a", 10))
+    assert cache.lookup("globus://ep/a.dat", metadata) == cached
+
+    changed = dict(metadata, last_modified="2024-02-01 00:00:00")
+    assert cache.lookup("globus://ep/a.dat", changed) is None
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 2
+
+
+@pytest.mark.unit
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = StagingCache(tmp_path.joinpath("cache"), max_bytes=250)
+    for name in ("a", "b"):
+        cache.insert(name, {}, _fetch(tmp_path, name, 100))
+    # Touch "a" so that "b" is the least recently used.
+    assert cache.lookup("a", {}) is not None
+    cache.insert("c", {}, _fetch(tmp_path, "c", 100))
+
+    assert cache.lookup("b", {}) is None
+    assert cache.lookup("a", {}) is not None
+    assert cache.stats["bytes"] == 200
+
+
+@pytest.mark.unit
+def test_index_survives_restart_and_links_replace_files(tmp_path):
+    cache = StagingCache(tmp_path.joinpath("cache"), max_bytes=1024)
+    cached = cache.insert("a", {}, _fetch(tmp_path, "a", 10))
+
+    reopened = StagingCache(tmp_path.joinpath("cache"), max_bytes=1024)
+    assert reopened.lookup("a", {}) == cached
+
+    dest = _fetch(tmp_path, "dest", 3)
+    reopened.link(cached, dest)
+    assert dest.read_bytes() == b"x" * 10
+    assert not os.path.samefile(dest, cached)
+
+
+@pytest.mark.unit
+def test_writing_a_linked_file_leaves_the_cache_intact(tmp_path):
+    cache = StagingCache(tmp_path.joinpath("cache"), max_bytes=1024)
+    cached = cache.insert("a", {}, _fetch(tmp_path, "a", 10))
+    dest = tmp_path.joinpath("dest")
+    cache.link(cached, dest)
+
+    with open(dest, "r+b") as f:
+        f.write(b"y" * 4)
+    with open(dest, "ab") as f:
+        f.write(b"z")
+
+    assert cached.read_bytes() == b"x" * 10
+    cache.link(cache.lookup("a", {}), tmp_path.joinpath("other"))
+    assert tmp_path.joinpath("other").read_bytes() == b"x" * 10
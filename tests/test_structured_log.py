@@ -0,0 +1,44 @@
+import json
+import logging
+
+from zambeze.utils.log_query import LogFilter, query
+from zambeze.utils.structured_log import event, start_logging
+
+import pytest
+
+
+@pytest.mark.unit
+def test_records_are_written_as_json_by_the_listener(tmp_path):
+    log_path = tmp_path.joinpath("zambeze.log")
+    logger = logging.getLogger("test_structured_log")
+    logger.propagate = False
+    listener = start_logging(logger, log_path)
+    try:
+        node = {"predecessors": ["MONITOR"]}
+        logger.debug("[exec] Not written %s", node)
+        logger.info(
+            "[exec] Activity %s has predecessors %s",
+            "a1",
+            node["predecessors"],
+            extra=event("queued", "c1", "a1", latency_ms=12),
+        )
+        # Interpolated when logged, not when written.
+        node["predecessors"].append("changed")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("[exec] Activity %s failed", "a2")
+    finally:
+        listener.stop()
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+
+    queued, failed = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert queued["msg"] == "[exec] Activity a1 has predecessors ['MONITOR']"
+    assert queued["level"] == "INFO"
+    assert (queued["campaign_id"], queued["activity_id"]) == ("c1", "a1")
+    assert (queued["stage"], queued["latency_ms"]) == ("queued", 12)
+    assert "ValueError: boom" in failed["exc"]
+
+    errors = query(log_path, 10, log_filter=LogFilter(level="error"))
+    assert [json.loads(line)["msg"] for line in errors] == ["[exec] Activity a2 failed"]
@@ -0,0 +1,140 @@
+import logging
+import threading
+import uuid
+
+from types import SimpleNamespace
+
+from zambeze.orchestration.data import transfer_hippo
+from zambeze.orchestration.data.staging_cache import StagingCache
+from zambeze.orchestration.data.transfer_hippo import TransferHippo, TransferHippoError
+
+import pytest
+
+LOCAL_EP = str(uuid.uuid4())
+
+
+class StubTransferClient:
+    """Counts API calls instead of talking to Globus."""
+
+    instances = []
+
+    def __init__(self, authorizer=None):
+        self.lock = threading.Lock()
+        self.submitted = []
+        self.api_calls = 0
+        self.fail_for = set()
+        StubTransferClient.instances.append(self)
+
+    def submit_transfer(self, data):
+        with self.lock:
+            self.api_calls += 1
+            self.submitted.append(data)
+            if data["source_endpoint"] in self.fail_for:
+                raise RuntimeError("endpoint is not activated")
+            return {"task_id": f"task-{len(self.submitted)}"}
+
+    def operation_ls(self, endpoint, path=None):
+        with self.lock:
+            self.api_calls += 1
+        return [
+            {"name": f"file-{i}.dat", "type": "file", "size": 1, "last_modified": "t"}
+            for i in range(300)
+        ]
+
+
+@pytest.fixture
+def stub_globus(monkeypatch):
+    StubTransferClient.instances = []
+    monkeypatch.setattr(transfer_hippo.globus_sdk, "TransferClient", StubTransferClient)
+    monkeypatch.setattr(
+        transfer_hippo.globus_sdk, "AccessTokenAuthorizer", lambda token: token
+    )
+    return StubTransferClient
+
+
+def _hippo(files, cache=None):
+    settings = SimpleNamespace(settings={"plugins": {"globus": {"local_ep": LOCAL_EP}}})
+    hippo = TransferHippo(
+        agent_id="agent",
+        settings=settings,
+        logger=logging.getLogger("test_transfer_hippo"),
+        tokens={"globus": {"access_token": "token"}},
+        cache=cache,
+    )
+    hippo.load(files)
+    return hippo
+
+
+@pytest.mark.unit
+def test_files_are_submitted_as_one_task_per_endpoint(stub_globus):
+    endpoints = [str(uuid.uuid4()) for _ in range(3)]
+    files = [f"globus://{endpoints[i % 3]}/data/file-{i}.dat" for i in range(300)] + [
+        f"local:///tmp/local-{i}.dat" for i in range(20)
+    ]
+
+    hippo = _hippo(files)
+    hippo.start_transfer()
+
+    (client,) = stub_globus.instances
+    assert client.api_calls == 3
+    assert len(hippo.globus_task_ids) == 3
+    by_source = {data["source_endpoint"]: data for data in client.submitted}
+    assert set(by_source) == set(endpoints)
+    for data in client.submitted:
+        assert data["destination_endpoint"] == LOCAL_EP
+        assert len(data["DATA"]) == 100
+    assert sum(len(f) for f in hippo.globus_task_files.values()) == 300
+
+
+@pytest.mark.unit
+def test_local_only_campaign_makes_no_api_calls(stub_globus):
+    hippo = _hippo([f"local:///tmp/local-{i}.dat" for i in range(5)])
+    hippo.start_transfer()
+
+    assert stub_globus.instances == []
+    assert hippo.globus_task_ids == []
+
+
+@pytest.mark.unit
+def test_failed_submission_keeps_the_other_tasks(stub_globus, monkeypatch):
+    good, bad = str(uuid.uuid4()), str(uuid.uuid4())
+    original_init = StubTransferClient.__init__
+
+    def init(self, authorizer=None):
+        original_init(self, authorizer)
+        self.fail_for = {bad}
+
+    monkeypatch.setattr(StubTransferClient, "__init__", init)
+    hippo = _hippo([f"globus://{good}/a.dat", f"globus://{bad}/b.dat"])
+
+    with pytest.raises(TransferHippoError):
+        hippo.start_transfer()
+    assert len(hippo.globus_task_ids) == 1
+
+
+@pytest.mark.unit
+def test_cached_files_are_not_transferred_again(stub_globus, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = StagingCache(tmp_path.joinpath("cache"), max_bytes=1024)
+    source = str(uuid.uuid4())
+    files = [f"globus://{source}/data/file-{i}.dat" for i in range(3)]
+
+    first = _hippo(files, cache=cache)
+    first.start_transfer()
+    (task_id,) = first.globus_task_ids
+    # Pretend Globus wrote the files to the cache's incoming directory.
+    for incoming in first._cache_pending:
+        with open(incoming, "wb") as f:
+            f.write(b"x")
+    assert first.globus_task_files[task_id] == [
+        str(tmp_path.joinpath(f"file-{i}.dat")) for i in range(3)
+    ]
+    first._finish_cached()
+
+    second = _hippo(files, cache=cache)
+    second.start_transfer()
+
+    assert second.globus_task_ids == []
+    assert len(stub_globus.instances[1].submitted) == 0
+    assert cache.stats["hits"] == 3
+    assert tmp_path.joinpath("file-0.dat").read_bytes() == b"x"
@@ -0,0 +1,93 @@
+import threading
+
+from zambeze.orchestration.data.transfer_tracker import (
+    TransferFailedError,
+    TransferTracker,
+)
+
+import pytest
+
+
+class StubTransferClient:
+    """Serves task documents from a dict and counts task_list calls."""
+
+    def __init__(self, statuses):
+        self.lock = threading.Lock()
+        self.statuses = statuses
+        self.calls = []
+
+    def task_list(self, filter, limit):
+        task_ids = filter[len("task_id:") :].split(",")
+        with self.lock:
+            self.calls.append(task_ids)
+            return [
+                {
+                    "task_id": task_id,
+                    "status": self.statuses[task_id],
+                    "files": 2,
+                    "files_transferred": 2 if self.statuses[task_id] != "ACTIVE" else 0,
+                    "files_skipped": 0,
+                    "bytes_transferred": 0,
+                }
+                for task_id in task_ids
+            ]
+
+
+@pytest.mark.unit
+def test_all_tasks_are_polled_in_one_call():
+    client = StubTransferClient({f"task-{i}": "ACTIVE" for i in range(50)})
+    tracker = TransferTracker()
+    futures = [tracker.track(client, {f"task-{i}": [f"/dest/{i}"]}) for i in range(50)]
+
+    tracker.poll(list(tracker._tasks.values()))
+    assert len(client.calls) == 1
+    assert len(client.calls[0]) == 50
+    assert not any(f.done() for f in futures)
+
+    client.statuses.update({f"task-{i}": "SUCCEEDED" for i in range(50)})
+    tracker.poll(list(tracker._tasks.values()))
+    assert all(f.result(0) == {f"task-{i}": "SUCCEEDED"} for i, f in enumerate(futures))
+    assert tracker.outstanding == 0
+
+
+@pytest.mark.unit
+def test_future_fails_when_a_task_fails():
+    client = StubTransferClient({"a": "ACTIVE", "b": "FAILED"})
+    tracker = TransferTracker()
+    future = tracker.track(client, {"a": ["/dest/a"], "b": ["/dest/b"]})
+
+    tracker.poll(list(tracker._tasks.values()))
+    with pytest.raises(TransferFailedError):
+        future.result(0)
+    # The rest of a failed activity is no longer polled.
+    assert tracker.outstanding == 0
+
+
+@pytest.mark.unit
+def test_progress_is_reported_once_per_change():
+    client = StubTransferClient({"a": "ACTIVE"})
+    reports = []
+    tracker = TransferTracker()
+    tracker.track(client, {"a": ["/dest/x", "/dest/y"]}, on_progress=reports.append)
+
+    assert tracker.poll(list(tracker._tasks.values())) is True
+    assert tracker.poll(list(tracker._tasks.values())) is False
+    client.statuses["a"] = "SUCCEEDED"
+    assert tracker.poll(list(tracker._tasks.values())) is True
+
+    assert [r["status"] for r in reports] == ["ACTIVE", "SUCCEEDED"]
+    assert reports[-1]["files_transferred"] == 2
+    assert reports[-1]["paths"] == ["/dest/x", "/dest/y"]
+
+
+@pytest.mark.unit
+def test_tracker_thread_completes_futures():
+    client = StubTransferClient({"a": "SUCCEEDED"})
+    tracker = TransferTracker(min_interval=0.01)
+    tracker.start()
+    try:
+        future = tracker.track(client, {"a": ["/dest/a"]})
+        assert future.result(5) == {"a": "SUCCEEDED"}
+    finally:
+        tracker.stop()
+        tracker.join(5)
@@ -0,0 +1,74 @@
+from zambeze.campaign.activities.dag import DAG
+from zambeze.campaign.activities.shell import ShellActivity
+from zambeze.campaign.campaign import Campaign
+from zambeze.orchestration.message import wire_format
+
+import pytest
+
+
+def _campaign():
+    first = ShellActivity(
+        name="First",
+        files=["local:///tmp/in.txt"],
+        command="echo",
+        arguments="hello zambeze",
+        env_vars={"NAME": "zambeze"},
+        outputs=["/tmp/out.txt"],
+    )
+    second = ShellActivity(
+        name="Second", files=["/tmp/out.txt"], command="cat", arguments="/tmp/out.txt"
+    )
+    return Campaign("Wire format", activities=[first, second]), first, second
+
+
+@pytest.mark.unit
+def test_dag_round_trip():
+    campaign, first, second = _campaign()
+    dag = campaign._pack_dag_for_dispatch()
+
+    frame = dag.serialize_dag()
+    assert frame[0] == wire_format.WIRE_VERSION
+
+    decoded = DAG.deserialize_dag(frame)
+    assert isinstance(decoded, DAG)
+    assert list(decoded.nodes) == list(dag.nodes)
+    assert set(decoded.edges) == set(dag.edges)
+
+    activity = decoded.nodes[first.activity_id]["activity"]
+    assert isinstance(activity, ShellActivity)
+    assert activity.activity_id == first.activity_id
+    assert activity.campaign_id == campaign.campaign_id
+    assert activity.submission_time == first.submission_time
+    assert activity.env_vars == {"NAME": "zambeze"}
+    assert activity.plugin_args["parameters"]["args"] == ["hello", "zambeze"]
+    assert decoded.nodes[second.activity_id]["predecessors"] == [first.activity_id]
+
+
+@pytest.mark.unit
+def test_node_and_control_round_trip():
+    campaign, first, _ = _campaign()
+    dag = campaign._pack_dag_for_dispatch()
+
+    node = DAG.deserialize_node(dag.serialize_node(first.activity_id))
+    assert node[0] == first.activity_id
+    assert node[1]["activity"].command == "echo"
+
+    control = {
+        "status": "FAILED",
+        "activity_id": first.activity_id,
+        "details": RuntimeError("boom"),
+    }
+    decoded = wire_format.loads(wire_format.dumps(control))
+    assert decoded["status"] == "FAILED"
+    assert decoded["details"] == "boom"
+
+
+@pytest.mark.unit
+def test_rejects_unknown_version_and_kind():
+    frame = wire_format.encode_control({"status": "SUCCEEDED"})
+
+    with pytest.raises(wire_format.WireFormatError):
+        wire_format.loads(bytes([wire_format.WIRE_VERSION + 1]) + frame[1:])
+
+    with pytest.raises(wire_format.WireFormatError):
+        wire_format.decode_node(frame)